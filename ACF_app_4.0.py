@@ -4,15 +4,15 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-import math
-from scipy import signal as scipy_signal
-from scipy.signal import hilbert
 from pathlib import Path
 import json
 import concurrent.futures
 import time
 import threading
 
+from acf_core.laws import get_frequency_law
+from acf_core.legacy import compute_legacy_point_metric, compute_legacy_sequence_analysis
+
 class AutocorrelationApp:
     def __init__(self, root):
         self.root = root
@@ -31,14 +31,6 @@ class AutocorrelationApp:
             'variable_amplitude': False
         }
         
-        # Коэффициенты для компенсационного закона (базовые)
-        self.compensation_coefficients = [
-            [0.0005, -0.0023, 0.0785, 1.1904, 25.019],
-            [0.000035, -0.0003, 0.0160, 0.5952, 25.019],  
-            [0.000026, -0.000045, 0.0049, 0.2976, 25.019],
-            [0.000015, -0.000045, 0.0012, 0.1488, 25.019]
-        ]
-        
         # Текущие параметры
         self.params = self.default_params.copy()
         
@@ -629,107 +621,9 @@ class AutocorrelationApp:
             j = task_data['j']
             start_freq = task_data['start_freq']
             end_freq = task_data['end_freq']
-            fixed_params = task_data['fixed_params']
-            heatmap_type = task_data['heatmap_type']
-            
-            temp_params = fixed_params.copy()
-            temp_params['start_freq'] = start_freq
-            temp_params['end_freq'] = end_freq
-            
-            duration = temp_params['duration']
-            dt = temp_params['dt']
-            total_samples = int(duration / dt)
-            
-            MAX_SAMPLES = 1000000
-            if total_samples > MAX_SAMPLES:
-                temp_params['dt'] = max(dt, duration / MAX_SAMPLES)
-                dt = temp_params['dt']
-            
-            impulse_times = self.create_impulse_times_only(temp_params)
-            
-            if len(impulse_times) > 100000:
-                return (i, j, 0)
-            
-            signal_len = int(duration / dt) + 1
-            if signal_len > 1000000:
-                return (i, j, 0)
-                
-            signal = np.zeros(signal_len)
-            if temp_params['variable_amplitude'] and len(impulse_times) > 0:
-                for idx, t in enumerate(impulse_times):
-                    sample_idx = int(t / dt)
-                    if 0 <= sample_idx < len(signal):
-                        amplitude = 1.0 + (idx / (len(impulse_times) - 1)) if len(impulse_times) > 1 else 1.0
-                        signal[sample_idx] = amplitude
-            else:
-                for t in impulse_times:
-                    sample_idx = int(t / dt)
-                    if 0 <= sample_idx < len(signal):
-                        signal[sample_idx] = 1.0
-            
-            wavelet = self.ricker_wavelet_with_params(temp_params['ricker_freq'], temp_params)
-            
-            if len(signal) + len(wavelet) - 1 > 2000000:
-                return (i, j, 0)
-            
-            convolution = np.convolve(signal, wavelet, mode='same')
-            
-            max_lag = temp_params['max_lag']
-            n = len(convolution)
-            
-            if n > 200000:
-                max_lag = min(max_lag, 200)
-            
-            autocorr = np.correlate(convolution, convolution, mode='full')
-            autocorr = autocorr[n-1-max_lag:n+max_lag]
-            
-            max_val = np.max(np.abs(autocorr))
-            if max_val > 0:
-                autocorr = autocorr / max_val
-            
-            if heatmap_type == 'area':
-                lag_times = np.arange(-max_lag, max_lag + 1) * dt
-                area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
-                value = area
-                
-            elif heatmap_type == 'center_freq':
-                center_freq = (start_freq + end_freq) / 2
-                value = center_freq
-                
-            elif heatmap_type == 'impulse_count':
-                num_impulses = len(impulse_times)
-                value = num_impulses
-                
-            else:
-                model_wavelet = wavelet
-                
-                if np.max(np.abs(model_wavelet)) > 0:
-                    model_wavelet = model_wavelet / np.max(np.abs(model_wavelet))
-                
-                n_wavelet = len(model_wavelet)
-                n_autocorr = len(autocorr)
-                
-                if n_wavelet > n_autocorr:
-                    model_scaled = model_wavelet[(n_wavelet - n_autocorr) // 2: (n_wavelet - n_autocorr) // 2 + n_autocorr]
-                else:
-                    model_scaled = np.zeros(n_autocorr)
-                    start_idx = (n_autocorr - n_wavelet) // 2
-                    model_scaled[start_idx:start_idx + n_wavelet] = model_wavelet
-                
-                autocorr_residual = autocorr - model_scaled
-                
-                try:
-                    envelope = np.abs(hilbert(autocorr_residual))
-                except:
-                    envelope = np.abs(autocorr_residual)
-                
-                lag_times = np.arange(-max_lag, max_lag + 1) * dt
-                if len(lag_times) > 1:
-                    envelope_area = np.sum(np.abs(envelope)) * (lag_times[1] - lag_times[0])
-                else:
-                    envelope_area = 0
-                value = envelope_area
             
+            value = compute_legacy_point_metric(start_freq, end_freq, task_data['fixed_params'],
+                                                task_data['heatmap_type'])
             return (i, j, value)
             
         except Exception as e:
@@ -881,203 +775,6 @@ class AutocorrelationApp:
         self.calculation_thread = threading.Thread(target=self.calculate_heatmap_in_thread, daemon=True)
         self.calculation_thread.start()
     
-    def create_impulse_times_only(self, params):
-        """Оптимизированное создание только времен импульсов"""
-        def temp_frequency_function(t):
-            duration = params['duration']
-            f0 = params['start_freq']
-            f1 = params['end_freq']
-            law_type = params['law_type']
-            
-            if law_type == 'linear':
-                return f0 + (f1 - f0) * (t / duration)
-            elif law_type == 'quadratic':
-                a = (f1 - f0) / (duration**2)
-                return a * (t**2) + f0
-            elif law_type == 'exponential':
-                if f0 <= 0 or f1 <= 0:
-                    return f0
-                k = math.log(f1 / f0) / duration if f0 > 0 else 0
-                return f0 * math.exp(k * t)
-            elif law_type == 'hyperbolic':
-                if t >= duration:
-                    return f1
-                term1 = f0**(-2) * (1 - t/duration)
-                term2 = f1**(-2) * (t/duration)
-                denominator = term1 + term2
-                if denominator > 0:
-                    return 1.0 / math.sqrt(denominator)
-                else:
-                    return f0
-            else:
-                return f0 + (f1 - f0) * (t / duration)
-        
-        duration = params['duration']
-        impulse_times = []
-        
-        t_current = 0
-        iteration_count = 0
-        MAX_ITERATIONS = 1000000
-        
-        while t_current < duration and iteration_count < MAX_ITERATIONS:
-            f_current = temp_frequency_function(t_current)
-            
-            if f_current > 0:
-                T = 1.0 / f_current
-            else:
-                T = duration
-                
-            MIN_PERIOD = 0.0001
-            if T < MIN_PERIOD:
-                T = MIN_PERIOD
-                
-            impulse_times.append(t_current)
-            t_current += T
-            iteration_count += 1
-        
-        if iteration_count >= MAX_ITERATIONS:
-            print(f"Предупреждение: достигнут предел итераций для f0={params['start_freq']}, f1={params['end_freq']}")
-            if len(impulse_times) > 100000:
-                impulse_times = impulse_times[:100000]
-        
-        return impulse_times
-    
-    def create_impulse_sequence_with_params(self, params):
-        """Создание импульсной последовательности с заданными параметрами"""
-        def temp_frequency_function(t):
-            duration = params['duration']
-            f0 = params['start_freq']
-            f1 = params['end_freq']
-            law_type = params['law_type']
-            
-            if law_type == 'linear':
-                return f0 + (f1 - f0) * (t / duration)
-            elif law_type == 'quadratic':
-                a = (f1 - f0) / (duration**2)
-                return a * (t**2) + f0
-            elif law_type == 'exponential':
-                if f0 <= 0 or f1 <= 0:
-                    return f0
-                k = math.log(f1 / f0) / duration if f0 > 0 else 0
-                return f0 * math.exp(k * t)
-            elif law_type == 'hyperbolic':
-                if t >= duration:
-                    return f1
-                term1 = f0**(-2) * (1 - t/duration)
-                term2 = f1**(-2) * (t/duration)
-                denominator = term1 + term2
-                if denominator > 0:
-                    return 1.0 / math.sqrt(denominator)
-                else:
-                    return f0
-            else:
-                return f0 + (f1 - f0) * (t / duration)
-        
-        duration = params['duration']
-        dt = params['dt']
-        
-        MIN_DT = 0.0001
-        if dt < MIN_DT:
-            dt = MIN_DT
-            params['dt'] = dt
-        
-        impulse_times = []
-        impulse_frequencies = []
-        
-        t_current = 0
-        iteration_count = 0
-        MAX_ITERATIONS = 1000000
-        
-        while t_current < duration and iteration_count < MAX_ITERATIONS:
-            f_current = temp_frequency_function(t_current)
-            
-            if f_current > 0:
-                T = 1.0 / f_current
-            else:
-                T = duration
-                
-            MIN_PERIOD = 0.0001
-            if T < MIN_PERIOD:
-                T = MIN_PERIOD
-                
-            impulse_times.append(t_current)
-            impulse_frequencies.append(f_current)
-            t_current += T
-            iteration_count += 1
-        
-        if iteration_count >= MAX_ITERATIONS:
-            print(f"Предупреждение: достигнут предел итераций для f0={params['start_freq']}, f1={params['end_freq']}")
-            if len(impulse_times) > 100000:
-                impulse_times = impulse_times[:100000]
-                impulse_frequencies = impulse_frequencies[:100000]
-        
-        MAX_IMPULSES = 100000
-        if len(impulse_times) > MAX_IMPULSES:
-            impulse_times = impulse_times[:MAX_IMPULSES]
-            impulse_frequencies = impulse_frequencies[:MAX_IMPULSES]
-        
-        time = np.arange(0, duration, dt)
-        
-        MAX_SAMPLES = 500000
-        if len(time) > MAX_SAMPLES:
-            dt = duration / MAX_SAMPLES
-            params['dt'] = dt
-            time = np.arange(0, duration, dt)
-        
-        signal = np.zeros_like(time)
-        
-        if params['variable_amplitude'] and len(impulse_times) > 0:
-            for i, t in enumerate(impulse_times):
-                idx = int(t / dt)
-                if 0 <= idx < len(signal):
-                    amplitude = 1.0 + (i / (len(impulse_times) - 1)) if len(impulse_times) > 1 else 1.0
-                    signal[idx] = amplitude
-        else:
-            for t in impulse_times:
-                idx = int(t / dt)
-                if 0 <= idx < len(signal):
-                    signal[idx] = 1.0
-        
-        return time, signal, impulse_times, impulse_frequencies
-    
-    def ricker_wavelet_with_params(self, frequency, params, length=0.1):
-        """Создание вейвлета Рикера с заданными параметрами"""
-        dt = params['dt']
-        
-        if dt <= 0:
-            dt = 0.001
-            params['dt'] = dt
-        
-        t = np.arange(-length/2, length/2, dt)
-        t2 = t ** 2
-        wavelet = (1.0 - 2.0 * np.pi**2 * frequency**2 * t2) * np.exp(-np.pi**2 * frequency**2 * t2)
-        return wavelet
-    
-    def compute_envelope_area(self, autocorr, wavelet, dt):
-        """Вычисление площади под огибающей АКФ после вычета исходного импульса"""
-        model_wavelet = wavelet / np.max(np.abs(wavelet)) if np.max(np.abs(wavelet)) > 0 else wavelet
-        
-        n_wavelet = len(model_wavelet)
-        n_autocorr = len(autocorr)
-        
-        if n_wavelet > n_autocorr:
-            model_scaled = model_wavelet[(n_wavelet - n_autocorr) // 2: (n_wavelet - n_autocorr) // 2 + n_autocorr]
-        else:
-            model_scaled = np.zeros(n_autocorr)
-            start_idx = (n_autocorr - n_wavelet) // 2
-            model_scaled[start_idx:start_idx + n_wavelet] = model_wavelet
-        
-        autocorr_residual = autocorr - model_scaled
-        
-        try:
-            envelope = np.abs(hilbert(autocorr_residual))
-        except:
-            envelope = np.abs(autocorr_residual)
-        
-        envelope_area = np.trapz(np.abs(envelope), dx=dt)
-        
-        return envelope_area, autocorr_residual, envelope
-    
     def update_heatmap(self, start_freqs, end_freqs, matrix, heatmap_type='area'):
         """Обновление тепловой карты и палитры"""
         self.ax_heatmap.clear()
@@ -1241,259 +938,6 @@ class AutocorrelationApp:
             messagebox.showerror("Ошибка ввода", f"Некорректные параметры:\n{str(e)}")
             return False
     
-    def ricker_wavelet(self, frequency, length=0.1):
-        """Создание вейвлета Рикера"""
-        dt = self.params['dt']
-        t = np.arange(-length/2, length/2, dt)
-        t2 = t ** 2
-        wavelet = (1.0 - 2.0 * np.pi**2 * frequency**2 * t2) * np.exp(-np.pi**2 * frequency**2 * t2)
-        return wavelet
-    
-    def scale_compensation_coefficients(self, duration, f0, f1):
-        """Масштабирование компенсационных коэффициентов для заданных параметров"""
-        base_durations = [10, 20, 40, 80]
-        
-        if duration <= base_durations[0]:
-            idx1, idx2 = 0, 0
-            weight = 0.0
-        elif duration >= base_durations[-1]:
-            idx1, idx2 = -1, -1
-            weight = 1.0
-        else:
-            for i in range(len(base_durations)-1):
-                if base_durations[i] <= duration <= base_durations[i+1]:
-                    idx1, idx2 = i, i+1
-                    weight = (duration - base_durations[i]) / (base_durations[i+1] - base_durations[i])
-                    break
-        
-        coeffs1 = self.compensation_coefficients[idx1]
-        coeffs2 = self.compensation_coefficients[idx2]
-        
-        scaled_coeffs = []
-        for c1, c2 in zip(coeffs1, coeffs2):
-            scaled_coeffs.append(c1 * (1-weight) + c2 * weight)
-        
-        e_offset = f0 - scaled_coeffs[4]
-        scaled_coeffs[4] = f0
-        
-        current_end_value = (scaled_coeffs[0] * (duration**4) + 
-                            scaled_coeffs[1] * (duration**3) + 
-                            scaled_coeffs[2] * (duration**2) + 
-                            scaled_coeffs[3] * duration + 
-                            scaled_coeffs[4])
-        
-        diff = f1 - current_end_value
-        
-        total_poly = 0
-        contributions = []
-        
-        contributions.append(scaled_coeffs[0] * (duration**4))
-        contributions.append(scaled_coeffs[1] * (duration**3))
-        contributions.append(scaled_coeffs[2] * (duration**2))
-        contributions.append(scaled_coeffs[3] * duration)
-        
-        total_poly = sum(contributions)
-        
-        if abs(total_poly) > 1e-10:
-            for i in range(4):
-                if abs(contributions[i]) > 1e-10:
-                    scale_factor = 1 + (diff * contributions[i] / total_poly) / contributions[i]
-                    scaled_coeffs[i] *= scale_factor
-        
-        return scaled_coeffs
-    
-    def frequency_function(self, t):
-        """Вычисление частоты в зависимости от выбранного закона"""
-        duration = self.params['duration']
-        f0 = self.params['start_freq']
-        f1 = self.params['end_freq']
-        law_type = self.params['law_type']
-        
-        if law_type == 'linear':
-            return f0 + (f1 - f0) * (t / duration)
-        
-        elif law_type == 'quadratic':
-            a = (f1 - f0) / (duration**2)
-            return a * (t**2) + f0
-        
-        elif law_type == 'exponential':
-            if f0 <= 0 or f1 <= 0:
-                return f0
-            k = math.log(f1 / f0) / duration if f0 > 0 else 0
-            return f0 * math.exp(k * t)
-        
-        elif law_type == 'compensation':
-            coeffs = self.scale_compensation_coefficients(duration, f0, f1)
-            
-            return (coeffs[0] * (t**4) + 
-                    coeffs[1] * (t**3) + 
-                    coeffs[2] * (t**2) + 
-                    coeffs[3] * t + 
-                    coeffs[4])
-        
-        elif law_type == 'hyperbolic':
-            if t >= duration:
-                return f1
-            
-            term1 = f0**(-2) * (1 - t/duration)
-            term2 = f1**(-2) * (t/duration)
-            denominator = term1 + term2
-            
-            if denominator > 0:
-                return 1.0 / math.sqrt(denominator)
-            else:
-                return f0
-        
-        else:
-            return f0
-    
-    def create_hyperbolic_sequence_analytical(self):
-        """Создание гиперболической последовательности аналитически"""
-        duration = self.params['duration']
-        f0 = self.params['start_freq']
-        f1 = self.params['end_freq']
-        
-        if duration <= 0 or f0 <= 0 or f1 <= 0:
-            return [], []
-        
-        T0 = 1.0 / f0
-        T1 = 1.0 / f1
-        
-        N_approx = int(duration / ((T0 + T1) / 2))
-        
-        dT = (T0 - T1) / (N_approx - 1) if N_approx > 1 else 0
-        
-        impulse_times = []
-        impulse_frequencies = []
-        
-        n = 0
-        iteration_count = 0
-        MAX_ITERATIONS = 1000000
-        
-        while iteration_count < MAX_ITERATIONS:
-            t_n = n * T0 - n * (n - 1) / 2 * dT
-            
-            if t_n > duration:
-                break
-                
-            if t_n >= 0:
-                if n == 0:
-                    f_n = f0
-                elif n == N_approx - 1:
-                    f_n = f1
-                else:
-                    f_n = 1.0 / (T0 - n * dT)
-                
-                impulse_times.append(t_n)
-                impulse_frequencies.append(f_n)
-            
-            n += 1
-            iteration_count += 1
-        
-        if iteration_count >= MAX_ITERATIONS:
-            print(f"Предупреждение: достигнут предел итераций для гиперболической последовательности")
-            if len(impulse_times) > 100000:
-                impulse_times = impulse_times[:100000]
-                impulse_frequencies = impulse_frequencies[:100000]
-        
-        return impulse_times, impulse_frequencies
-    
-    def create_impulse_sequence(self):
-        """Создание импульсной последовательности"""
-        duration = self.params['duration']
-        dt = self.params['dt']
-        
-        if self.params['law_type'] == 'hyperbolic':
-            impulse_times, impulse_frequencies = self.create_hyperbolic_sequence_analytical()
-        else:
-            impulse_times = []
-            impulse_frequencies = []
-            
-            t_current = 0
-            iteration_count = 0
-            MAX_ITERATIONS = 1000000
-            
-            while t_current < duration and iteration_count < MAX_ITERATIONS:
-                f_current = self.frequency_function(t_current)
-                
-                if f_current > 0:
-                    T = 1.0 / f_current
-                else:
-                    T = duration
-                    
-                impulse_times.append(t_current)
-                impulse_frequencies.append(f_current)
-                t_current += T
-                iteration_count += 1
-            
-            if iteration_count >= MAX_ITERATIONS:
-                print(f"Предупреждение: достигнут предел итераций при создании последовательности")
-                if len(impulse_times) > 100000:
-                    impulse_times = impulse_times[:100000]
-                    impulse_frequencies = impulse_frequencies[:100000]
-        
-        time = np.arange(0, duration, dt)
-        
-        MAX_SAMPLES = 500000
-        if len(time) > MAX_SAMPLES:
-            dt = duration / MAX_SAMPLES
-            self.params['dt'] = dt
-            time = np.arange(0, duration, dt)
-        
-        signal = np.zeros_like(time)
-        
-        if self.params['variable_amplitude'] and len(impulse_times) > 0:
-            for i, t in enumerate(impulse_times):
-                idx = int(t / dt)
-                if idx < len(signal):
-                    amplitude = 1.0 + (i / (len(impulse_times) - 1)) if len(impulse_times) > 1 else 1.0
-                    signal[idx] = amplitude
-        else:
-            for t in impulse_times:
-                idx = int(t / dt)
-                if idx < len(signal):
-                    signal[idx] = 1.0
-        
-        return time, signal, impulse_times, impulse_frequencies
-    
-    def compute_autocorrelation(self, signal):
-        """Вычисление автокорреляционной функции"""
-        max_lag = self.params['max_lag']
-        n = len(signal)
-        
-        if n > 200000:
-            max_lag = min(max_lag, 200)
-        
-        autocorr = np.correlate(signal, signal, mode='full')
-        autocorr = autocorr[n-1-max_lag:n+max_lag]
-        lags = np.arange(-max_lag, max_lag + 1)
-        
-        max_val = np.max(np.abs(autocorr))
-        if max_val > 0:
-            autocorr = autocorr / max_val
-        
-        return lags, autocorr
-    
-    def compute_spectrum(self, autocorr):
-        """Вычисление спектра АКФ"""
-        dt = self.params['dt']
-        n = len(autocorr)
-        
-        if n > 100000:
-            autocorr = autocorr[:100000]
-            n = len(autocorr)
-        
-        spectrum = np.fft.fft(autocorr)
-        freq = np.fft.fftfreq(n, dt)
-        
-        pos_freq = freq[:n//2]
-        pos_spectrum = np.abs(spectrum[:n//2])
-        
-        if np.max(pos_spectrum) > 0:
-            pos_spectrum = pos_spectrum / np.max(pos_spectrum)
-        
-        return pos_freq, pos_spectrum
-    
     def update_frequency_plot(self):
         """Обновление графика роста частоты"""
         self.ax_freq.clear()
@@ -1501,7 +945,9 @@ class AutocorrelationApp:
         duration = self.params['duration']
         dt = duration / 200
         time_points = np.arange(0, duration + dt, dt)
-        freq_points = [self.frequency_function(t) for t in time_points]
+        law = get_frequency_law(self.params['law_type'], duration,
+                                self.params['start_freq'], self.params['end_freq'])
+        freq_points = law.evaluate(time_points)
         
         law_colors = {
             'linear': '#FF6B6B',
@@ -1552,25 +998,16 @@ class AutocorrelationApp:
         try:
             law_type = self.params['law_type']
             
-            # ЛЕВЫЙ ВЕРХНИЙ: Импульсная последовательность
-            time, signal, impulse_times, impulse_freqs = self.create_impulse_sequence()
-            
-            # ПРАВЫЙ ВЕРХНИЙ: Свертка с вейвлетом Рикера
-            wavelet = self.ricker_wavelet(self.params['ricker_freq'])
-            convolution = np.convolve(signal, wavelet, mode='same')
+            data = compute_legacy_sequence_analysis(self.params)
+            # Для длинной последовательности шаг дискретизации укрупняется
+            self.params = data['params']
             
-            # ЛЕВЫЙ НИЖНИЙ: Автокорреляционная функция
-            lags, autocorr = self.compute_autocorrelation(convolution)
-            lag_times = lags * self.params['dt']
-            
-            area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
-            
-            envelope_area, autocorr_residual, envelope = self.compute_envelope_area(
-                autocorr, wavelet, self.params['dt']
-            )
-            
-            # ПРАВЫЙ НИЖНИЙ: Спектр
-            spectrum_freq, spectrum = self.compute_spectrum(autocorr)
+            time, signal = data['time'], data['signal']
+            impulse_times = data['impulse_times']
+            convolution = data['convolution']
+            lag_times, autocorr, envelope = data['lag_times'], data['autocorr'], data['envelope']
+            area, envelope_area = data['area'], data['envelope_area']
+            spectrum_freq, spectrum = data['spectrum_freq'], data['spectrum']
             
             self.ax_impulse.clear()
             self.ax_convolution.clear()
@@ -1751,24 +1188,12 @@ class AutocorrelationApp:
             # Обновление графика роста частоты
             self.update_frequency_plot()
             
-            self.current_data = {
-                'time': time,
-                'signal': signal,
-                'impulse_times': impulse_times,
-                'impulse_frequencies': impulse_freqs,
-                'convolution': convolution,
-                'lag_times': lag_times,
-                'autocorr': autocorr,
-                'autocorr_residual': autocorr_residual,
-                'envelope': envelope,
-                'envelope_area': envelope_area,
-                'spectrum_freq': spectrum_freq,
-                'spectrum': spectrum,
-                'area': area,
+            self.current_data = dict(data)
+            self.current_data.update({
                 'law_type': self.params['law_type'],
                 'law_name': law_name,
                 'variable_amplitude': self.params['variable_amplitude']
-            }
+            })
             
             self.fig_freq.tight_layout()
             self.fig_top.tight_layout()
@@ -2,26 +2,226 @@ import numpy as np
 import matplotlib
 matplotlib.use('TkAgg')  # Явно указываем бэкенд для exe
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import LineCollection
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import os
-import math
-from scipy import signal as scipy_signal
-from scipy.signal import hilbert
-from pathlib import Path
+import abc
 import json
-import concurrent.futures
-import time
+import itertools
 import threading
 import traceback
 import sys
 import multiprocessing
 
+from acf_core.cancellation import CalculationCancelled
+from acf_core.params import MAX_DURATION, FrequencyRange, SequenceParams
+from acf_core.laws import get_frequency_law
+from acf_core.metrics import HEATMAP_METRICS, compute_sequence_analysis
+from acf_core.sweep import (ADAPTIVE_POINT_BUDGET, HeatmapMemoryCache, HeatmapPointCache,
+                            HeatmapSweep)
+from acf_core.optimizer import OPTIMIZER_STARTS, OPTIMIZER_MAX_EVALUATIONS, optimize_heatmap_metric
+
 # Для поддержки multiprocessing в exe
 if getattr(sys, 'frozen', False):
     multiprocessing.freeze_support()
 
+# Отрисовка карты: с какого числа отображаемых узлов карта выводится изображением,
+# а не маркерами, и до какого числа отображаемых узлов над ними подписываются значения
+HEATMAP_IMAGE_MIN_NODES = 2500
+HEATMAP_LABEL_MAX_NODES = 225
+
+
+def heatmap_as_image(node_count):
+    """Выводится ли карта с node_count отображаемыми узлами изображением, а не маркерами"""
+    return node_count > HEATMAP_IMAGE_MIN_NODES
+
+
+def fill_polygon(x, y):
+    """Вершины заливки между кривой y(x) и нулем (как у fill_between)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) == 0:
+        return np.zeros((0, 2))
+    return np.concatenate((
+        [[x[0], 0.0]],
+        np.column_stack((x, y)),
+        [[x[-1], 0.0]],
+        np.column_stack((x[::-1], np.zeros(len(x)))),
+    ))
+
+
+def stable_limits(current, low, high, margin=0.05):
+    """
+    Пределы оси для данных [low, high], меняющиеся только при необходимости
+
+    Текущие пределы сохраняются, пока данные в них помещаются и занимают не
+    меньше половины диапазона; иначе берется диапазон данных с полями.
+    Неизменные пределы позволяют обновлять график блиттингом.
+    """
+    if not np.isfinite(low) or not np.isfinite(high):
+        return current
+    span = high - low
+    if span <= 0:
+        span = abs(high) if high != 0 else 1.0
+    if current is not None:
+        cur_low, cur_high = current
+        if cur_low <= low and high <= cur_high and span >= 0.5 * (cur_high - cur_low):
+            return current
+    return (low - margin * span, high + margin * span)
+
+
+# Не меньше стольких столбцов при прореживании длинных рядов для графиков
+TRACE_MIN_COLUMNS = 200
+
+
+def minmax_decimate(x, y, x_start, x_end, columns):
+    """
+    Прореживание ряда y(x) (x возрастает) в окне [x_start, x_end]
+
+    Видимые отсчеты делятся на columns столбцов, от каждого остаются
+    минимум и максимум, поэтому узкие пики не пропадают. Если отсчетов
+    мало, они возвращаются без изменений (с соседями за краями окна).
+    """
+    start = max(int(np.searchsorted(x, x_start, side='left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, x_end, side='right')) + 1, len(x))
+    count = stop - start
+    if count <= 2 * columns:
+        return x[start:stop], y[start:stop]
+    
+    offsets = (np.arange(columns) * count) // columns
+    visible = y[start:stop]
+    values = np.empty((columns, 2))
+    values[:, 0] = np.minimum.reduceat(visible, offsets)
+    values[:, 1] = np.maximum.reduceat(visible, offsets)
+    return np.repeat(x[start + offsets], 2), values.ravel()
+
+
+def thin_marks(x, x_start, x_end, columns):
+    """Индексы отметок x в окне [x_start, x_end], не больше одной на столбец"""
+    start = int(np.searchsorted(x, x_start, side='left'))
+    stop = int(np.searchsorted(x, x_end, side='right'))
+    if stop - start <= columns:
+        return np.arange(start, stop)
+    bins = ((x[start:stop] - x_start) * (columns / (x_end - x_start))).astype(int)
+    return start + np.unique(bins, return_index=True)[1]
+
+
+class ViewDecimation(abc.ABC):
+    """
+    Длинный ряд на графике с прореживанием под текущий вид оси
+
+    Хранит полный ряд и передает на график только то, что различимо
+    в видимом окне. Прореживание пересчитывается при изменении пределов
+    оси X (масштабирование, сдвиг) и размера холста. Подклассы задают
+    отрисовку прореженного ряда в update_view.
+    """
+    
+    def __init__(self, ax):
+        self.ax = ax
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.ax.callbacks.connect('xlim_changed', self.on_view_changed)
+        self.ax.figure.canvas.mpl_connect('resize_event', self.on_view_changed)
+    
+    def set_data(self, x, y):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.update_view()
+    
+    def on_view_changed(self, event):
+        self.update_view()
+    
+    def view(self):
+        """Видимое окно по X и число столбцов пикселей в нем"""
+        x_start, x_end = self.ax.get_xlim()
+        columns = max(int(self.ax.get_window_extent().width), TRACE_MIN_COLUMNS)
+        return x_start, x_end, columns
+    
+    @abc.abstractmethod
+    def update_view(self):
+        """Передача на график ряда, прореженного под текущий вид оси"""
+
+
+class DecimatedTrace(ViewDecimation):
+    """Линия (и заливка до нуля) из минимума и максимума на столбец пикселей"""
+    
+    def __init__(self, line, fill=None):
+        self.line = line
+        self.fill = fill
+        super().__init__(line.axes)
+    
+    def update_view(self):
+        x, y = minmax_decimate(self.x, self.y, *self.view())
+        self.line.set_data(x, y)
+        if self.fill is not None:
+            self.fill.set_verts([fill_polygon(x, y)])
+
+
+class DecimatedMarks(ViewDecimation):
+    """Отметки в точках x (высотой y), не больше одной на столбец пикселей"""
+    
+    def __init__(self, ax, render):
+        self.render = render
+        super().__init__(ax)
+    
+    def update_view(self):
+        index = thin_marks(self.x, *self.view())
+        self.render(self.x[index], self.y[index])
+
+
+def axes_view_state(figure):
+    """Состояние фона фигуры: пределы осей, заголовки, подписи и легенды"""
+    state = []
+    for ax in figure.axes:
+        legend = ax.get_legend()
+        state.append((ax.get_xlim(), ax.get_ylim(), ax.get_title(), ax.get_ylabel(),
+                      None if legend is None else tuple(t.get_text() for t in legend.get_texts())))
+    return tuple(state)
+
+
+class BlitManager:
+    """
+    Перерисовка изменяющихся элементов фигуры поверх сохраненного фона
+
+    Фон (оси, сетка, подписи) запоминается при каждой полной отрисовке
+    холста, в том числе при изменении размера окна. Обновление данных
+    сводится к восстановлению фона, отрисовке элементов и blit.
+    """
+    
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+    
+    def add_artist(self, artist):
+        """Зарегистрировать постоянный элемент, данные которого обновляются на месте"""
+        artist.set_animated(True)
+        self.artists.append(artist)
+        return artist
+    
+    def on_draw(self, event):
+        """Полная отрисовка: запомнить фон и дорисовать элементы"""
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+    
+    def draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            if artist.get_visible():
+                figure.draw_artist(artist)
+    
+    def update(self, full_redraw=False):
+        """Перерисовать фигуру: блиттингом или полностью, если фон устарел"""
+        if full_redraw or self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
 class AutocorrelationApp:
     def __init__(self, root):
         self.root = root
@@ -43,17 +243,11 @@ class AutocorrelationApp:
             'dt': 0.001,
             'max_lag': 500,
             'law_type': 'exponential',
-            'variable_amplitude': False
+            'variable_amplitude': False,
+            'acf_engine': 'sparse',
+            'conv_method': 'auto'
         }
         
-        # Коэффициенты для компенсационного закона (базовые)
-        self.compensation_coefficients = [
-            [0.0005, -0.0023, 0.0785, 1.1904, 25.019],
-            [0.000035, -0.0003, 0.0160, 0.5952, 25.019],  
-            [0.000026, -0.000045, 0.0049, 0.2976, 25.019],
-            [0.000015, -0.000045, 0.0012, 0.1488, 25.019]
-        ]
-        
         # Текущие параметры
         self.params = self.default_params.copy()
         
@@ -63,9 +257,6 @@ class AutocorrelationApp:
         self.manual_vmax = {'area': None, 'center_freq': None, 'impulse_count': None, 
                            'envelope_area': None, 'max_side_peak': None}
         
-        # Кэш для автокорреляции одиночного импульса Рикера
-        self.ricker_autocorr_cache = {}
-        
         # Флаг для остановки расчета
         self.calculation_stopped = False
         self.calculation_thread = None
@@ -79,6 +270,10 @@ class AutocorrelationApp:
         self.update_timer = None
         self.heatmap_timer = None
         
+        # Фоновый пересчет основного окна: номер последнего запуска и его признак отмены
+        self.plot_generation = 0
+        self.plot_cancel = None
+        
         # Настройка стилей для черного шрифта на кнопках
         self.setup_button_styles()
         
@@ -97,87 +292,6 @@ class AutocorrelationApp:
             traceback.print_exc()
             messagebox.showerror("Ошибка", f"Ошибка при инициализации:\n{str(e)}")
     
-    def get_ricker_autocorrelation(self, frequency, params):
-        """
-        Получение автокорреляции одиночного импульса Рикера с самим собой
-        с использованием кэширования
-        """
-        # Создаем ключ для кэша на основе частоты и параметров
-        cache_key = (frequency, params['dt'])
-        
-        if cache_key not in self.ricker_autocorr_cache:
-            # Создаем одиночный импульс Рикера
-            wavelet = self.ricker_wavelet_with_params(frequency, params)
-            
-            # Вычисляем автокорреляцию импульса с самим собой
-            autocorr = np.correlate(wavelet, wavelet, mode='full')
-            
-            # Нормализуем
-            max_val = np.max(np.abs(autocorr))
-            if max_val > 0:
-                autocorr = autocorr / max_val
-            
-            # Сохраняем в кэш
-            self.ricker_autocorr_cache[cache_key] = autocorr
-        
-        return self.ricker_autocorr_cache[cache_key]
-    
-    def compute_envelope_area_and_max_side_peak(self, autocorr, wavelet, dt, ricker_freq):
-        """
-        Вычисление площади под огибающей АКФ и максимального побочного пика
-        после вычета автокорреляции одиночного импульса Рикера
-        """
-        # Получаем автокорреляцию одиночного импульса Рикера
-        ricker_autocorr = self.get_ricker_autocorrelation(ricker_freq, self.params)
-        
-        n_autocorr = len(autocorr)
-        n_ricker_autocorr = len(ricker_autocorr)
-        
-        # Масштабируем автокорреляцию одиночного импульса до размера основной АКФ
-        if n_ricker_autocorr > n_autocorr:
-            # Обрезаем до размера основной АКФ
-            start_idx = (n_ricker_autocorr - n_autocorr) // 2
-            ricker_scaled = ricker_autocorr[start_idx:start_idx + n_autocorr]
-        else:
-            # Дополняем нулями до размера основной АКФ
-            ricker_scaled = np.zeros(n_autocorr)
-            start_idx = (n_autocorr - n_ricker_autocorr) // 2
-            ricker_scaled[start_idx:start_idx + n_ricker_autocorr] = ricker_autocorr
-        
-        # Вычитаем автокорреляцию одиночного импульса
-        autocorr_residual = autocorr - ricker_scaled
-        
-        # Вычисляем огибающую остатка
-        try:
-            envelope = np.abs(hilbert(autocorr_residual))
-        except:
-            envelope = np.abs(autocorr_residual)
-        
-        # Вычисляем площадь под огибающей
-        envelope_area = np.trapz(np.abs(envelope), dx=dt)
-        
-        # Находим максимальный побочный пик (исключая центральный пик)
-        center_idx = len(autocorr) // 2
-        
-        # Рассматриваем только правую половину (или левую, они симметричны)
-        # Исключаем центральный пик (берем интервал от центра+5 отсчетов до конца)
-        side_start = center_idx + 5
-        side_end = len(autocorr_residual)
-        
-        if side_start < side_end:
-            # Берем абсолютные значения остатка для поиска пиков
-            abs_residual = np.abs(autocorr_residual[side_start:side_end])
-            max_side_peak = np.max(abs_residual) if len(abs_residual) > 0 else 0
-            
-            # Находим индекс максимума для отметки на графике
-            max_side_idx_local = np.argmax(abs_residual)
-            max_side_idx_global = side_start + max_side_idx_local
-        else:
-            max_side_peak = 0
-            max_side_idx_global = center_idx
-        
-        return envelope_area, autocorr_residual, envelope, ricker_scaled, max_side_peak, max_side_idx_global
-    
     def handle_tkinter_exception(self, exc, val, tb):
         """Обработчик исключений tkinter"""
         print("="*50)
@@ -329,9 +443,15 @@ class AutocorrelationApp:
         self.end_freq_entry = ttk.Entry(control_frame, textvariable=self.end_freq_var, width=15)
         self.end_freq_entry.grid(row=5, column=1, padx=5, pady=2)
         
+        # Шаг дискретизации (мс)
+        ttk.Label(control_frame, text="Шаг дискретизации (мс):").grid(row=6, column=0, sticky=tk.W, pady=2)
+        self.dt_var = tk.DoubleVar(value=self.params['dt'] * 1000)
+        self.dt_entry = ttk.Entry(control_frame, textvariable=self.dt_var, width=15)
+        self.dt_entry.grid(row=6, column=1, padx=5, pady=2)
+        
         # Закон изменения частоты
         ttk.Label(control_frame, text="Закон изменения частоты:", 
-                 font=('Arial', 9, 'bold')).grid(row=6, column=0, columnspan=2, pady=(10, 5), sticky=tk.W)
+                 font=('Arial', 9, 'bold')).grid(row=7, column=0, columnspan=2, pady=(10, 5), sticky=tk.W)
         
         self.law_type_var = tk.StringVar(value=self.params['law_type'])
         law_types = [('Линейный', 'linear'), 
@@ -343,17 +463,17 @@ class AutocorrelationApp:
         for i, (text, value) in enumerate(law_types):
             rb = ttk.Radiobutton(control_frame, text=text, variable=self.law_type_var, 
                                 value=value, command=self.on_law_type_change)
-            rb.grid(row=7+i, column=0, columnspan=2, sticky=tk.W, padx=20, pady=2)
+            rb.grid(row=8+i, column=0, columnspan=2, sticky=tk.W, padx=20, pady=2)
         
         # Новая опция: изменение амплитуды импульсов
         self.var_amp_var = tk.BooleanVar(value=self.params['variable_amplitude'])
         self.var_amp_check = ttk.Checkbutton(control_frame, text="Учет изменения амплитуды ударов",
                                            variable=self.var_amp_var, command=self.on_var_amp_change)
-        self.var_amp_check.grid(row=12, column=0, columnspan=2, sticky=tk.W, padx=20, pady=(10, 5))
+        self.var_amp_check.grid(row=13, column=0, columnspan=2, sticky=tk.W, padx=20, pady=(10, 5))
         
         # Кнопки управления
         button_frame = ttk.Frame(control_frame)
-        button_frame.grid(row=13, column=0, columnspan=2, pady=(20, 10))
+        button_frame.grid(row=14, column=0, columnspan=2, pady=(20, 10))
         
         ttk.Button(button_frame, text="Подбор параметров", 
                   command=self.open_parameter_optimization, width=25,
@@ -399,12 +519,19 @@ class AutocorrelationApp:
         self.canvas_top = FigureCanvasTkAgg(self.fig_top, graph_frame)
         self.canvas_top.get_tk_widget().pack(fill=tk.BOTH, expand=False, pady=(0, 5))
         
+        # Панель навигации: масштабирование и сдвиг по всей длине последовательности
+        self.toolbar_top = NavigationToolbar2Tk(self.canvas_top, graph_frame, pack_toolbar=False)
+        self.toolbar_top.update()
+        self.toolbar_top.pack(fill=tk.X)
+        
         # Нижние графики
         self.fig_bottom = plt.Figure(figsize=(12, 6), dpi=100)
         self.ax_autocorr = self.fig_bottom.add_subplot(121)
         self.ax_spectrum = self.fig_bottom.add_subplot(122)
         self.canvas_bottom = FigureCanvasTkAgg(self.fig_bottom, graph_frame)
         self.canvas_bottom.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        
+        self.setup_main_plots()
     
     def open_parameter_optimization(self):
         """Открыть окно подбора параметров"""
@@ -420,6 +547,11 @@ class AutocorrelationApp:
         
         self._optimization_open = True
         
+        # Куб метрик прошлого сеанса подбора больше не актуален
+        if hasattr(self, 'current_heatmap_cube'):
+            del self.current_heatmap_cube
+        self.current_heatmap_quadtree = None
+        
         # Создаем новое окно
         self.optimization_window = tk.Toplevel(self.root)
         self.optimization_window.title("Подбор параметров частот")
@@ -435,7 +567,9 @@ class AutocorrelationApp:
             'law_type': self.params['law_type'],
             'variable_amplitude': self.params['variable_amplitude'],
             'dt': self.params['dt'],
-            'max_lag': self.params['max_lag']
+            'max_lag': self.params['max_lag'],
+            'acf_engine': self.params['acf_engine'],
+            'conv_method': self.params['conv_method']
         }
         
         # Параметры перебора по умолчанию
@@ -446,7 +580,11 @@ class AutocorrelationApp:
             'end_freq_min': 30.0,
             'end_freq_max': 60.0,
             'end_freq_step': 2.0,
-            'heatmap_type': 'envelope_area'
+            'heatmap_type': 'envelope_area',
+            'executor_backend': 'process',
+            'sweep_mode': 'uniform',
+            'adaptive_budget': ADAPTIVE_POINT_BUDGET,
+            'optimizer_evaluations': OPTIMIZER_MAX_EVALUATIONS
         }
         
         # Создаем интерфейс окна подбора
@@ -483,6 +621,38 @@ class AutocorrelationApp:
         fixed_text = f"Частота Рикера: {self.fixed_params['ricker_freq']} Гц"
         ttk.Label(fixed_frame, text=fixed_text, font=('Arial', 9, 'bold')).pack(side=tk.LEFT, padx=5)
         
+        # Метод расчета АКФ точки карты
+        ttk.Label(fixed_frame, text="Метод АКФ:", 
+                 font=('Arial', 9, 'bold')).pack(side=tk.LEFT, padx=(40, 10))
+        
+        acf_engines = [('Разреженный', 'sparse'),
+                      ('Плотный', 'dense'),
+                      ('Аналитический', 'analytic')]
+        engine_value_map = {e[0]: e[1] for e in acf_engines}
+        engine_name_map = {e[1]: e[0] for e in acf_engines}
+        
+        self.opt_acf_engine_var = tk.StringVar(value=engine_name_map[self.fixed_params['acf_engine']])
+        engine_combo = ttk.Combobox(fixed_frame, textvariable=self.opt_acf_engine_var,
+                                   values=[e[0] for e in acf_engines], state='readonly', width=15)
+        engine_combo.pack(side=tk.LEFT, padx=5)
+        engine_combo.bind('<<ComboboxSelected>>',
+                         lambda e: self.on_opt_acf_engine_change(engine_value_map[engine_combo.get()]))
+        
+        # Вычислители: потоки или процессы (по числу ядер)
+        ttk.Label(fixed_frame, text="Вычислители:", 
+                 font=('Arial', 9, 'bold')).pack(side=tk.LEFT, padx=(40, 10))
+        
+        backends = [('Процессы', 'process'), ('Потоки', 'thread')]
+        backend_value_map = {b[0]: b[1] for b in backends}
+        backend_name_map = {b[1]: b[0] for b in backends}
+        
+        self.opt_backend_var = tk.StringVar(value=backend_name_map[self.opt_params['executor_backend']])
+        backend_combo = ttk.Combobox(fixed_frame, textvariable=self.opt_backend_var,
+                                    values=[b[0] for b in backends], state='readonly', width=10)
+        backend_combo.pack(side=tk.LEFT, padx=5)
+        backend_combo.bind('<<ComboboxSelected>>',
+                          lambda e: self.opt_params.update(executor_backend=backend_value_map[backend_combo.get()]))
+        
         # Длительность последовательности с кнопками-стрелками
         duration_frame = ttk.Frame(param_frame)
         duration_frame.grid(row=1, column=0, columnspan=4, sticky=tk.W, pady=(0, 10))
@@ -589,6 +759,17 @@ class AutocorrelationApp:
         self.end_freq_step_var = tk.DoubleVar(value=self.opt_params['end_freq_step'])
         ttk.Entry(param_frame, textvariable=self.end_freq_step_var, width=8).grid(row=6, column=5, padx=5, pady=2)
         
+        # Адаптивный перебор: грубая сетка со сгущением вокруг минимумов
+        self.adaptive_sweep_var = tk.BooleanVar(value=self.opt_params['sweep_mode'] == 'adaptive')
+        ttk.Checkbutton(param_frame, text="Адаптивный перебор",
+                       variable=self.adaptive_sweep_var).grid(row=4, column=6, sticky=tk.W, padx=(20, 0), pady=2)
+        
+        budget_frame = ttk.Frame(param_frame)
+        budget_frame.grid(row=4, column=7, sticky=tk.W, padx=(20, 0), pady=2)
+        ttk.Label(budget_frame, text="Бюджет точек:").pack(side=tk.LEFT, padx=(0, 5))
+        self.adaptive_budget_var = tk.IntVar(value=self.opt_params['adaptive_budget'])
+        ttk.Entry(budget_frame, textvariable=self.adaptive_budget_var, width=8).pack(side=tk.LEFT)
+        
         # Кнопка расчета
         ttk.Button(param_frame, text="Пересчитать", 
                   command=self.safe_calculate_heatmap, width=20).grid(row=6, column=6, padx=(20, 0), pady=5)
@@ -598,6 +779,16 @@ class AutocorrelationApp:
                                      command=self.stop_calculation, width=20, state='disabled')
         self.stop_button.grid(row=6, column=7, padx=(20, 0), pady=5)
         
+        # Оптимизатор: поиск минимума выбранной метрики без полного перебора
+        ttk.Button(param_frame, text="Оптимизировать", 
+                  command=self.optimize_frequencies, width=20).grid(row=5, column=6, padx=(20, 0), pady=5)
+        
+        evaluations_frame = ttk.Frame(param_frame)
+        evaluations_frame.grid(row=5, column=7, sticky=tk.W, padx=(20, 0), pady=2)
+        ttk.Label(evaluations_frame, text="Вычислений:").pack(side=tk.LEFT, padx=(0, 5))
+        self.optimizer_evaluations_var = tk.IntVar(value=self.opt_params['optimizer_evaluations'])
+        ttk.Entry(evaluations_frame, textvariable=self.optimizer_evaluations_var, width=8).pack(side=tk.LEFT)
+        
         # Область с тепловой картой и палитрой
         heatmap_frame = ttk.Frame(main_opt_frame)
         heatmap_frame.pack(fill=tk.BOTH, expand=True)
@@ -610,6 +801,8 @@ class AutocorrelationApp:
         
         self.fig_heatmap = plt.Figure(figsize=(8, 5.5), dpi=100)
         self.ax_heatmap = self.fig_heatmap.add_subplot(111)
+        self._heatmap_progress_artists = None
+        self._heatmap_mappable = None
         self.canvas_heatmap = FigureCanvasTkAgg(self.fig_heatmap, heatmap_left)
         self.canvas_heatmap.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
@@ -717,8 +910,14 @@ class AutocorrelationApp:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(f"Начальная_частота_Гц\tКонечная_частота_Гц\tДлительность_сек\tЧастота_Рикера_Гц\t{metric_name}\n")
                 
+                quadtree = getattr(self, 'current_heatmap_quadtree', None)
+                
                 for j in range(len(end_freqs)):
                     for i in range(len(start_freqs)):
+                        # При адаптивном переборе выгружаются только посчитанные узлы
+                        if quadtree is not None and not quadtree.computed[j, i]:
+                            continue
+                        
                         start_freq = start_freqs[i]
                         end_freq = end_freqs[j]
                         value = matrix[j, i]
@@ -749,8 +948,8 @@ class AutocorrelationApp:
             
             if new_duration < 1:
                 new_duration = 1
-            elif new_duration > 100:
-                new_duration = 100
+            elif new_duration > MAX_DURATION:
+                new_duration = MAX_DURATION
             
             self.opt_duration_var.set(new_duration)
             self.fixed_params['duration'] = new_duration
@@ -767,7 +966,37 @@ class AutocorrelationApp:
         if hasattr(self, 'heatmap_type_var'):
             current_type = self.heatmap_type_var.get()
             self.update_palette_fields_for_type(current_type)
-            self.safe_calculate_heatmap()
+            
+            # Все метрики уже посчитаны - достаточно показать другой срез куба
+            if hasattr(self, 'current_heatmap_cube'):
+                self.show_heatmap_metric()
+            else:
+                self.safe_calculate_heatmap()
+    
+    def show_heatmap_metric(self):
+        """Отображение выбранной метрики из рассчитанного куба"""
+        if not hasattr(self, 'current_heatmap_cube'):
+            return
+        
+        start_freqs, end_freqs, cube = self.current_heatmap_cube
+        heatmap_type = self.heatmap_type_var.get()
+        matrix = cube[HEATMAP_METRICS.index(heatmap_type)]
+        
+        self.current_heatmap_data = (start_freqs, end_freqs, matrix, heatmap_type)
+        self.update_heatmap(start_freqs, end_freqs, matrix, heatmap_type,
+                            getattr(self, 'current_heatmap_quadtree', None))
+        
+        heatmap_type_names = {
+            'area': 'Площадь АКФ', 
+            'center_freq': 'Центральная частота', 
+            'impulse_count': 'Число импульсов',
+            'envelope_area': 'Пл. под огиб. АКФ',
+            'max_side_peak': 'Макс. побочный пик АКФ'
+        }
+        try:
+            self.optimization_window.title(f"Подбор параметров частот - {heatmap_type_names[heatmap_type]}")
+        except:
+            pass
     
     def update_palette_fields_for_type(self, heatmap_type):
         """Обновление полей ввода палитры для указанного типа карты"""
@@ -822,7 +1051,7 @@ class AutocorrelationApp:
             else:
                 self.manual_vmax[heatmap_type] = float(max_val_str)
             
-            self.update_heatmap_visualization()
+            self.update_heatmap_palette()
             
         except ValueError:
             messagebox.showerror("Ошибка", "Некорректное значение границ палитры")
@@ -836,13 +1065,47 @@ class AutocorrelationApp:
         self.manual_vmin[heatmap_type] = None
         self.manual_vmax[heatmap_type] = None
         self.update_palette_fields_for_type(heatmap_type)
-        self.update_heatmap_visualization()
+        self.update_heatmap_palette()
+    
+    def heatmap_palette_bounds(self, matrix, heatmap_type):
+        """Границы палитры: ручные либо по положительным значениям карты"""
+        vmin = self.manual_vmin[heatmap_type]
+        vmax = self.manual_vmax[heatmap_type]
+        
+        if vmin is None:
+            vmin = np.min(matrix[matrix > 0]) if np.any(matrix > 0) else 0
+        
+        if vmax is None:
+            vmax = np.max(matrix)
+        
+        return vmin, vmax
+    
+    def update_heatmap_palette(self):
+        """
+        Применить границы палитры к уже нарисованной карте
+        
+        Меняются только нормировка коллекции и цветовая шкала; если карта
+        еще не построена или показан другой тип, она перерисовывается целиком.
+        """
+        heatmap_type = self.heatmap_type_var.get()
+        if self._heatmap_mappable is None or self._heatmap_mappable[0] != heatmap_type:
+            self.update_heatmap_visualization()
+            return
+        
+        try:
+            _, matrix, mappable = self._heatmap_mappable
+            mappable.set_clim(*self.heatmap_palette_bounds(matrix, heatmap_type))
+            self.canvas_heatmap.draw_idle()
+            self.canvas_colorbar.draw_idle()
+        except Exception as e:
+            print(f"Ошибка при обновлении палитры: {e}")
     
     def update_heatmap_visualization(self):
         """Обновить визуализацию тепловой карты с текущими данными"""
         if hasattr(self, 'current_heatmap_data'):
             start_freqs, end_freqs, matrix, heatmap_type = self.current_heatmap_data
-            self.update_heatmap(start_freqs, end_freqs, matrix, heatmap_type)
+            self.update_heatmap(start_freqs, end_freqs, matrix, heatmap_type,
+                                getattr(self, 'current_heatmap_quadtree', None))
     
     def on_duration_changed(self):
         """Обработка изменения длительности из поля ввода"""
@@ -850,8 +1113,8 @@ class AutocorrelationApp:
             new_duration = float(self.opt_duration_var.get())
             if new_duration < 1:
                 raise ValueError("Длительность должна быть >= 1")
-            if new_duration > 100:
-                raise ValueError("Длительность не должна превышать 100 сек")
+            if new_duration > MAX_DURATION:
+                raise ValueError(f"Длительность не должна превышать {MAX_DURATION} сек")
             
             self.fixed_params['duration'] = new_duration
             self.safe_calculate_heatmap()
@@ -867,109 +1130,31 @@ class AutocorrelationApp:
         self.fixed_params['law_type'] = law_type
         self.safe_calculate_heatmap()
     
+    def on_opt_acf_engine_change(self, acf_engine):
+        """Обработка изменения метода расчета АКФ в окне оптимизации"""
+        self.fixed_params['acf_engine'] = acf_engine
+        self.safe_calculate_heatmap()
+    
     def on_opt_var_amp_change(self):
         """Обработка изменения опции переменной амплитуды в окне оптимизации"""
         self.fixed_params['variable_amplitude'] = self.opt_var_amp_var.get()
         self.safe_calculate_heatmap()
     
-    def calculate_single_point(self, task_data):
-        """Функция для расчета одной точки тепловой карты (выполняется в потоке)"""
-        try:
-            i = task_data['i']
-            j = task_data['j']
-            start_freq = task_data['start_freq']
-            end_freq = task_data['end_freq']
-            fixed_params = task_data['fixed_params']
-            heatmap_type = task_data['heatmap_type']
-            
-            temp_params = fixed_params.copy()
-            temp_params['start_freq'] = start_freq
-            temp_params['end_freq'] = end_freq
-            
-            duration = temp_params['duration']
-            dt = temp_params['dt']
-            total_samples = int(duration / dt)
-            
-            MAX_SAMPLES = 1000000
-            if total_samples > MAX_SAMPLES:
-                temp_params['dt'] = max(dt, duration / MAX_SAMPLES)
-                dt = temp_params['dt']
-            
-            impulse_times = self.create_impulse_times_only(temp_params)
-            
-            if len(impulse_times) > 100000:
-                return (i, j, 0)
-            
-            signal_len = int(duration / dt) + 1
-            if signal_len > 1000000:
-                return (i, j, 0)
-                
-            signal = np.zeros(signal_len)
-            if temp_params['variable_amplitude'] and len(impulse_times) > 0:
-                for idx, t in enumerate(impulse_times):
-                    sample_idx = int(t / dt)
-                    if 0 <= sample_idx < len(signal):
-                        amplitude = 1.0 + (idx / (len(impulse_times) - 1)) if len(impulse_times) > 1 else 1.0
-                        signal[sample_idx] = amplitude
-            else:
-                for t in impulse_times:
-                    sample_idx = int(t / dt)
-                    if 0 <= sample_idx < len(signal):
-                        signal[sample_idx] = 1.0
-            
-            wavelet = self.ricker_wavelet_with_params(temp_params['ricker_freq'], temp_params)
-            
-            if len(signal) + len(wavelet) - 1 > 2000000:
-                return (i, j, 0)
-            
-            convolution = np.convolve(signal, wavelet, mode='same')
-            
-            max_lag = temp_params['max_lag']
-            n = len(convolution)
-            
-            if n > 200000:
-                max_lag = min(max_lag, 200)
-            
-            autocorr = np.correlate(convolution, convolution, mode='full')
-            autocorr = autocorr[n-1-max_lag:n+max_lag]
-            
-            max_val = np.max(np.abs(autocorr))
-            if max_val > 0:
-                autocorr = autocorr / max_val
-            
-            if heatmap_type == 'area':
-                lag_times = np.arange(-max_lag, max_lag + 1) * dt
-                area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
-                value = area
-                
-            elif heatmap_type == 'center_freq':
-                center_freq = (start_freq + end_freq) / 2
-                value = center_freq
-                
-            elif heatmap_type == 'impulse_count':
-                num_impulses = len(impulse_times)
-                value = num_impulses
-                
-            elif heatmap_type == 'envelope_area':
-                envelope_area, _, _, _, _, _ = self.compute_envelope_area_and_max_side_peak(
-                    autocorr, wavelet, dt, temp_params['ricker_freq']
-                )
-                value = envelope_area
-                
-            elif heatmap_type == 'max_side_peak':
-                _, _, _, _, max_side_peak, _ = self.compute_envelope_area_and_max_side_peak(
-                    autocorr, wavelet, dt, temp_params['ricker_freq']
-                )
-                value = max_side_peak
-            
-            else:
-                value = 0
-            
-            return (i, j, value)
-            
-        except Exception as e:
-            print(f"Ошибка для f0={start_freq}, f1={end_freq}: {str(e)}")
-            return (i, j, 0)
+    def get_heatmap_memory_cache(self):
+        """Кэш точек тепловой карты в памяти, общий для всех расчетов сеанса"""
+        if not hasattr(self, 'heatmap_memory_cache'):
+            self.heatmap_memory_cache = HeatmapMemoryCache()
+        return self.heatmap_memory_cache
+    
+    def get_heatmap_cache(self):
+        """Постоянный кэш точек тепловой карты (None, если недоступен)"""
+        if not hasattr(self, 'heatmap_cache'):
+            try:
+                self.heatmap_cache = HeatmapPointCache()
+            except Exception as e:
+                print(f"Кэш тепловой карты недоступен: {e}")
+                self.heatmap_cache = None
+        return self.heatmap_cache
     
     def calculate_heatmap_in_thread(self):
         """Расчет тепловой карты в отдельном потоке"""
@@ -991,12 +1176,19 @@ class AutocorrelationApp:
             if end_freq_min >= end_freq_max:
                 raise ValueError("Минимальная конечная частота должна быть меньше максимальной")
             
-            start_freqs = np.arange(start_freq_min, start_freq_max + start_freq_step/2, start_freq_step)
-            end_freqs = np.arange(end_freq_min, end_freq_max + end_freq_step/2, end_freq_step)
+            start_freqs = FrequencyRange(start_freq_min, start_freq_max, start_freq_step).values()
+            end_freqs = FrequencyRange(end_freq_min, end_freq_max, end_freq_step).values()
             
             total_points = len(start_freqs) * len(end_freqs)
             
-            if total_points > 25000:
+            adaptive = self.adaptive_sweep_var.get()
+            point_budget = int(self.adaptive_budget_var.get())
+            if adaptive and point_budget <= 0:
+                raise ValueError("Бюджет точек должен быть > 0")
+            self.opt_params['sweep_mode'] = 'adaptive' if adaptive else 'uniform'
+            self.opt_params['adaptive_budget'] = point_budget
+            
+            if not adaptive and total_points > 25000:
                 response = messagebox.askyesno(
                     "Предупреждение",
                     f"Будет рассчитано {total_points} точек.\n"
@@ -1007,8 +1199,6 @@ class AutocorrelationApp:
                     self._heatmap_updating = False
                     return
             
-            matrix = np.zeros((len(end_freqs), len(start_freqs)))
-            
             heatmap_type_names = {
                 'area': 'Площадь АКФ', 
                 'center_freq': 'Центральная частота', 
@@ -1017,72 +1207,168 @@ class AutocorrelationApp:
                 'max_side_peak': 'Макс. побочный пик АКФ'
             }
             
-            self.root.after(0, self.show_progress_window, total_points, heatmap_type_names[heatmap_type])
-            
-            tasks = []
-            for i, start_freq in enumerate(start_freqs):
-                for j, end_freq in enumerate(end_freqs):
-                    if start_freq < end_freq:
-                        tasks.append({
-                            'i': i,
-                            'j': j,
-                            'start_freq': start_freq,
-                            'end_freq': end_freq,
-                            'fixed_params': self.fixed_params.copy(),
-                            'heatmap_type': heatmap_type
-                        })
-                    else:
-                        matrix[j, i] = 0
-            
-            max_workers = min(8, len(tasks))
-            completed = 0
+            # Все метрики считаются за один проход: куб (метрика, конечная, начальная частота)
+            sweep = HeatmapSweep(start_freqs, end_freqs, self.fixed_params,
+                                 backend=self.opt_params.get('executor_backend', 'thread'),
+                                 memory_cache=self.get_heatmap_memory_cache(),
+                                 disk_cache=self.get_heatmap_cache(),
+                                 progress_callback=lambda progress: self.root.after(
+                                     0, self.update_progress, progress),
+                                 stop_check=lambda: self.calculation_stopped,
+                                 snapshot_callback=lambda cube, computed, pending: self.root.after(
+                                     0, self.show_heatmap_progress, start_freqs, end_freqs,
+                                     cube, computed, pending))
+            
+            self.root.after(0, self.show_progress_window,
+                            min(sweep.total, point_budget) if adaptive else sweep.total,
+                            heatmap_type_names[heatmap_type])
+            
+            with sweep:
+                if adaptive:
+                    # Узлы сгущаются вокруг минимумов и перепадов выбранной метрики
+                    finished = sweep.run_adaptive(heatmap_type, point_budget)
+                else:
+                    finished = sweep.run_uniform()
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_task = {executor.submit(self.calculate_single_point, task): task for task in tasks}
-                
-                for future in concurrent.futures.as_completed(future_to_task):
-                    if self.calculation_stopped:
-                        executor.shutdown(wait=False, cancel_futures=True)
-                        self.root.after(0, self.hide_progress_window)
-                        self.root.after(0, lambda: messagebox.showinfo("Остановлено", "Расчет тепловой карты остановлен пользователем"))
-                        self._heatmap_updating = False
-                        return
-                    
-                    try:
-                        i, j, value = future.result()
-                        matrix[j, i] = value
-                        completed += 1
-                        
-                        self.root.after(0, self.update_progress, completed, total_points)
-                        
-                    except Exception as e:
-                        print(f"Ошибка при расчете точки: {e}")
+            if not finished:
+                self.root.after(0, self.hide_progress_window)
+                self.root.after(0, lambda: messagebox.showinfo("Остановлено", "Расчет тепловой карты остановлен пользователем"))
+                return
             
             if not self.calculation_stopped:
                 self.root.after(0, self.hide_progress_window)
                 
-                self.current_heatmap_data = (start_freqs, end_freqs, matrix, heatmap_type)
+                self.current_heatmap_cube = (start_freqs, end_freqs, sweep.cube)
+                self.current_heatmap_quadtree = sweep.quadtree
                 
-                self.root.after(0, self.update_heatmap, start_freqs, end_freqs, matrix, heatmap_type)
-                
-                heatmap_type_name = heatmap_type_names[heatmap_type]
-                self.root.after(0, lambda: self.optimization_window.title(f"Подбор параметров частот - {heatmap_type_name}"))
+                self.root.after(0, self.show_heatmap_metric)
             
         except Exception as e:
             self.root.after(0, self.hide_progress_window)
-            self.root.after(0, lambda: messagebox.showerror("Ошибка расчета", f"Ошибка при построении тепловой карты:\n{str(e)}"))
+            msg = str(e)
+            self.root.after(0, lambda msg=msg: messagebox.showerror("Ошибка расчета", f"Ошибка при построении тепловой карты:\n{msg}"))
         finally:
             self.calculation_stopped = False
             self.calculation_thread = None
             self._heatmap_updating = False
             self.root.after(0, lambda: self.stop_button.config(state='disabled'))
     
+    def optimize_frequencies(self):
+        """Запуск оптимизатора (f0, f1) в отдельном потоке"""
+        if hasattr(self, 'calculation_thread') and self.calculation_thread and self.calculation_thread.is_alive():
+            messagebox.showwarning("Предупреждение", "Расчет уже выполняется")
+            return
+        
+        self.calculation_stopped = False
+        try:
+            self.stop_button.config(state='normal')
+        except:
+            pass
+        
+        self.calculation_thread = threading.Thread(target=self.optimize_frequencies_in_thread, daemon=True)
+        self.calculation_thread.start()
+    
+    def optimize_frequencies_in_thread(self):
+        """Поиск минимума выбранной метрики по (f0, f1) в отдельном потоке"""
+        try:
+            start_freq_min = float(self.start_freq_min_var.get())
+            start_freq_max = float(self.start_freq_max_var.get())
+            start_freq_step = float(self.start_freq_step_var.get())
+            end_freq_min = float(self.end_freq_min_var.get())
+            end_freq_max = float(self.end_freq_max_var.get())
+            end_freq_step = float(self.end_freq_step_var.get())
+            max_evaluations = int(self.optimizer_evaluations_var.get())
+            heatmap_type = self.heatmap_type_var.get()
+            
+            if start_freq_min <= 0 or end_freq_min <= 0:
+                raise ValueError("Частоты должны быть > 0")
+            if start_freq_step <= 0 or end_freq_step <= 0:
+                raise ValueError("Шаги частот должны быть > 0")
+            if start_freq_min >= start_freq_max or end_freq_min >= end_freq_max:
+                raise ValueError("Минимальная частота должна быть меньше максимальной")
+            if max_evaluations < 10:
+                raise ValueError("Число вычислений должно быть >= 10")
+            self.opt_params['optimizer_evaluations'] = max_evaluations
+            
+            self.root.after(0, self.show_progress_window, OPTIMIZER_STARTS, "оптимизатора")
+            
+            # Точность поиска - половина шага сетки перебора
+            result = optimize_heatmap_metric(
+                self.fixed_params, heatmap_type,
+                ((start_freq_min, start_freq_max), (end_freq_min, end_freq_max)),
+                min(start_freq_step, end_freq_step) / 2,
+                max_evaluations=max_evaluations,
+                backend=self.opt_params.get('executor_backend', 'thread'),
+                progress_callback=lambda progress: self.root.after(
+                    0, self.update_progress, progress),
+                stop_check=lambda: self.calculation_stopped)
+            
+            self.root.after(0, self.hide_progress_window)
+            if result is None:
+                self.root.after(0, lambda: messagebox.showinfo("Остановлено", "Оптимизация остановлена пользователем"))
+                return
+            
+            self.root.after(0, self.show_optimizer_result, result, heatmap_type)
+            
+        except Exception as e:
+            self.root.after(0, self.hide_progress_window)
+            msg = str(e)
+            self.root.after(0, lambda msg=msg: messagebox.showerror("Ошибка оптимизации", f"Ошибка при поиске оптимума:\n{msg}"))
+        finally:
+            self.calculation_stopped = False
+            self.calculation_thread = None
+            self.root.after(0, lambda: self.stop_button.config(state='disabled'))
+    
+    def show_optimizer_result(self, result, heatmap_type):
+        """Отображение траекторий оптимизатора на карте и загрузка лучшей точки в основное окно"""
+        best_f0, best_f1, best_values = result['best']
+        
+        try:
+            coarse = np.array(result['coarse'])
+            self.ax_heatmap.plot(coarse[:, 0], coarse[:, 1], 'o', color='gray',
+                                 markersize=3, alpha=0.6, zorder=5)
+            for trajectory in result['trajectories']:
+                if trajectory:
+                    points = np.array(trajectory)
+                    self.ax_heatmap.plot(points[:, 0], points[:, 1], '.-', color='black',
+                                         linewidth=0.8, markersize=3, zorder=5)
+            self.ax_heatmap.plot(best_f0, best_f1, '*', color='magenta', markersize=16,
+                                 markeredgecolor='black', zorder=6)
+            
+            if not hasattr(self, 'current_heatmap_data'):
+                # Карты еще нет - оси по диапазонам перебора
+                self.ax_heatmap.set_xlim(float(self.start_freq_min_var.get()), float(self.start_freq_max_var.get()))
+                self.ax_heatmap.set_ylim(float(self.end_freq_min_var.get()), float(self.end_freq_max_var.get()))
+                self.ax_heatmap.set_xlabel('Начальная частота (Гц)', fontsize=10)
+                self.ax_heatmap.set_ylabel('Конечная частота (Гц)', fontsize=10)
+            self.canvas_heatmap.draw()
+        except Exception as e:
+            print(f"Ошибка при отображении траекторий: {e}")
+        
+        # Лучшая точка загружается в основное окно вместе с параметрами окна подбора
+        self.start_freq_var.set(round(best_f0, 3))
+        self.end_freq_var.set(round(best_f1, 3))
+        self.duration_var.set(self.fixed_params['duration'])
+        self.law_type_var.set(self.fixed_params['law_type'])
+        self.var_amp_var.set(self.fixed_params['variable_amplitude'])
+        self.safe_update_plots()
+        
+        value = best_values[HEATMAP_METRICS.index(heatmap_type)]
+        messagebox.showinfo(
+            "Оптимум найден",
+            f"Начальная частота: {best_f0:.3f} Гц\n"
+            f"Конечная частота: {best_f1:.3f} Гц\n"
+            f"Значение метрики: {value:.6g}\n"
+            f"Вычислений: {result['evaluations']}\n\n"
+            f"Точка загружена в основное окно"
+        )
+    
     def show_progress_window(self, total_points, heatmap_type_name):
         """Показать окно прогресса"""
         try:
             self.progress_window = tk.Toplevel(self.optimization_window)
             self.progress_window.title("Прогресс расчета")
-            self.progress_window.geometry("300x150")
+            self.progress_window.geometry("300x240")
             self.progress_window.attributes('-topmost', True)
             
             self.progress_window.update_idletasks()
@@ -1095,22 +1381,53 @@ class AutocorrelationApp:
             
             self.progress_var = tk.DoubleVar()
             self.progress_bar = ttk.Progressbar(self.progress_window, variable=self.progress_var, 
-                                              maximum=total_points, length=250)
+                                              maximum=max(total_points, 1), length=250)
             self.progress_bar.pack(pady=10)
             
+            # Скорость, время, вычислители и доля точек из кэша
+            self.progress_stats_vars = [tk.StringVar() for _ in range(4)]
+            for var in self.progress_stats_vars:
+                ttk.Label(self.progress_window, textvariable=var, font=('Arial', 9)).pack()
+            
             self.stop_progress_button = ttk.Button(self.progress_window, text="Остановить", 
                                                  command=self.stop_calculation, width=15)
             self.stop_progress_button.pack(pady=5)
         except:
             pass
     
-    def update_progress(self, completed, total):
-        """Обновить прогресс"""
+    def update_progress(self, progress):
+        """
+        Обновить прогресс
+        
+        progress - словарь HeatmapSweep.progress_stats; ключи, кроме completed
+        и total, могут отсутствовать (например, у оптимизатора)
+        """
+        def format_time(seconds):
+            minutes, seconds = divmod(int(round(seconds)), 60)
+            return f"{minutes:02d}:{seconds:02d}"
+        
         try:
             if hasattr(self, 'progress_var') and hasattr(self, 'progress_window'):
                 if self.progress_window.winfo_exists():
-                    self.progress_var.set(completed)
-                    self.progress_window.update()
+                    total = progress['total']
+                    self.progress_bar.config(maximum=max(total, 1))
+                    self.progress_var.set(progress['completed'])
+                    
+                    lines = [f"Готово: {progress['completed']} из {total}"]
+                    if 'rate' in progress:
+                        lines[0] += f" ({progress['rate']:.1f} точек/с)"
+                    if 'elapsed' in progress:
+                        eta = progress.get('eta')
+                        lines.append(f"Прошло: {format_time(progress['elapsed'])}" +
+                                     (f", осталось: {format_time(eta)}" if eta is not None else ""))
+                    if 'active_workers' in progress:
+                        lines.append(f"Вычислителей: {progress['active_workers']} из {progress['max_workers']}")
+                    if 'cache_hits' in progress:
+                        hit_rate = 100 * progress['cache_hits'] / total if total > 0 else 0
+                        lines.append(f"Из кэша: {progress['cache_hits']} ({hit_rate:.0f}%)")
+                    
+                    for var, line in itertools.zip_longest(self.progress_stats_vars, lines, fillvalue=""):
+                        var.set(line)
         except:
             pass
     
@@ -1136,186 +1453,111 @@ class AutocorrelationApp:
             self._heatmap_updating = False
             return
         
+        # Промежуточная отрисовка начнется с чистых осей
+        self._heatmap_progress_artists = None
+        
         self.calculation_thread = threading.Thread(target=self.calculate_heatmap_in_thread, daemon=True)
         self.calculation_thread.start()
     
-    def create_impulse_times_only(self, params):
-        """Оптимизированное создание только времен импульсов"""
-        def temp_frequency_function(t):
-            duration = params['duration']
-            f0 = params['start_freq']
-            f1 = params['end_freq']
-            law_type = params['law_type']
-            
-            if law_type == 'linear':
-                return f0 + (f1 - f0) * (t / duration)
-            elif law_type == 'quadratic':
-                a = (f1 - f0) / (duration**2)
-                return a * (t**2) + f0
-            elif law_type == 'exponential':
-                if f0 <= 0 or f1 <= 0:
-                    return f0
-                k = math.log(f1 / f0) / duration if f0 > 0 else 0
-                return f0 * math.exp(k * t)
-            elif law_type == 'hyperbolic':
-                if t >= duration:
-                    return f1
-                term1 = f0**(-2) * (1 - t/duration)
-                term2 = f1**(-2) * (t/duration)
-                denominator = term1 + term2
-                if denominator > 0:
-                    return 1.0 / math.sqrt(denominator)
-                else:
-                    return f0
-            else:
-                return f0 + (f1 - f0) * (t / duration)
-        
-        duration = params['duration']
-        impulse_times = []
-        
-        t_current = 0
-        iteration_count = 0
-        MAX_ITERATIONS = 1000000
+    def get_law(self, params):
+        """Объект закона изменения частоты для параметров params"""
+        return get_frequency_law(params['law_type'], params['duration'],
+                                 params['start_freq'], params['end_freq'])
+    
+    def heatmap_limits(self, start_freqs, end_freqs):
+        """Границы осей карты: половина шага сетки за крайними узлами"""
+        x_min = start_freqs[0] - (start_freqs[1] - start_freqs[0])/2 if len(start_freqs) > 1 else start_freqs[0] - 0.5
+        x_max = start_freqs[-1] + (start_freqs[-1] - start_freqs[-2])/2 if len(start_freqs) > 1 else start_freqs[-1] + 0.5
+        y_min = end_freqs[0] - (end_freqs[1] - end_freqs[0])/2 if len(end_freqs) > 1 else end_freqs[0] - 0.5
+        y_max = end_freqs[-1] + (end_freqs[-1] - end_freqs[-2])/2 if len(end_freqs) > 1 else end_freqs[-1] + 0.5
+        return x_min, x_max, y_min, y_max
+    
+    def show_heatmap_progress(self, start_freqs, end_freqs, cube, computed, pending):
+        """
+        Промежуточная отрисовка карты во время расчета
         
-        while t_current < duration and iteration_count < MAX_ITERATIONS:
-            f_current = temp_frequency_function(t_current)
-            
-            if f_current > 0:
-                T = 1.0 / f_current
-            else:
-                T = duration
-                
-            MIN_PERIOD = 0.0001
-            if T < MIN_PERIOD:
-                T = MIN_PERIOD
+        Посчитанные узлы закрашиваются, запланированные показываются полыми
+        маркерами (на крупной сетке - серыми ячейками изображения). Оси
+        строятся при первом вызове, дальше обновляются только данные двух
+        наборов маркеров или двух изображений; они пересоздаются, только если
+        с ростом числа узлов (адаптивный перебор) карта переходит в изображение.
+        """
+        try:
+            heatmap_type = self.heatmap_type_var.get()
+            matrix = cube[HEATMAP_METRICS.index(heatmap_type)]
+            # Тот же критерий, что у итоговой карты: по числу отображаемых узлов
+            as_image = heatmap_as_image(np.count_nonzero(pending | computed))
+            x_min, x_max, y_min, y_max = self.heatmap_limits(start_freqs, end_freqs)
+            
+            if self._heatmap_progress_artists is None:
+                self.ax_heatmap.clear()
+                self._heatmap_mappable = None
+                self.ax_heatmap.set_xlim(x_min, x_max)
+                self.ax_heatmap.set_ylim(y_min, y_max)
+                self.ax_heatmap.set_facecolor('white')
+                self.ax_heatmap.grid(True, alpha=0.3, linestyle='--', linewidth=0.5, color='gray')
+                self.ax_heatmap.set_xlabel('Начальная частота (Гц)', fontsize=10)
+                self.ax_heatmap.set_ylabel('Конечная частота (Гц)', fontsize=10)
+                self.ax_heatmap.set_title("Расчет...", fontsize=11, fontweight='bold', pad=10)
+                self.ax_heatmap.tick_params(axis='both', labelsize=8)
+            
+            if self._heatmap_progress_artists is None or self._heatmap_progress_artists[0] != as_image:
+                if self._heatmap_progress_artists is not None:
+                    for artist in self._heatmap_progress_artists[1:]:
+                        artist.remove()
                 
-            impulse_times.append(t_current)
-            t_current += T
-            iteration_count += 1
-        
-        if iteration_count >= MAX_ITERATIONS:
-            print(f"Предупреждение: достигнут предел итераций для f0={params['start_freq']}, f1={params['end_freq']}")
-            if len(impulse_times) > 100000:
-                impulse_times = impulse_times[:100000]
-        
-        return impulse_times
-    
-    def create_impulse_sequence_with_params(self, params):
-        """Создание импульсной последовательности с заданными параметрами"""
-        def temp_frequency_function(t):
-            duration = params['duration']
-            f0 = params['start_freq']
-            f1 = params['end_freq']
-            law_type = params['law_type']
-            
-            if law_type == 'linear':
-                return f0 + (f1 - f0) * (t / duration)
-            elif law_type == 'quadratic':
-                a = (f1 - f0) / (duration**2)
-                return a * (t**2) + f0
-            elif law_type == 'exponential':
-                if f0 <= 0 or f1 <= 0:
-                    return f0
-                k = math.log(f1 / f0) / duration if f0 > 0 else 0
-                return f0 * math.exp(k * t)
-            elif law_type == 'hyperbolic':
-                if t >= duration:
-                    return f1
-                term1 = f0**(-2) * (1 - t/duration)
-                term2 = f1**(-2) * (t/duration)
-                denominator = term1 + term2
-                if denominator > 0:
-                    return 1.0 / math.sqrt(denominator)
+                if as_image:
+                    image_params = dict(extent=(x_min, x_max, y_min, y_max), origin='lower',
+                                        aspect='auto', interpolation='nearest')
+                    empty = np.ma.masked_all(matrix.shape)
+                    hollow = self.ax_heatmap.imshow(empty, cmap=plt.cm.Greys, vmin=0, vmax=4,
+                                                    zorder=2, **image_params)
+                    filled = self.ax_heatmap.imshow(empty, cmap=plt.cm.RdYlBu_r, zorder=3,
+                                                    **image_params)
                 else:
-                    return f0
-            else:
-                return f0 + (f1 - f0) * (t / duration)
-        
-        duration = params['duration']
-        dt = params['dt']
-        
-        MIN_DT = 0.0001
-        if dt < MIN_DT:
-            dt = MIN_DT
-            params['dt'] = dt
-        
-        impulse_times = []
-        impulse_frequencies = []
-        
-        t_current = 0
-        iteration_count = 0
-        MAX_ITERATIONS = 1000000
-        
-        while t_current < duration and iteration_count < MAX_ITERATIONS:
-            f_current = temp_frequency_function(t_current)
-            
-            if f_current > 0:
-                T = 1.0 / f_current
+                    hollow = self.ax_heatmap.scatter([], [], s=120, facecolors='none',
+                                                     edgecolors='gray', linewidths=0.8, zorder=2)
+                    filled = self.ax_heatmap.scatter([], [], c=[], s=120, cmap=plt.cm.RdYlBu_r,
+                                                     edgecolor='none', zorder=3)
+                self._heatmap_progress_artists = (as_image, hollow, filled)
+            
+            _, hollow, filled = self._heatmap_progress_artists
+            waiting = pending & ~computed
+            shown = computed & (matrix > 0)
+            values = matrix[shown]
+            
+            if as_image:
+                hollow.set_data(np.ma.masked_where(~waiting, np.ones(matrix.shape)))
+                filled.set_data(np.ma.masked_where(~shown, matrix))
             else:
-                T = duration
+                jj, ii = np.nonzero(waiting)
+                hollow.set_offsets(np.column_stack((start_freqs[ii], end_freqs[jj])))
                 
-            MIN_PERIOD = 0.0001
-            if T < MIN_PERIOD:
-                T = MIN_PERIOD
-                
-            impulse_times.append(t_current)
-            impulse_frequencies.append(f_current)
-            t_current += T
-            iteration_count += 1
-        
-        if iteration_count >= MAX_ITERATIONS:
-            print(f"Предупреждение: достигнут предел итераций для f0={params['start_freq']}, f1={params['end_freq']}")
-            if len(impulse_times) > 100000:
-                impulse_times = impulse_times[:100000]
-                impulse_frequencies = impulse_frequencies[:100000]
-        
-        MAX_IMPULSES = 100000
-        if len(impulse_times) > MAX_IMPULSES:
-            impulse_times = impulse_times[:MAX_IMPULSES]
-            impulse_frequencies = impulse_frequencies[:MAX_IMPULSES]
-        
-        time = np.arange(0, duration, dt)
-        
-        MAX_SAMPLES = 500000
-        if len(time) > MAX_SAMPLES:
-            dt = duration / MAX_SAMPLES
-            params['dt'] = dt
-            time = np.arange(0, duration, dt)
-        
-        signal = np.zeros_like(time)
-        
-        if params['variable_amplitude'] and len(impulse_times) > 0:
-            for i, t in enumerate(impulse_times):
-                idx = int(t / dt)
-                if 0 <= idx < len(signal):
-                    amplitude = 1.0 + (i / (len(impulse_times) - 1)) if len(impulse_times) > 1 else 1.0
-                    signal[idx] = amplitude
-        else:
-            for t in impulse_times:
-                idx = int(t / dt)
-                if 0 <= idx < len(signal):
-                    signal[idx] = 1.0
-        
-        return time, signal, impulse_times, impulse_frequencies
+                jj, ii = np.nonzero(shown)
+                filled.set_offsets(np.column_stack((start_freqs[ii], end_freqs[jj])))
+                filled.set_array(values)
+            if len(values) > 0:
+                vmin = self.manual_vmin[heatmap_type]
+                vmax = self.manual_vmax[heatmap_type]
+                filled.set_clim(values.min() if vmin is None else vmin,
+                                values.max() if vmax is None else vmax)
+            
+            self.canvas_heatmap.draw_idle()
+        except Exception as e:
+            print(f"Ошибка при промежуточной отрисовке карты: {e}")
     
-    def ricker_wavelet_with_params(self, frequency, params, length=0.1):
-        """Создание вейвлета Рикера с заданными параметрами"""
-        dt = params['dt']
-        
-        if dt <= 0:
-            dt = 0.001
-            params['dt'] = dt
+    def update_heatmap(self, start_freqs, end_freqs, matrix, heatmap_type='area', quadtree=None):
+        """
+        Обновление тепловой карты и палитры
         
-        t = np.arange(-length/2, length/2, dt)
-        t2 = t ** 2
-        wavelet = (1.0 - 2.0 * np.pi**2 * frequency**2 * t2) * np.exp(-np.pi**2 * frequency**2 * t2)
-        return wavelet
-    
-    def update_heatmap(self, start_freqs, end_freqs, matrix, heatmap_type='area'):
-        """Обновление тепловой карты и палитры"""
+        quadtree - квадродерево адаптивного перебора: на карте рисуются
+        границы его листьев, непосчитанные узлы пропускаются
+        """
         try:
             self.ax_heatmap.clear()
             self.ax_colorbar.clear()
+            self._heatmap_progress_artists = None
+            self._heatmap_mappable = None
             
             heatmap_configs = {
                 'area': {
@@ -1350,76 +1592,68 @@ class AutocorrelationApp:
             cbar_label = config['cbar_label']
             format_str = config['format_str']
             
-            vmin_manual = self.manual_vmin[heatmap_type]
-            vmax_manual = self.manual_vmax[heatmap_type]
-            
-            if vmin_manual is not None:
-                vmin = vmin_manual
-            else:
-                vmin = np.min(matrix[matrix > 0]) if np.any(matrix > 0) else 0
-            
-            if vmax_manual is not None:
-                vmax = vmax_manual
-            else:
-                vmax = np.max(matrix)
+            vmin, vmax = self.heatmap_palette_bounds(matrix, heatmap_type)
             
             self.update_palette_fields_for_type(heatmap_type)
             
-            X, Y = np.meshgrid(start_freqs, end_freqs)
-            
-            if vmax > vmin:
-                norm_values = (matrix - vmin) / (vmax - vmin)
-            else:
-                norm_values = np.zeros_like(matrix)
-            
             cmap = plt.cm.RdYlBu_r
-            colors = cmap(norm_values)
+            norm = plt.Normalize(vmin=vmin, vmax=vmax)
             
             self.ax_heatmap.set_facecolor('white')
             
-            x_min = start_freqs[0] - (start_freqs[1] - start_freqs[0])/2 if len(start_freqs) > 1 else start_freqs[0] - 0.5
-            x_max = start_freqs[-1] + (start_freqs[-1] - start_freqs[-2])/2 if len(start_freqs) > 1 else start_freqs[-1] + 0.5
-            y_min = end_freqs[0] - (end_freqs[1] - end_freqs[0])/2 if len(end_freqs) > 1 else end_freqs[0] - 0.5
-            y_max = end_freqs[-1] + (end_freqs[-1] - end_freqs[-2])/2 if len(end_freqs) > 1 else end_freqs[-1] + 0.5
+            x_min, x_max, y_min, y_max = self.heatmap_limits(start_freqs, end_freqs)
             
             self.ax_heatmap.set_xlim(x_min, x_max)
             self.ax_heatmap.set_ylim(y_min, y_max)
             
             self.ax_heatmap.grid(True, alpha=0.3, linestyle='--', linewidth=0.5, color='gray')
             
+            shown = matrix > 0
+            if quadtree is not None:
+                shown &= quadtree.computed
+            
             marker_size = 120
             
-            for j in range(len(end_freqs)):
-                for i in range(len(start_freqs)):
-                    if matrix[j, i] > 0:
-                        color = colors[j, i]
-                        self.ax_heatmap.scatter(start_freqs[i], end_freqs[j], 
-                                               color=color, s=marker_size, 
-                                               edgecolor='none', zorder=3)
-                        
-                        if len(start_freqs) <= 15 and len(end_freqs) <= 15:
-                            value_text = f'{matrix[j, i]:{format_str}}'
-                            y_offset = 0.03 * (y_max - y_min)
-                            
-                            self.ax_heatmap.text(start_freqs[i], end_freqs[j] + y_offset, value_text,
-                                               ha='center', va='bottom',
-                                               color='black', fontsize=8,
-                                               fontweight='bold',
-                                               zorder=4)
+            if quadtree is not None:
+                # Узлы адаптивной сетки мельче, границы листьев - тонкими линиями
+                marker_size = 30
+                self.ax_heatmap.add_collection(LineCollection(
+                    quadtree.leaf_segments(start_freqs, end_freqs),
+                    colors='gray', linewidths=0.5, alpha=0.5, zorder=2))
+            
+            if heatmap_as_image(np.count_nonzero(shown)):
+                # Крупная сетка - одно изображение, пустые и непосчитанные узлы прозрачны
+                mappable = self.ax_heatmap.imshow(np.ma.masked_where(~shown, matrix), cmap=cmap, norm=norm,
+                                       extent=(x_min, x_max, y_min, y_max), origin='lower',
+                                       aspect='auto', interpolation='nearest', zorder=3)
+            else:
+                # Все узлы - одна коллекция маркеров с векторным отображением цвета
+                jj, ii = np.nonzero(shown)
+                mappable = self.ax_heatmap.scatter(start_freqs[ii], end_freqs[jj], c=matrix[jj, ii],
+                                       cmap=cmap, norm=norm, s=marker_size,
+                                       edgecolor='none', zorder=3)
+                
+                if len(jj) <= HEATMAP_LABEL_MAX_NODES:
+                    y_offset = 0.03 * (y_max - y_min)
+                    for j, i in zip(jj, ii):
+                        self.ax_heatmap.text(start_freqs[i], end_freqs[j] + y_offset,
+                                           f'{matrix[j, i]:{format_str}}',
+                                           ha='center', va='bottom',
+                                           color='black', fontsize=8,
+                                           fontweight='bold',
+                                           zorder=4)
             
             self.ax_heatmap.set_xlabel('Начальная частота (Гц)', fontsize=10)
             self.ax_heatmap.set_ylabel('Конечная частота (Гц)', fontsize=10)
             self.ax_heatmap.set_title(title, fontsize=11, fontweight='bold', pad=10)
             
-            self.ax_heatmap.set_xticks(start_freqs)
-            self.ax_heatmap.set_yticks(end_freqs)
-            
             if len(start_freqs) > 10:
                 self.ax_heatmap.set_xticks(start_freqs[::max(1, len(start_freqs)//10)])
                 xtick_labels = [f'{freq:.1f}' for freq in start_freqs[::max(1, len(start_freqs)//10)]]
                 self.ax_heatmap.set_xticklabels(xtick_labels, rotation=45, fontsize=8)
             else:
                 xtick_labels = [f'{freq:.1f}' for freq in start_freqs]
+                self.ax_heatmap.set_xticks(start_freqs)
                 self.ax_heatmap.set_xticklabels(xtick_labels, fontsize=8)
             
             if len(end_freqs) > 10:
@@ -1428,13 +1662,17 @@ class AutocorrelationApp:
                 self.ax_heatmap.set_yticklabels(ytick_labels, fontsize=8)
             else:
                 ytick_labels = [f'{freq:.1f}' for freq in end_freqs]
+                self.ax_heatmap.set_yticks(end_freqs)
                 self.ax_heatmap.set_yticklabels(ytick_labels, fontsize=8)
             
-            sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=vmin, vmax=vmax))
+            # Шкала и карта делят одну нормировку: смена границ палитры
+            # перекрашивает обе без перестроения карты
+            sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
             sm.set_array([])
             
             cbar = self.fig_colorbar.colorbar(sm, cax=self.ax_colorbar)
             cbar.set_label(cbar_label, fontsize=10)
+            self._heatmap_mappable = (heatmap_type, matrix, mappable)
             
             self.ax_heatmap.tick_params(axis='both', labelsize=8)
             self.ax_colorbar.tick_params(labelsize=8)
@@ -1457,23 +1695,17 @@ class AutocorrelationApp:
     def get_parameters(self):
         """Получение параметров из полей ввода с проверкой"""
         try:
-            params = {
-                'ricker_freq': float(self.ricker_freq_entry.get()),
-                'duration': float(self.duration_entry.get()),
-                'start_freq': float(self.start_freq_entry.get()),
-                'end_freq': float(self.end_freq_entry.get()),
-                'dt': 0.001,
-                'max_lag': 500,
-                'law_type': self.law_type_var.get(),
-                'variable_amplitude': bool(self.var_amp_var.get())
-            }
-            
-            if params['ricker_freq'] <= 0 or params['duration'] <= 0:
-                raise ValueError("Частота и длительность должны быть > 0")
-            if params['start_freq'] <= 0 or params['end_freq'] <= 0:
-                raise ValueError("Частоты должны быть > 0")
-            if params['start_freq'] >= params['end_freq']:
-                raise ValueError("Начальная частота должна быть меньше конечной")
+            params = SequenceParams(
+                ricker_freq=float(self.ricker_freq_entry.get()),
+                duration=float(self.duration_entry.get()),
+                start_freq=float(self.start_freq_entry.get()),
+                end_freq=float(self.end_freq_entry.get()),
+                dt=float(self.dt_entry.get()) / 1000,
+                law_type=self.law_type_var.get(),
+                variable_amplitude=bool(self.var_amp_var.get()),
+                acf_engine=self.params.get('acf_engine', self.default_params['acf_engine']),
+                conv_method=self.params.get('conv_method', self.default_params['conv_method'])
+            ).validate().to_dict()
             
             self.params = params
             return True
@@ -1482,583 +1714,438 @@ class AutocorrelationApp:
             messagebox.showerror("Ошибка ввода", f"Некорректные параметры:\n{str(e)}")
             return False
     
-    def ricker_wavelet(self, frequency, length=0.1):
-        """Создание вейвлета Рикера"""
-        dt = self.params['dt']
-        t = np.arange(-length/2, length/2, dt)
-        t2 = t ** 2
-        wavelet = (1.0 - 2.0 * np.pi**2 * frequency**2 * t2) * np.exp(-np.pi**2 * frequency**2 * t2)
-        return wavelet
-    
-    def scale_compensation_coefficients(self, duration, f0, f1):
-        """Масштабирование компенсационных коэффициентов для заданных параметров"""
-        base_durations = [10, 20, 40, 80]
-        
-        if duration <= base_durations[0]:
-            idx1, idx2 = 0, 0
-            weight = 0.0
-        elif duration >= base_durations[-1]:
-            idx1, idx2 = -1, -1
-            weight = 1.0
-        else:
-            for i in range(len(base_durations)-1):
-                if base_durations[i] <= duration <= base_durations[i+1]:
-                    idx1, idx2 = i, i+1
-                    weight = (duration - base_durations[i]) / (base_durations[i+1] - base_durations[i])
-                    break
-        
-        coeffs1 = self.compensation_coefficients[idx1]
-        coeffs2 = self.compensation_coefficients[idx2]
-        
-        scaled_coeffs = []
-        for c1, c2 in zip(coeffs1, coeffs2):
-            scaled_coeffs.append(c1 * (1-weight) + c2 * weight)
-        
-        e_offset = f0 - scaled_coeffs[4]
-        scaled_coeffs[4] = f0
-        
-        current_end_value = (scaled_coeffs[0] * (duration**4) + 
-                            scaled_coeffs[1] * (duration**3) + 
-                            scaled_coeffs[2] * (duration**2) + 
-                            scaled_coeffs[3] * duration + 
-                            scaled_coeffs[4])
-        
-        diff = f1 - current_end_value
-        
-        total_poly = 0
-        contributions = []
-        
-        contributions.append(scaled_coeffs[0] * (duration**4))
-        contributions.append(scaled_coeffs[1] * (duration**3))
-        contributions.append(scaled_coeffs[2] * (duration**2))
-        contributions.append(scaled_coeffs[3] * duration)
-        
-        total_poly = sum(contributions)
-        
-        if abs(total_poly) > 1e-10:
-            for i in range(4):
-                if abs(contributions[i]) > 1e-10:
-                    scale_factor = 1 + (diff * contributions[i] / total_poly) / contributions[i]
-                    scaled_coeffs[i] *= scale_factor
-        
-        return scaled_coeffs
-    
-    def frequency_function(self, t):
-        """Вычисление частоты в зависимости от выбранного закона"""
-        duration = self.params['duration']
-        f0 = self.params['start_freq']
-        f1 = self.params['end_freq']
-        law_type = self.params['law_type']
-        
-        if law_type == 'linear':
-            return f0 + (f1 - f0) * (t / duration)
-        
-        elif law_type == 'quadratic':
-            a = (f1 - f0) / (duration**2)
-            return a * (t**2) + f0
-        
-        elif law_type == 'exponential':
-            if f0 <= 0 or f1 <= 0:
-                return f0
-            k = math.log(f1 / f0) / duration if f0 > 0 else 0
-            return f0 * math.exp(k * t)
-        
-        elif law_type == 'compensation':
-            coeffs = self.scale_compensation_coefficients(duration, f0, f1)
-            
-            return (coeffs[0] * (t**4) + 
-                    coeffs[1] * (t**3) + 
-                    coeffs[2] * (t**2) + 
-                    coeffs[3] * t + 
-                    coeffs[4])
-        
-        elif law_type == 'hyperbolic':
-            if t >= duration:
-                return f1
-            
-            term1 = f0**(-2) * (1 - t/duration)
-            term2 = f1**(-2) * (t/duration)
-            denominator = term1 + term2
-            
-            if denominator > 0:
-                return 1.0 / math.sqrt(denominator)
-            else:
-                return f0
-        
-        else:
-            return f0
-    
-    def create_hyperbolic_sequence_analytical(self):
-        """Создание гиперболической последовательности аналитически"""
-        duration = self.params['duration']
-        f0 = self.params['start_freq']
-        f1 = self.params['end_freq']
-        
-        if duration <= 0 or f0 <= 0 or f1 <= 0:
-            return [], []
-        
-        T0 = 1.0 / f0
-        T1 = 1.0 / f1
-        
-        N_approx = int(duration / ((T0 + T1) / 2))
-        
-        dT = (T0 - T1) / (N_approx - 1) if N_approx > 1 else 0
-        
-        impulse_times = []
-        impulse_frequencies = []
-        
-        n = 0
-        iteration_count = 0
-        MAX_ITERATIONS = 1000000
-        
-        while iteration_count < MAX_ITERATIONS:
-            t_n = n * T0 - n * (n - 1) / 2 * dT
-            
-            if t_n > duration:
-                break
-                
-            if t_n >= 0:
-                if n == 0:
-                    f_n = f0
-                elif n == N_approx - 1:
-                    f_n = f1
-                else:
-                    f_n = 1.0 / (T0 - n * dT)
-                
-                impulse_times.append(t_n)
-                impulse_frequencies.append(f_n)
-            
-            n += 1
-            iteration_count += 1
-        
-        if iteration_count >= MAX_ITERATIONS:
-            print(f"Предупреждение: достигнут предел итераций для гиперболической последовательности")
-            if len(impulse_times) > 100000:
-                impulse_times = impulse_times[:100000]
-                impulse_frequencies = impulse_frequencies[:100000]
-        
-        return impulse_times, impulse_frequencies
-    
-    def create_impulse_sequence(self):
-        """Создание импульсной последовательности"""
-        duration = self.params['duration']
-        dt = self.params['dt']
-        
-        if self.params['law_type'] == 'hyperbolic':
-            impulse_times, impulse_frequencies = self.create_hyperbolic_sequence_analytical()
-        else:
-            impulse_times = []
-            impulse_frequencies = []
-            
-            t_current = 0
-            iteration_count = 0
-            MAX_ITERATIONS = 1000000
-            
-            while t_current < duration and iteration_count < MAX_ITERATIONS:
-                f_current = self.frequency_function(t_current)
-                
-                if f_current > 0:
-                    T = 1.0 / f_current
-                else:
-                    T = duration
-                    
-                impulse_times.append(t_current)
-                impulse_frequencies.append(f_current)
-                t_current += T
-                iteration_count += 1
-            
-            if iteration_count >= MAX_ITERATIONS:
-                print(f"Предупреждение: достигнут предел итераций при создании последовательности")
-                if len(impulse_times) > 100000:
-                    impulse_times = impulse_times[:100000]
-                    impulse_frequencies = impulse_frequencies[:100000]
-        
-        time = np.arange(0, duration, dt)
-        
-        MAX_SAMPLES = 500000
-        if len(time) > MAX_SAMPLES:
-            dt = duration / MAX_SAMPLES
-            self.params['dt'] = dt
-            time = np.arange(0, duration, dt)
-        
-        signal = np.zeros_like(time)
-        
-        if self.params['variable_amplitude'] and len(impulse_times) > 0:
-            for i, t in enumerate(impulse_times):
-                idx = int(t / dt)
-                if idx < len(signal):
-                    amplitude = 1.0 + (i / (len(impulse_times) - 1)) if len(impulse_times) > 1 else 1.0
-                    signal[idx] = amplitude
-        else:
-            for t in impulse_times:
-                idx = int(t / dt)
-                if idx < len(signal):
-                    signal[idx] = 1.0
-        
-        return time, signal, impulse_times, impulse_frequencies
-    
-    def compute_autocorrelation(self, signal):
-        """Вычисление автокорреляционной функции"""
-        max_lag = self.params['max_lag']
-        n = len(signal)
-        
-        if n > 200000:
-            max_lag = min(max_lag, 200)
-        
-        autocorr = np.correlate(signal, signal, mode='full')
-        autocorr = autocorr[n-1-max_lag:n+max_lag]
-        lags = np.arange(-max_lag, max_lag + 1)
-        
-        max_val = np.max(np.abs(autocorr))
-        if max_val > 0:
-            autocorr = autocorr / max_val
-        
-        return lags, autocorr
-    
-    def compute_spectrum(self, autocorr):
-        """Вычисление спектра АКФ"""
-        dt = self.params['dt']
-        n = len(autocorr)
+    def setup_main_plots(self):
+        """
+        Постоянные элементы основных графиков
         
-        if n > 100000:
-            autocorr = autocorr[:100000]
-            n = len(autocorr)
+        Линии, заливки и подписи создаются один раз, дальше update_plots
+        меняет только их данные. Расположение осей рассчитывается здесь же
+        и при обновлениях не пересчитывается.
+        """
+        self.plot_artists = {}
+        artists = self.plot_artists
+        
+        law_colors = {
+            'linear': '#FF6B6B',
+            'quadratic': '#4ECDC4',
+            'exponential': '#45B7D1',
+            'compensation': '#96CEB4',
+            'hyperbolic': '#FFA726'
+        }
+        self.law_colors = law_colors
         
-        spectrum = np.fft.fft(autocorr)
-        freq = np.fft.fftfreq(n, dt)
+        info_box = dict(boxstyle='round', facecolor='white', alpha=0.9)
         
-        pos_freq = freq[:n//2]
-        pos_spectrum = np.abs(spectrum[:n//2])
+        # График роста частоты
+        artists['freq_line'], = self.ax_freq.plot([], [], linewidth=2)
+        artists['freq_formula'] = self.ax_freq.text(0.02, 0.98, '', 
+                                                    transform=self.ax_freq.transAxes, verticalalignment='top',
+                                                    bbox=dict(boxstyle='round', facecolor='white', alpha=0.8),
+                                                    fontsize=8)
+        self.ax_freq.set_xlabel('Время (сек)', fontsize=9)
+        self.ax_freq.set_ylabel('Частота (Гц)', fontsize=9)
+        self.ax_freq.grid(True, alpha=0.3)
         
-        if np.max(pos_spectrum) > 0:
-            pos_spectrum = pos_spectrum / np.max(pos_spectrum)
+        # Верхние графики
+        self.blit_top = BlitManager(self.canvas_top)
+        self.blit_bottom = BlitManager(self.canvas_bottom)
+        
+        # Отметки ударов - по одной коллекции на график, независимо от числа ударов:
+        # короткие штрихи в середине оси при постоянной амплитуде,
+        # стойки с цветными маркерами при переменной
+        artists['impulse_ticks'] = self.blit_top.add_artist(self.ax_impulse.add_collection(
+            LineCollection([], colors='#006400', alpha=0.7, linewidths=1.2,
+                           transform=self.ax_impulse.get_xaxis_transform())))
+        artists['impulse_stems'] = self.blit_top.add_artist(self.ax_impulse.add_collection(
+            LineCollection([], linewidths=1.5, alpha=0.7)))
+        artists['impulse_heads'] = self.blit_top.add_artist(
+            self.ax_impulse.scatter([], [], s=20, alpha=0.8))
+        artists['impulse_step'] = self.blit_top.add_artist(
+            self.ax_impulse.plot([], [], drawstyle='steps-post', color='green', linewidth=0.5, alpha=0.3)[0])
+        artists['impulse_trace'] = DecimatedTrace(artists['impulse_step'])
+        artists['impulse_marks'] = DecimatedMarks(self.ax_impulse, self.render_impulse_marks)
+        artists['impulse_info'] = self.blit_top.add_artist(
+            self.ax_impulse.text(0.02, 0.98, '', transform=self.ax_impulse.transAxes,
+                                 verticalalignment='top', bbox=info_box, fontsize=8))
+        self.ax_impulse.set_title('Импульсная последовательность', fontsize=11, fontweight='bold')
+        self.ax_impulse.set_xlabel('Время (сек)')
+        self.ax_impulse.set_ylabel('Сигнал (0/1)')
+        self.ax_impulse.grid(True, alpha=0.3, linestyle='--')
+        self.ax_impulse.axhline(y=0, color='black', alpha=0.5, linewidth=0.5)
+        artists['impulse_unit'] = self.ax_impulse.axhline(y=1, color='red', alpha=0.3, linestyle=':', linewidth=1)
+        
+        artists['conv_line'] = self.blit_top.add_artist(
+            self.ax_convolution.plot([], [], color='purple', linewidth=1.5, alpha=0.8)[0])
+        artists['conv_fill'] = self.blit_top.add_artist(
+            self.ax_convolution.fill_between([], [], color='purple', alpha=0.2))
+        artists['conv_trace'] = DecimatedTrace(artists['conv_line'], artists['conv_fill'])
+        artists['conv_impulses'] = self.blit_top.add_artist(self.ax_convolution.add_collection(
+            LineCollection([], colors='red', alpha=0.4, linestyles='--', linewidths=0.8,
+                           transform=self.ax_convolution.get_xaxis_transform())))
+        artists['conv_marks'] = DecimatedMarks(self.ax_convolution, self.render_convolution_marks)
+        artists['conv_info'] = self.blit_top.add_artist(
+            self.ax_convolution.text(0.02, 0.98, '', transform=self.ax_convolution.transAxes,
+                                     verticalalignment='top', bbox=info_box, fontsize=8))
+        self.ax_convolution.set_title('Свертка с вейвлетом Рикера', fontsize=11, fontweight='bold')
+        self.ax_convolution.set_xlabel('Время (сек)')
+        self.ax_convolution.set_ylabel('Амплитуда')
+        self.ax_convolution.grid(True, alpha=0.3, linestyle='--')
+        self.ax_convolution.axhline(y=0, color='black', alpha=0.5, linewidth=0.5)
         
-        return pos_freq, pos_spectrum
+        # Нижние графики
+        artists['acf_line'] = self.blit_bottom.add_artist(
+            self.ax_autocorr.plot([], [], color='#4ECDC4', linewidth=2, label='АКФ')[0])
+        artists['acf_fill'] = self.blit_bottom.add_artist(
+            self.ax_autocorr.fill_between([], [], color='#4ECDC4', alpha=0.3))
+        artists['acf_envelope'] = self.blit_bottom.add_artist(
+            self.ax_autocorr.plot([], [], color='red', linewidth=1.5, 
+                                  linestyle='--', alpha=0.8, label='Огибающая')[0])
+        artists['acf_peak'] = self.blit_bottom.add_artist(
+            self.ax_autocorr.plot([], [], 'ro', markersize=4, markeredgecolor='blue', 
+                                  markeredgewidth=1, label='Макс. пик')[0])
+        artists['acf_peak_stem'] = self.blit_bottom.add_artist(
+            self.ax_autocorr.plot([], [], 'r--', linewidth=1, alpha=0.5)[0])
+        artists['acf_info'] = self.blit_bottom.add_artist(
+            self.ax_autocorr.text(0.02, 0.98, '', transform=self.ax_autocorr.transAxes,
+                                  verticalalignment='top',
+                                  bbox=dict(boxstyle='round', facecolor='white', alpha=0.8),
+                                  fontsize=8))
+        self.ax_autocorr.axvline(x=0, color='black', linestyle='--', alpha=0.7, linewidth=1)
+        self.ax_autocorr.set_title('Автокорреляция свертки', fontsize=12)
+        self.ax_autocorr.set_xlabel('Лаг (сек)')
+        self.ax_autocorr.set_ylabel('Нормализованная автокорреляция')
+        self.ax_autocorr.set_xlim(-0.5, 0.5)
+        self.ax_autocorr.grid(True, alpha=0.3)
+        
+        artists['spectrum_line'] = self.blit_bottom.add_artist(
+            self.ax_spectrum.plot([], [], color='#6c5ce7', linewidth=2)[0])
+        artists['spectrum_fill'] = self.blit_bottom.add_artist(
+            self.ax_spectrum.fill_between([], [], color='#6c5ce7', alpha=0.3))
+        artists['spectrum_peak'] = self.blit_bottom.add_artist(
+            self.ax_spectrum.axvline(x=0, color='red', linestyle='--', alpha=0.7, linewidth=1))
+        artists['spectrum_info'] = self.blit_bottom.add_artist(
+            self.ax_spectrum.text(0.02, 0.98, '', transform=self.ax_spectrum.transAxes,
+                                  verticalalignment='top',
+                                  bbox=dict(boxstyle='round', facecolor='white', alpha=0.8),
+                                  fontsize=8))
+        self.ax_spectrum.set_title('Спектр автокорреляционной функции', fontsize=12)
+        self.ax_spectrum.set_xlabel('Частота (Гц)')
+        self.ax_spectrum.set_ylabel('Амплитуда (норм.)')
+        self.ax_spectrum.grid(True, alpha=0.3)
+        
+        # Пределы по данным подбираются в update_plots
+        self.plot_limits = {}
+        
+        self.fig_freq.tight_layout()
+        self.fig_top.tight_layout()
+        self.fig_bottom.tight_layout()
     
-    def update_frequency_plot(self):
-        """Обновление графика роста частоты"""
+    def update_frequency_plot(self, params):
+        """Обновление графика роста частоты для параметров params"""
         try:
-            self.ax_freq.clear()
-            
-            duration = self.params['duration']
+            duration = params['duration']
             dt = duration / 200
             time_points = np.arange(0, duration + dt, dt)
-            freq_points = [self.frequency_function(t) for t in time_points]
-            
-            law_colors = {
-                'linear': '#FF6B6B',
-                'quadratic': '#4ECDC4',
-                'exponential': '#45B7D1',
-                'compensation': '#96CEB4',
-                'hyperbolic': '#FFA726'
-            }
-            
-            color = law_colors.get(self.params['law_type'], '#45B7D1')
-            
-            self.ax_freq.plot(time_points, freq_points, color=color, linewidth=2)
+            freq_points = self.get_law(params).evaluate(time_points)
             
-            self.ax_freq.set_xlabel('Время (сек)', fontsize=9)
-            self.ax_freq.set_ylabel('Частота (Гц)', fontsize=9)
-            self.ax_freq.grid(True, alpha=0.3)
+            freq_line = self.plot_artists['freq_line']
+            freq_line.set_data(time_points, freq_points)
+            freq_line.set_color(self.law_colors.get(params['law_type'], '#45B7D1'))
             
             self.ax_freq.set_xlim(0, duration)
-            f_min = min(self.params['start_freq'], self.params['end_freq'])
-            f_max = max(self.params['start_freq'], self.params['end_freq'])
+            f_min = min(params['start_freq'], params['end_freq'])
+            f_max = max(params['start_freq'], params['end_freq'])
             
             f_range = f_max - f_min
             padding = 0.1 * f_range if f_range > 0 else 1.0
             self.ax_freq.set_ylim(max(0.1, f_min - padding), f_max + padding)
             
-            formulas = {
-                'linear': 'f(t) = f₀ + (f₁ - f₀)·t/T',
-                'quadratic': 'f(t) = a·t² + f₀',
-                'exponential': 'f(t) = f₀·exp(k·t)',
-                'compensation': 'f(t) = полином 4-й ст.',
-                'hyperbolic': 'f(t) = 1/√[f₀⁻²(1-t/T)+f₁⁻²(t/T)]'
-            }
-            formula = formulas.get(self.params['law_type'], '')
-            
-            self.ax_freq.text(0.02, 0.98, formula, 
-                             transform=self.ax_freq.transAxes, verticalalignment='top',
-                             bbox=dict(boxstyle='round', facecolor='white', alpha=0.8),
-                             fontsize=8)
+            self.plot_artists['freq_formula'].set_text(self.get_law(params).formula)
             
-            self.fig_freq.tight_layout()
-            self.canvas_freq.draw()
+            self.canvas_freq.draw_idle()
         except Exception as e:
             print(f"Ошибка при обновлении графика частоты: {e}")
     
     def update_plots(self):
-        """Обновление всех графиков"""
+        """
+        Запуск пересчета основного окна в фоновом потоке
+        
+        Расчет идет вне потока Tk, в интерфейс возвращается только готовый
+        результат. Новый запуск отменяет все еще идущий: выигрывает
+        последний набор параметров, устаревшие результаты отбрасываются.
+        """
         if not self.get_parameters():
             return
         
+        if self.plot_cancel is not None:
+            self.plot_cancel.set()
+        self.plot_cancel = threading.Event()
+        self.plot_generation += 1
+        
+        thread = threading.Thread(target=self.compute_plots_in_thread,
+                                  args=(dict(self.params), self.plot_generation, self.plot_cancel),
+                                  daemon=True)
+        thread.start()
+    
+    def compute_plots_in_thread(self, params, generation, cancel):
+        """Расчет данных графиков в фоновом потоке"""
         try:
-            law_type = self.params['law_type']
-            
-            # ЛЕВЫЙ ВЕРХНИЙ: Импульсная последовательность
-            time, signal, impulse_times, impulse_freqs = self.create_impulse_sequence()
-            
-            # ПРАВЫЙ ВЕРХНИЙ: Свертка с вейвлетом Рикера
-            wavelet = self.ricker_wavelet(self.params['ricker_freq'])
-            convolution = np.convolve(signal, wavelet, mode='same')
-            
-            # ЛЕВЫЙ НИЖНИЙ: Автокорреляционная функция
-            lags, autocorr = self.compute_autocorrelation(convolution)
-            lag_times = lags * self.params['dt']
-            
-            area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
-            
-            # Используем исправленную функцию для вычисления площади под огибающей и макс. побочного пика
-            envelope_area, autocorr_residual, envelope, ricker_autocorr, max_side_peak, max_side_idx = \
-                self.compute_envelope_area_and_max_side_peak(
-                    autocorr, wavelet, self.params['dt'], self.params['ricker_freq']
-                )
-            
-            # ПРАВЫЙ НИЖНИЙ: Спектр
-            spectrum_freq, spectrum = self.compute_spectrum(autocorr)
-            
-            self.ax_impulse.clear()
-            self.ax_convolution.clear()
-            self.ax_autocorr.clear()
-            self.ax_spectrum.clear()
-            
-            # ЛЕВЫЙ ВЕРХНИЙ ГРАФИК: Импульсная последовательность
-            show_duration = min(5.0, self.params['duration'])
-            show_mask = time <= show_duration
-            show_time = time[show_mask]
-            show_signal = signal[show_mask]
-            
-            impulse_indices = np.where(show_signal > 0)[0]
-            
-            if len(impulse_indices) > 0:
-                impulse_positions = show_time[impulse_indices]
-                impulse_amplitudes = show_signal[impulse_indices]
-                
-                if self.params['variable_amplitude']:
-                    colors = plt.cm.RdYlBu((impulse_amplitudes - 1.0))
-                    
-                    for pos, amp, color in zip(impulse_positions, impulse_amplitudes, colors):
-                        self.ax_impulse.plot([pos, pos], [0, amp], 
-                                           color=color, linewidth=1.5, alpha=0.7)
-                        self.ax_impulse.scatter([pos], [amp], color=color, s=20, alpha=0.8)
-                else:
-                    for pos in impulse_positions:
-                        self.ax_impulse.axvline(x=pos, color='#006400', alpha=0.7,
-                                              linewidth=1.2, ymin=0.45, ymax=0.55)
-                
-                self.ax_impulse.step(show_time, show_signal, where='post', 
-                                   color='green', linewidth=0.5, alpha=0.3)
-            
-            self.ax_impulse.set_xlim(0, show_duration)
-            
-            if self.params['variable_amplitude']:
-                self.ax_impulse.set_ylim(-0.2, 2.5)
-                ylabel = 'Амплитуда'
-            else:
-                self.ax_impulse.set_ylim(-0.2, 1.5)
-                ylabel = 'Сигнал (0/1)'
-            
-            law_names = {
-                'linear': 'Линейный',
-                'quadratic': 'Квадратичный',
-                'exponential': 'Экспоненциальный',
-                'compensation': 'Компенсационный',
-                'hyperbolic': 'Гиперболический'
-            }
-            law_name = law_names.get(self.params['law_type'], self.params['law_type'])
-            
-            amp_status = " (пер.ампл.)" if self.params['variable_amplitude'] else ""
-            self.ax_impulse.set_title(f'Импульсная последовательность{amp_status} ({law_name})', 
-                                     fontsize=11, fontweight='bold')
-            self.ax_impulse.set_xlabel('Время (сек)')
-            self.ax_impulse.set_ylabel(ylabel)
-            self.ax_impulse.grid(True, alpha=0.3, linestyle='--')
-            self.ax_impulse.axhline(y=0, color='black', alpha=0.5, linewidth=0.5)
-            
-            if not self.params['variable_amplitude']:
-                self.ax_impulse.axhline(y=1, color='red', alpha=0.3, linestyle=':', linewidth=1)
-            
-            total_impulses = len(impulse_times)
-            
-            info_text = f'Всего импульсов: {total_impulses}\n'
-            info_text += f'Нач. частота: {self.params["start_freq"]:.1f} Гц\n'
-            info_text += f'Кон. частота: {self.params["end_freq"]:.1f} Гц'
-            
-            if self.params['variable_amplitude'] and total_impulses > 0:
-                min_amp = np.min(signal[signal > 0])
-                max_amp = np.max(signal[signal > 0])
-                info_text += f'\nАмплитуда: {min_amp:.1f}→{max_amp:.1f}'
-            
-            self.ax_impulse.text(0.02, 0.98, info_text, 
-                               transform=self.ax_impulse.transAxes, verticalalignment='top',
-                               bbox=dict(boxstyle='round', facecolor='white', alpha=0.9),
-                               fontsize=8)
-            
-            # ПРАВЫЙ ВЕРХНИЙ ГРАФИК: Свертка
-            convolution_duration = min(1.0, self.params['duration'])
-            conv_mask = time <= convolution_duration
-            conv_time = time[conv_mask]
-            conv_values = convolution[conv_mask]
-            
-            conv_impulse_mask = (np.array(impulse_times) <= convolution_duration)
-            conv_impulse_times = np.array(impulse_times)[conv_impulse_mask]
-            
-            self.ax_convolution.plot(conv_time, conv_values, color='purple', linewidth=1.5, alpha=0.8)
-            self.ax_convolution.fill_between(conv_time, 0, conv_values, color='purple', alpha=0.2)
-            
-            if len(conv_impulse_times) > 0:
-                for imp_time in conv_impulse_times:
-                    self.ax_convolution.axvline(x=imp_time, color='red', alpha=0.4, 
-                                               linestyle='--', linewidth=0.8)
-            
-            self.ax_convolution.set_xlim(0, convolution_duration)
-            
-            if len(conv_values) > 0:
-                y_min, y_max = np.min(conv_values), np.max(conv_values)
-                y_range = y_max - y_min
-                if y_range > 0:
-                    self.ax_convolution.set_ylim(y_min - 0.1*y_range, y_max + 0.1*y_range)
-            
-            amp_status = " (пер.ампл.)" if self.params['variable_amplitude'] else ""
-            self.ax_convolution.set_title(f'Свертка с вейвлетом Рикера{amp_status} ({self.params["ricker_freq"]} Гц)', 
-                                        fontsize=11, fontweight='bold')
-            self.ax_convolution.set_xlabel('Время (сек)')
-            self.ax_convolution.set_ylabel('Амплитуда')
-            self.ax_convolution.grid(True, alpha=0.3, linestyle='--')
-            self.ax_convolution.axhline(y=0, color='black', alpha=0.5, linewidth=0.5)
-            
-            conv_info = f'Частота Рикера: {self.params["ricker_freq"]} Гц\n'
-            conv_info += f'Макс. амплитуда: {np.max(np.abs(conv_values)):.3f}\n'
-            conv_info += f'Импульсов в области: {len(conv_impulse_times)}'
-            
-            self.ax_convolution.text(0.02, 0.98, conv_info, 
-                                   transform=self.ax_convolution.transAxes, verticalalignment='top',
-                                   bbox=dict(boxstyle='round', facecolor='white', alpha=0.9),
-                                   fontsize=8)
-            
-            # ЛЕВЫЙ НИЖНИЙ ГРАФИК: АКФ с огибающей и отметкой побочного пика
-            self.ax_autocorr.plot(lag_times, autocorr, color='#4ECDC4', linewidth=2, label='АКФ')
-            self.ax_autocorr.fill_between(lag_times, 0, autocorr, color='#4ECDC4', alpha=0.3)
-            
-            # Добавляем автокорреляцию одиночного импульса для сравнения
-            ricker_autocorr_scaled = ricker_autocorr
-            
-            self.ax_autocorr.plot(lag_times, envelope, color='red', linewidth=1.5, 
-                                 linestyle='--', alpha=0.8, label='Огибающая')
-            
-            # Отмечаем максимальный побочный пик
-            if max_side_peak > 0:
-                # Находим соответствующий лаг для максимального пика
-                max_side_lag = lag_times[max_side_idx]
-                
-                # Отмечаем точку красным кружком
-                self.ax_autocorr.plot(max_side_lag, autocorr[max_side_idx], 'ro', 
-                                     markersize=4, markeredgecolor='blue', 
-                                     markeredgewidth=1, label=f'Макс. пик')
-                
-                # Добавляем вертикальную линию от нуля до пика
-                self.ax_autocorr.plot([max_side_lag, max_side_lag], [0, autocorr[max_side_idx]], 
-                                     'r--', linewidth=1, alpha=0.5)
-            
-            self.ax_autocorr.axvline(x=0, color='black', linestyle='--', alpha=0.7, linewidth=1)
-            
-            amp_status = " (пер.ампл.)" if self.params['variable_amplitude'] else ""
-            self.ax_autocorr.set_title(f'Автокорреляция свертки{amp_status}', fontsize=12)
-            self.ax_autocorr.set_xlabel('Лаг (сек)')
-            self.ax_autocorr.set_ylabel('Нормализованная автокорреляция')
-            self.ax_autocorr.set_xlim(-0.5, 0.5)
-            self.ax_autocorr.grid(True, alpha=0.3)
-            self.ax_autocorr.legend(loc='upper right', fontsize=8)
-            
-            acf_info = f'Площадь АКФ: {area:.3f}\n'
-            acf_info += f'Пл. под огиб. АКФ: {envelope_area:.4f}\n'
-            acf_info += f'Макс. побочный пик: {max_side_peak:.4f}'
-            
-            self.ax_autocorr.text(0.02, 0.98, acf_info, 
-                                transform=self.ax_autocorr.transAxes, verticalalignment='top',
-                                bbox=dict(boxstyle='round', facecolor='white', alpha=0.8),
-                                fontsize=8)
-            
-            # ПРАВЫЙ НИЖНИЙ ГРАФИК: Спектр
-            self.ax_spectrum.plot(spectrum_freq, spectrum, color='#6c5ce7', linewidth=2)
-            self.ax_spectrum.fill_between(spectrum_freq, 0, spectrum, color='#6c5ce7', alpha=0.3)
-            
-            max_freq = min(500, 1/(2*self.params['dt']))
-            freq_mask = spectrum_freq <= max_freq
-            
-            if len(spectrum_freq[freq_mask]) > 1:
-                self.ax_spectrum.set_xlim(0, max_freq)
-                
-                spectrum_freq_masked = spectrum_freq[freq_mask]
-                spectrum_masked = spectrum[freq_mask]
-                dominant_freq_idx = np.argmax(spectrum_masked)
-                dominant_freq = spectrum_freq_masked[dominant_freq_idx]
-                dominant_amp = spectrum_masked[dominant_freq_idx]
-                
-                self.ax_spectrum.axvline(x=dominant_freq, color='red', linestyle='--', alpha=0.7, linewidth=1)
-                
-                if dominant_amp > 0.1:
-                    spec_info = f'Доминирующая частота:\n{dominant_freq:.1f} Гц ({dominant_amp:.2f})'
-                    
-                    self.ax_spectrum.text(0.02, 0.98, spec_info, 
-                                        transform=self.ax_spectrum.transAxes, verticalalignment='top',
-                                        bbox=dict(boxstyle='round', facecolor='white', alpha=0.8),
-                                        fontsize=8)
-            
-            amp_status = " (пер.ампл.)" if self.params['variable_amplitude'] else ""
-            self.ax_spectrum.set_title(f'Спектр автокорреляционной функции{amp_status}', fontsize=12)
-            self.ax_spectrum.set_xlabel('Частота (Гц)')
-            self.ax_spectrum.set_ylabel('Амплитуда (норм.)')
-            self.ax_spectrum.grid(True, alpha=0.3)
+            data = compute_sequence_analysis(params, cancel)
+        except CalculationCancelled:
+            return
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                self.root.after(0, self.show_plot_error, generation, e)
+            except:
+                pass
+            return
+        
+        try:
+            self.root.after(0, self.apply_plot_data, generation, data)
+        except:
+            pass
+    
+    def apply_plot_data(self, generation, data):
+        """Перенос результата фонового расчета на графики (в потоке Tk)"""
+        if generation != self.plot_generation:
+            return
+        
+        try:
+            self.current_data = data
+            self.draw_main_plots(data)
             
             # Обновление графика роста частоты
-            self.update_frequency_plot()
-            
-            self.current_data = {
-                'time': time,
-                'signal': signal,
-                'impulse_times': impulse_times,
-                'impulse_frequencies': impulse_freqs,
-                'convolution': convolution,
-                'lag_times': lag_times,
-                'autocorr': autocorr,
-                'autocorr_residual': autocorr_residual,
-                'envelope': envelope,
-                'envelope_area': envelope_area,
-                'ricker_autocorr': ricker_autocorr,
-                'max_side_peak': max_side_peak,
-                'max_side_idx': max_side_idx,
-                'spectrum_freq': spectrum_freq,
-                'spectrum': spectrum,
-                'area': area,
-                'law_type': self.params['law_type'],
-                'law_name': law_name,
-                'variable_amplitude': self.params['variable_amplitude']
-            }
-            
-            self.fig_freq.tight_layout()
-            self.fig_top.tight_layout()
-            self.fig_bottom.tight_layout()
-            
-            self.canvas_freq.draw()
-            self.canvas_top.draw()
-            self.canvas_bottom.draw()
-            
+            self.update_frequency_plot(data['params'])
         except Exception as e:
             messagebox.showerror("Ошибка расчета", f"Ошибка при построении графиков:\n{str(e)}")
             traceback.print_exc()
     
+    def show_plot_error(self, generation, error):
+        """Сообщение об ошибке фонового расчета, если он не устарел"""
+        if generation == self.plot_generation:
+            messagebox.showerror("Ошибка расчета", f"Ошибка при построении графиков:\n{str(error)}")
+    
+    def render_impulse_marks(self, positions, amplitudes):
+        """Отметки ударов на графике последовательности (после прореживания)"""
+        artists = self.plot_artists
+        
+        ticks = np.empty((len(positions), 2, 2))
+        ticks[:, :, 0] = positions[:, None]
+        ticks[:, :, 1] = (0.45, 0.55)
+        artists['impulse_ticks'].set_segments(ticks)
+        
+        colors = plt.cm.RdYlBu((amplitudes - 1.0))
+        stems = np.zeros((len(positions), 2, 2))
+        stems[:, :, 0] = positions[:, None]
+        stems[:, 1, 1] = amplitudes
+        artists['impulse_stems'].set_segments(stems)
+        artists['impulse_stems'].set_color(colors)
+        artists['impulse_heads'].set_offsets(np.column_stack((positions, amplitudes)))
+        artists['impulse_heads'].set_facecolor(colors)
+        artists['impulse_heads'].set_edgecolor(colors)
+    
+    def render_convolution_marks(self, positions, heights):
+        """Отметки ударов на графике свертки (после прореживания)"""
+        ticks = np.empty((len(positions), 2, 2))
+        ticks[:, :, 0] = positions[:, None]
+        ticks[:, 0, 1] = 0.0
+        ticks[:, 1, 1] = heights
+        self.plot_artists['conv_impulses'].set_segments(ticks)
+    
+    def apply_default_xlim(self, ax, key, view):
+        """
+        Вид оси X по умолчанию для графика с панелью навигации
+        
+        Если пользователь масштабировал или сдвинул график, его вид
+        сохраняется при пересчете; иначе ставится вид по умолчанию.
+        """
+        previous = self.plot_limits.get(key)
+        if previous is None or tuple(ax.get_xlim()) == tuple(previous):
+            ax.set_xlim(*view)
+            if previous != view:
+                self.toolbar_top.update()
+        self.plot_limits[key] = view
+    
+    def draw_main_plots(self, data):
+        """
+        Перенос рассчитанных данных на четыре основных графика
+        
+        Данные постоянных элементов меняются на месте. Если пределы осей,
+        заголовки и легенды не изменились, фигуры обновляются блиттингом,
+        иначе перерисовываются целиком.
+        """
+        artists = self.plot_artists
+        limits = self.plot_limits
+        params = data['params']
+        variable_amplitude = data['variable_amplitude']
+        amp_status = " (пер.ампл.)" if variable_amplitude else ""
+        
+        top_state = axes_view_state(self.fig_top)
+        bottom_state = axes_view_state(self.fig_bottom)
+        
+        time = data['time']
+        signal = data['signal']
+        impulse_times = np.asarray(data['impulse_times'])
+        
+        # ЛЕВЫЙ ВЕРХНИЙ ГРАФИК: Импульсная последовательность
+        # Строится вся последовательность, по умолчанию видны первые 5 секунд
+        self.apply_default_xlim(self.ax_impulse, 'impulse_view', (0, min(5.0, params['duration'])))
+        
+        impulse_indices = np.where(signal > 0)[0]
+        impulse_positions = time[impulse_indices]
+        impulse_amplitudes = signal[impulse_indices]
+        
+        artists['impulse_marks'].set_data(impulse_positions, impulse_amplitudes)
+        artists['impulse_ticks'].set_visible(not variable_amplitude)
+        artists['impulse_stems'].set_visible(variable_amplitude)
+        artists['impulse_heads'].set_visible(variable_amplitude)
+        
+        if len(impulse_indices) > 0:
+            artists['impulse_trace'].set_data(time, signal)
+        else:
+            artists['impulse_trace'].set_data([], [])
+        
+        if variable_amplitude:
+            self.ax_impulse.set_ylim(-0.2, 2.5)
+            self.ax_impulse.set_ylabel('Амплитуда')
+        else:
+            self.ax_impulse.set_ylim(-0.2, 1.5)
+            self.ax_impulse.set_ylabel('Сигнал (0/1)')
+        artists['impulse_unit'].set_visible(not variable_amplitude)
+        
+        self.ax_impulse.set_title(f'Импульсная последовательность{amp_status} ({data["law_name"]})', 
+                                  fontsize=11, fontweight='bold')
+        
+        total_impulses = len(impulse_times)
+        
+        info_text = f'Всего импульсов: {total_impulses}\n'
+        info_text += f'Нач. частота: {params["start_freq"]:.1f} Гц\n'
+        info_text += f'Кон. частота: {params["end_freq"]:.1f} Гц'
+        
+        if variable_amplitude and total_impulses > 0:
+            min_amp = np.min(signal[signal > 0])
+            max_amp = np.max(signal[signal > 0])
+            info_text += f'\nАмплитуда: {min_amp:.1f}→{max_amp:.1f}'
+        
+        artists['impulse_info'].set_text(info_text)
+        
+        # ПРАВЫЙ ВЕРХНИЙ ГРАФИК: Свертка
+        # Строится вся свертка, по умолчанию видна первая секунда
+        convolution_duration = min(1.0, params['duration'])
+        self.apply_default_xlim(self.ax_convolution, 'convolution_view', (0, convolution_duration))
+        conv_values = data['convolution']
+        
+        artists['conv_trace'].set_data(time, conv_values)
+        
+        artists['conv_marks'].set_data(impulse_times, np.ones(len(impulse_times)))
+        
+        conv_impulse_times = impulse_times[impulse_times <= convolution_duration]
+        
+        if len(conv_values) > 0:
+            y_min, y_max = np.min(conv_values), np.max(conv_values)
+            if y_max > y_min:
+                limits['convolution'] = stable_limits(limits.get('convolution'), y_min, y_max, margin=0.1)
+                self.ax_convolution.set_ylim(*limits['convolution'])
+        
+        self.ax_convolution.set_title(f'Свертка с вейвлетом Рикера{amp_status} ({params["ricker_freq"]} Гц)', 
+                                      fontsize=11, fontweight='bold')
+        
+        conv_info = f'Частота Рикера: {params["ricker_freq"]} Гц\n'
+        conv_info += f'Макс. амплитуда: {np.max(np.abs(conv_values)):.3f}\n'
+        conv_info += f'Импульсов в области: {len(conv_impulse_times)}'
+        artists['conv_info'].set_text(conv_info)
+        
+        # ЛЕВЫЙ НИЖНИЙ ГРАФИК: АКФ с огибающей и отметкой побочного пика
+        lag_times = data['lag_times']
+        autocorr = data['autocorr']
+        envelope = data['envelope']
+        max_side_peak = data['max_side_peak']
+        max_side_idx = data['max_side_idx']
+        
+        artists['acf_line'].set_data(lag_times, autocorr)
+        artists['acf_fill'].set_verts([fill_polygon(lag_times, autocorr)])
+        artists['acf_envelope'].set_data(lag_times, envelope)
+        
+        # Отмечаем максимальный побочный пик кружком и вертикальной линией от нуля
+        has_peak = max_side_peak > 0
+        if has_peak:
+            max_side_lag = lag_times[max_side_idx]
+            artists['acf_peak'].set_data([max_side_lag], [autocorr[max_side_idx]])
+            artists['acf_peak_stem'].set_data([max_side_lag, max_side_lag], [0, autocorr[max_side_idx]])
+        artists['acf_peak'].set_visible(has_peak)
+        artists['acf_peak_stem'].set_visible(has_peak)
+        
+        legend_handles = [artists['acf_line'], artists['acf_envelope']]
+        if has_peak:
+            legend_handles.append(artists['acf_peak'])
+        legend = self.ax_autocorr.get_legend()
+        if legend is None or len(legend.get_texts()) != len(legend_handles):
+            self.ax_autocorr.legend(handles=legend_handles, loc='upper right', fontsize=8)
+        
+        limits['autocorr'] = stable_limits(limits.get('autocorr'),
+                                           min(np.min(autocorr), np.min(envelope), 0.0),
+                                           max(np.max(autocorr), np.max(envelope)))
+        self.ax_autocorr.set_ylim(*limits['autocorr'])
+        self.ax_autocorr.set_title(f'Автокорреляция свертки{amp_status}', fontsize=12)
+        
+        acf_info = f'Площадь АКФ: {data["area"]:.3f}\n'
+        acf_info += f'Пл. под огиб. АКФ: {data["envelope_area"]:.4f}\n'
+        acf_info += f'Макс. побочный пик: {max_side_peak:.4f}'
+        artists['acf_info'].set_text(acf_info)
+        
+        # ПРАВЫЙ НИЖНИЙ ГРАФИК: Спектр
+        spectrum_freq = data['spectrum_freq']
+        spectrum = data['spectrum']
+        
+        artists['spectrum_line'].set_data(spectrum_freq, spectrum)
+        artists['spectrum_fill'].set_verts([fill_polygon(spectrum_freq, spectrum)])
+        
+        max_freq = min(500, 1/(2*params['dt']))
+        freq_mask = spectrum_freq <= max_freq
+        
+        show_dominant = False
+        if len(spectrum_freq[freq_mask]) > 1:
+            self.ax_spectrum.set_xlim(0, max_freq)
+            
+            spectrum_freq_masked = spectrum_freq[freq_mask]
+            spectrum_masked = spectrum[freq_mask]
+            dominant_freq_idx = np.argmax(spectrum_masked)
+            dominant_freq = spectrum_freq_masked[dominant_freq_idx]
+            dominant_amp = spectrum_masked[dominant_freq_idx]
+            
+            artists['spectrum_peak'].set_xdata([dominant_freq, dominant_freq])
+            show_dominant = True
+            
+            if dominant_amp > 0.1:
+                artists['spectrum_info'].set_text(f'Доминирующая частота:\n{dominant_freq:.1f} Гц ({dominant_amp:.2f})')
+            else:
+                artists['spectrum_info'].set_text('')
+        elif len(spectrum_freq) > 1:
+            self.ax_spectrum.set_xlim(spectrum_freq[0], spectrum_freq[-1])
+        artists['spectrum_peak'].set_visible(show_dominant)
+        artists['spectrum_info'].set_visible(show_dominant and artists['spectrum_info'].get_text() != '')
+        
+        if len(spectrum) > 0:
+            limits['spectrum'] = stable_limits(limits.get('spectrum'), min(np.min(spectrum), 0.0), np.max(spectrum))
+            self.ax_spectrum.set_ylim(*limits['spectrum'])
+        self.ax_spectrum.set_title(f'Спектр автокорреляционной функции{amp_status}', fontsize=12)
+        
+        self.blit_top.update(full_redraw=axes_view_state(self.fig_top) != top_state)
+        self.blit_bottom.update(full_redraw=axes_view_state(self.fig_bottom) != bottom_state)
+    
     def save_autocorrelation(self):
         """Сохранение АКФ в текстовый файл"""
         if not hasattr(self, 'current_data'):
             messagebox.showwarning("Нет данных", "Сначала постройте графики")
             return
+        # Параметры именно того расчета, который показан на графиках
+        params = self.current_data['params']
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
             filetypes=[("Текстовые файлы", "*.txt"), ("Все файлы", "*.*")],
-            initialfile=f"АКФ_{self.params['duration']}сек_{self.params['law_type']}{'_varamp' if self.params['variable_amplitude'] else ''}.txt"
+            initialfile=f"АКФ_{params['duration']}сек_{params['law_type']}{'_varamp' if params['variable_amplitude'] else ''}.txt"
         )
         
         if not file_path:
@@ -2070,12 +2157,12 @@ class AutocorrelationApp:
                 f.write("=" * 80 + "\n")
                 f.write(f"Параметры:\n")
                 f.write(f"  Закон изменения частоты: {self.current_data['law_name']}\n")
-                if self.params['variable_amplitude']:
+                if params['variable_amplitude']:
                     f.write(f"  Амплитуда импульсов: линейно от 1 до 2\n")
-                f.write(f"  Частота вейвлета Рикера: {self.params['ricker_freq']} Гц\n")
-                f.write(f"  Длительность последовательности: {self.params['duration']} сек\n")
-                f.write(f"  Начальная частота импульсов: {self.params['start_freq']} Гц\n")
-                f.write(f"  Конечная частота импульсов: {self.params['end_freq']} Гц\n")
+                f.write(f"  Частота вейвлета Рикера: {params['ricker_freq']} Гц\n")
+                f.write(f"  Длительность последовательности: {params['duration']} сек\n")
+                f.write(f"  Начальная частота импульсов: {params['start_freq']} Гц\n")
+                f.write(f"  Конечная частота импульсов: {params['end_freq']} Гц\n")
                 f.write(f"  Площадь под графиком АКФ: {self.current_data['area']:.4f}\n")
                 f.write(f"  Площадь под огибающей АКФ: {self.current_data['envelope_area']:.6f}\n")
                 f.write(f"  Максимальный побочный пик АКФ: {self.current_data['max_side_peak']:.6f}\n")
@@ -2115,11 +2202,12 @@ class AutocorrelationApp:
         if not hasattr(self, 'current_data'):
             messagebox.showwarning("Нет данных", "Сначала постройте графики")
             return
+        params = self.current_data['params']
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
             filetypes=[("Текстовые файлы", "*.txt"), ("Все файлы", "*.*")],
-            initialfile=f"Времена_ударов_{self.params['duration']}сек_{self.params['law_type']}{'_varamp' if self.params['variable_amplitude'] else ''}.txt"
+            initialfile=f"Времена_ударов_{params['duration']}сек_{params['law_type']}{'_varamp' if params['variable_amplitude'] else ''}.txt"
         )
         
         if not file_path:
@@ -2131,18 +2219,18 @@ class AutocorrelationApp:
                 f.write("=" * 70 + "\n")
                 f.write(f"Параметры:\n")
                 f.write(f"  Закон изменения частоты: {self.current_data['law_name']}\n")
-                if self.params['variable_amplitude']:
+                if params['variable_amplitude']:
                     f.write(f"  Амплитуда импульсов: линейно от 1 до 2\n")
-                f.write(f"  Длительность последовательности: {self.params['duration']} сек\n")
-                f.write(f"  Начальная частота: {self.params['start_freq']} Гц\n")
-                f.write(f"  Конечная частота: {self.params['end_freq']} Гц\n")
+                f.write(f"  Длительность последовательности: {params['duration']} сек\n")
+                f.write(f"  Начальная частота: {params['start_freq']} Гц\n")
+                f.write(f"  Конечная частота: {params['end_freq']} Гц\n")
                 f.write(f"  Общее число импульсов: {len(self.current_data['impulse_times'])}\n")
-                f.write(f"  Частота вейвлета Рикера: {self.params['ricker_freq']} Гц\n")
+                f.write(f"  Частота вейвлета Рикера: {params['ricker_freq']} Гц\n")
                 f.write("=" * 70 + "\n")
                 f.write("№\tВремя(сек)\tВремя(мс)\tЧастота(Гц)\tПериод(мс)\tАмплитуда\tДискретный_сигнал\n")
                 f.write("-" * 70 + "\n")
                 
-                dt = self.params['dt']
+                dt = params['dt']
                 
                 for i, (imp_time, imp_freq) in enumerate(zip(self.current_data['impulse_times'], 
                                                            self.current_data['impulse_frequencies'])):
@@ -2168,11 +2256,12 @@ class AutocorrelationApp:
         if not hasattr(self, 'current_data'):
             messagebox.showwarning("Нет данных", "Сначала постройте графики")
             return
+        params = self.current_data['params']
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
             filetypes=[("Текстовые файлы", "*.txt"), ("Все файлы", "*.*")],
-            initialfile=f"Свертка_{self.params['duration']}сек_{self.params['law_type']}{'_varamp' if self.params['variable_amplitude'] else ''}.txt"
+            initialfile=f"Свертка_{params['duration']}сек_{params['law_type']}{'_varamp' if params['variable_amplitude'] else ''}.txt"
         )
         
         if not file_path:
@@ -2184,13 +2273,13 @@ class AutocorrelationApp:
                 f.write("=" * 70 + "\n")
                 f.write(f"Параметры:\n")
                 f.write(f"  Закон изменения частоты: {self.current_data['law_name']}\n")
-                if self.params['variable_amplitude']:
+                if params['variable_amplitude']:
                     f.write(f"  Амплитуда импульсов: линейно от 1 до 2\n")
-                f.write(f"  Частота вейвлета Рикера: {self.params['ricker_freq']} Гц\n")
-                f.write(f"  Длительность последовательности: {self.params['duration']} сек\n")
-                f.write(f"  Начальная частота импульсов: {self.params['start_freq']} Гц\n")
-                f.write(f"  Конечная частота импульсов: {self.params['end_freq']} Гц\n")
-                f.write(f"  Шаг по времени: {self.params['dt']} сек\n")
+                f.write(f"  Частота вейвлета Рикера: {params['ricker_freq']} Гц\n")
+                f.write(f"  Длительность последовательности: {params['duration']} сек\n")
+                f.write(f"  Начальная частота импульсов: {params['start_freq']} Гц\n")
+                f.write(f"  Конечная частота импульсов: {params['end_freq']} Гц\n")
+                f.write(f"  Шаг по времени: {params['dt']} сек\n")
                 f.write(f"  Число отсчетов: {len(self.current_data['time'])}\n")
                 f.write(f"  Максимальная амплитуда свертки: {np.max(np.abs(self.current_data['convolution'])):.6f}\n")
                 f.write("=" * 70 + "\n")
@@ -2216,16 +2305,18 @@ class AutocorrelationApp:
         if not file_path:
             return
         
+        # Параметры показанного расчета; без него - текущие параметры окна
+        params = self.current_data['params'] if hasattr(self, 'current_data') else self.params
         try:
             save_data = {
-                'parameters': self.params,
+                'parameters': params,
                 'calculated_data': {
                     'num_impulses': len(self.current_data['impulse_times']),
                     'area': float(self.current_data['area']),
                     'envelope_area': float(self.current_data['envelope_area']),
                     'max_side_peak': float(self.current_data['max_side_peak']),
                     'max_convolution': float(np.max(np.abs(self.current_data['convolution']))),
-                    'duration_seconds': float(self.params['duration']),
+                    'duration_seconds': float(params['duration']),
                     'law_type': self.current_data['law_type'],
                     'law_name': self.current_data['law_name'],
                     'variable_amplitude': self.current_data['variable_amplitude']
@@ -2246,6 +2337,7 @@ class AutocorrelationApp:
         self.duration_var.set(self.default_params['duration'])
         self.start_freq_var.set(self.default_params['start_freq'])
         self.end_freq_var.set(self.default_params['end_freq'])
+        self.dt_var.set(self.default_params['dt'] * 1000)
         self.law_type_var.set(self.default_params['law_type'])
         self.var_amp_var.set(self.default_params['variable_amplitude'])
         
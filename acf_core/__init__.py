@@ -0,0 +1,59 @@
+"""Расчетное ядро ACF_app без графического интерфейса
+
+Пакет не импортирует Tkinter и Matplotlib: его можно использовать из
+скриптов, ноутбуков и пакетных расчетов. Окна ACF_app_5.0.py и
+ACF_app_4.0.py - тонкие клиенты поверх этого ядра; окно 4.0 считает по
+своим прежним определениям метрик (модуль legacy).
+
+Пример:
+    from acf_core import (FrequencyRange, HeatmapSweep, SequenceParams,
+                          compute_sequence_analysis)
+    params = SequenceParams(duration=20.0, law_type='hyperbolic')
+    data = compute_sequence_analysis(params)
+    with HeatmapSweep(FrequencyRange(20, 40, 1).values(),
+                      FrequencyRange(30, 60, 1).values(), params) as sweep:
+        sweep.run_uniform()
+    cube = sweep.cube
+"""
+
+from .cancellation import CalculationCancelled, check_cancelled
+from .params import (ACF_LAG_WINDOW, MAX_DT, MAX_DURATION, MIN_DT,
+                     FrequencyRange, SequenceParams, as_param_dict)
+from .laws import (FREQUENCY_LAWS, MAX_IMPULSES, CompensationLaw, ExponentialLaw,
+                   FrequencyLaw, HyperbolicLaw, LinearLaw, QuadraticLaw,
+                   generate_impulse_times, get_frequency_law,
+                   scale_compensation_coefficients)
+from .signals import (convolve_same, convolve_signal, impulse_amplitudes,
+                      impulse_samples, ricker_autocorrelation, ricker_wavelet)
+from .correlation import (analytic_convolution_autocorrelation,
+                          autocorrelation_spectrum, autocorrelation_window,
+                          blocked_autocorrelation, chunked_autocorrelation,
+                          normalized_autocorrelation,
+                          sparse_convolution_autocorrelation)
+from .metrics import (HEATMAP_METRICS, compute_point_metrics,
+                      compute_sequence_analysis,
+                      envelope_area_and_max_side_peak)
+from .sweep import (HEATMAP_CACHE_PATH, HeatmapMemoryCache, HeatmapPointCache,
+                    HeatmapQuadtree, HeatmapSweep, heatmap_node_mask)
+from .optimizer import OPTIMIZER_MAX_EVALUATIONS, optimize_heatmap_metric
+from .legacy import compute_legacy_point_metric, compute_legacy_sequence_analysis
+
+__all__ = [
+    'CalculationCancelled', 'check_cancelled',
+    'ACF_LAG_WINDOW', 'MAX_DT', 'MAX_DURATION', 'MIN_DT',
+    'FrequencyRange', 'SequenceParams', 'as_param_dict',
+    'FREQUENCY_LAWS', 'MAX_IMPULSES', 'CompensationLaw', 'ExponentialLaw',
+    'FrequencyLaw', 'HyperbolicLaw', 'LinearLaw', 'QuadraticLaw',
+    'generate_impulse_times', 'get_frequency_law', 'scale_compensation_coefficients',
+    'convolve_same', 'convolve_signal', 'impulse_amplitudes', 'impulse_samples',
+    'ricker_autocorrelation', 'ricker_wavelet',
+    'analytic_convolution_autocorrelation', 'autocorrelation_spectrum',
+    'autocorrelation_window', 'blocked_autocorrelation', 'chunked_autocorrelation',
+    'normalized_autocorrelation', 'sparse_convolution_autocorrelation',
+    'HEATMAP_METRICS', 'compute_point_metrics', 'compute_sequence_analysis',
+    'envelope_area_and_max_side_peak',
+    'HEATMAP_CACHE_PATH', 'HeatmapMemoryCache', 'HeatmapPointCache',
+    'HeatmapQuadtree', 'HeatmapSweep', 'heatmap_node_mask',
+    'OPTIMIZER_MAX_EVALUATIONS', 'optimize_heatmap_metric',
+    'compute_legacy_point_metric', 'compute_legacy_sequence_analysis',
+]
@@ -0,0 +1,9 @@
+"""Точка входа: python -m acf_core sweep.json"""
+
+import sys
+
+from .cli import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""Кооперативная отмена длительных расчетов"""
+
+
+class CalculationCancelled(Exception):
+    """Расчет прерван по запросу пользователя"""
+
+
+def check_cancelled(cancel):
+    """Проверка признака отмены (threading.Event, multiprocessing.Event или None)"""
+    if cancel is not None and cancel.is_set():
+        raise CalculationCancelled()
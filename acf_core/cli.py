@@ -0,0 +1,329 @@
+"""
+Пакетный расчет тепловых карт из командной строки, без окон
+
+Запуск: python -m acf_core sweep.json [-o папка] [--no-cache] [--no-png]
+
+Файл задания - JSON с теми же ключами, что сохраняет кнопка «Сохранить все
+параметры» (раздел 'parameters'), и ключами диапазонов перебора окна
+подбора частот:
+    
+    {
+        "parameters": {"ricker_freq": 100.0, "duration": 10.0, "dt": 0.001,
+                       "law_type": "exponential", "variable_amplitude": false},
+        "start_freq_min": 10.0, "start_freq_max": 25.0, "start_freq_step": 1.0,
+        "end_freq_min": 30.0, "end_freq_max": 60.0, "end_freq_step": 1.0,
+        "heatmap_types": ["envelope_area", "max_side_peak"],
+        "runs": [{"law_type": "linear"}, {"law_type": "hyperbolic", "duration": 40.0}]
+    }
+
+Каждый элемент runs - отдельная карта: его ключи (параметры и диапазоны)
+заменяют общие. Без runs считается одна карта. Для каждой карты в папку
+результатов пишутся куб метрик (.npz) и изображения выбранных карт (.png),
+в конце - сводка sweep_summary.json. Ход расчета выводится в stderr.
+
+Код возврата: 0 - все карты посчитаны, 1 - хотя бы одна карта не посчитана
+полностью, 2 - ошибка в задании, 130 - расчет прерван (Ctrl+C).
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .laws import FREQUENCY_LAWS, MAX_IMPULSES
+from .metrics import HEATMAP_METRICS
+from .params import FrequencyRange, SequenceParams
+from .sweep import ADAPTIVE_POINT_BUDGET, HeatmapMemoryCache, HeatmapPointCache, HeatmapSweep
+
+
+# Ключи диапазонов перебора (как в окне подбора частот)
+RANGE_KEYS = ('start_freq_min', 'start_freq_max', 'start_freq_step',
+              'end_freq_min', 'end_freq_max', 'end_freq_step')
+
+# Прочие ключи задания и элементов runs
+SWEEP_KEYS = ('heatmap_type', 'heatmap_types', 'sweep_mode', 'adaptive_budget')
+
+PARAM_KEYS = tuple(field.name for field in dataclasses.fields(SequenceParams))
+
+# Не чаще этого интервала (сек) ход расчета выводится в stderr
+CLI_PROGRESS_INTERVAL = 2.0
+
+# Заголовки изображений и подписи шкал по типам карт
+HEATMAP_LABELS = {
+    'area': ("Площадь под АКФ", 'Площадь под АКФ'),
+    'envelope_area': ("Площадь под огибающей АКФ", 'Площадь под огибающей'),
+    'max_side_peak': ("Максимальный побочный пик АКФ", 'Амплитуда побочного пика'),
+    'impulse_count': ("Число импульсов", 'Число импульсов'),
+    'center_freq': ("Центральная частота (Гц)", 'Центральная частота (Гц)')
+}
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def load_sweep_spec(path):
+    """
+    Чтение файла задания: список карт, каждая - словарь с ключами
+    'params' (SequenceParams), 'start_freqs', 'end_freqs', 'heatmap_types',
+    'sweep_mode', 'adaptive_budget'. Ошибки задания - ValueError.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict):
+        raise ValueError("Задание должно быть JSON-объектом")
+    
+    if not isinstance(spec.get('parameters', {}), dict):
+        raise ValueError("parameters должен быть JSON-объектом")
+    base = dict(spec.get('parameters', {}))
+    known = set(RANGE_KEYS) | set(SWEEP_KEYS) | set(PARAM_KEYS) | {'parameters', 'calculated_data', 'runs'}
+    unknown = set(spec) - known
+    if unknown:
+        raise ValueError(f"Неизвестные ключи задания: {', '.join(sorted(unknown))}")
+    base.update({key: value for key, value in spec.items() if key not in ('parameters', 'calculated_data', 'runs')})
+    
+    runs = spec.get('runs') or [{}]
+    if not isinstance(runs, list):
+        raise ValueError("runs должен быть списком")
+    
+    sweeps = []
+    for number, run in enumerate(runs, 1):
+        if not isinstance(run, dict):
+            raise ValueError(f"Карта {number}: элемент runs должен быть JSON-объектом")
+        unknown = set(run) - set(RANGE_KEYS) - set(SWEEP_KEYS) - set(PARAM_KEYS)
+        if unknown:
+            raise ValueError(f"Карта {number}: неизвестные ключи {', '.join(sorted(unknown))}")
+        merged = dict(base)
+        merged.update(run)
+        # Окно лагов пересчитывается под новый шаг, если оно не задано явно
+        if 'dt' in run and 'max_lag' not in run:
+            merged.pop('max_lag', None)
+        sweeps.append(_sweep_from_dict(merged, number))
+    return sweeps
+
+
+def _sweep_from_dict(merged, number):
+    """Проверка и разбор параметров одной карты"""
+    try:
+        missing = [key for key in RANGE_KEYS if key not in merged]
+        if missing:
+            raise ValueError(f"не заданы {', '.join(missing)}")
+        
+        params = SequenceParams.from_dict(
+            {key: merged[key] for key in PARAM_KEYS if key in merged and key not in ('start_freq', 'end_freq')})
+        params.validate(check_frequencies=False)
+        if params.law_type not in FREQUENCY_LAWS:
+            raise ValueError(f"Неизвестный закон изменения частоты: {params.law_type}")
+        start_range = FrequencyRange(*(float(merged[key]) for key in RANGE_KEYS[:3])).validate()
+        end_range = FrequencyRange(*(float(merged[key]) for key in RANGE_KEYS[3:])).validate()
+        
+        heatmap_types = merged.get('heatmap_types') or [merged.get('heatmap_type', 'envelope_area')]
+        if isinstance(heatmap_types, str):
+            heatmap_types = [heatmap_types]
+        for heatmap_type in heatmap_types:
+            if heatmap_type not in HEATMAP_METRICS:
+                raise ValueError(f"неизвестный тип карты {heatmap_type!r} (допустимы: {', '.join(HEATMAP_METRICS)})")
+        
+        sweep_mode = merged.get('sweep_mode', 'uniform')
+        if sweep_mode not in ('uniform', 'adaptive'):
+            raise ValueError("sweep_mode должен быть 'uniform' или 'adaptive'")
+        adaptive_budget = int(merged.get('adaptive_budget', ADAPTIVE_POINT_BUDGET))
+        if adaptive_budget <= 0:
+            raise ValueError("Бюджет точек должен быть > 0")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Карта {number}: {e}") from e
+    
+    return {
+        'params': params,
+        'start_freqs': start_range.values(),
+        'end_freqs': end_range.values(),
+        'heatmap_types': list(heatmap_types),
+        'sweep_mode': sweep_mode,
+        'adaptive_budget': adaptive_budget
+    }
+
+
+def sweep_file_stem(number, params):
+    """Основа имен файлов карты: номер, закон, частота Рикера, длительность"""
+    stem = f"{number:02d}_{params.law_type}_{params.ricker_freq:g}Hz_{params.duration:g}s"
+    if params.variable_amplitude:
+        stem += "_varamp"
+    return stem
+
+
+def sweep_parameters(params):
+    """Параметры карты для записи в результаты (без неиспользуемых при переборе частот)"""
+    return {key: value for key, value in params.to_dict().items()
+            if key not in ('start_freq', 'end_freq')}
+
+
+def render_heatmap_png(path, start_freqs, end_freqs, matrix, shown, heatmap_type, params):
+    """Изображение карты (Agg); непосчитанные и недопустимые узлы прозрачны"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    title, cbar_label = HEATMAP_LABELS[heatmap_type]
+    values = matrix[shown]
+    vmin = values.min() if values.size else 0
+    vmax = values.max() if values.size else 1
+    
+    x_step = start_freqs[1] - start_freqs[0] if len(start_freqs) > 1 else 1.0
+    y_step = end_freqs[1] - end_freqs[0] if len(end_freqs) > 1 else 1.0
+    extent = (start_freqs[0] - x_step/2, start_freqs[-1] + x_step/2,
+              end_freqs[0] - y_step/2, end_freqs[-1] + y_step/2)
+    
+    fig = Figure(figsize=(9, 7), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    image = ax.imshow(np.ma.masked_where(~shown, matrix), cmap='RdYlBu_r', vmin=vmin, vmax=vmax,
+                      extent=extent, origin='lower', aspect='auto', interpolation='nearest')
+    fig.colorbar(image, ax=ax).set_label(cbar_label, fontsize=10)
+    
+    amp_status = ", пер. ампл." if params.variable_amplitude else ""
+    ax.set_title(f"{title}\n{params.law_type}, Рикер {params.ricker_freq:g} Гц, "
+                 f"{params.duration:g} сек{amp_status}", fontsize=11, fontweight='bold')
+    ax.set_xlabel('Начальная частота (Гц)', fontsize=10)
+    ax.set_ylabel('Конечная частота (Гц)', fontsize=10)
+    ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5, color='gray')
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def run_sweep(number, total_runs, sweep_spec, output_dir, memory_cache, disk_cache, render_png):
+    """Расчет одной карты и запись ее файлов; возвращает запись сводки"""
+    params = sweep_spec['params']
+    saved_params = sweep_parameters(params)
+    start_freqs = sweep_spec['start_freqs']
+    end_freqs = sweep_spec['end_freqs']
+    stem = sweep_file_stem(number, params)
+    label = f"[{number}/{total_runs}] {stem}"
+    last_report = {'time': 0.0, 'completed': None}
+    
+    def report(progress):
+        now = time.perf_counter()
+        finished = progress['completed'] >= progress['total'] and progress['completed'] != last_report['completed']
+        if now - last_report['time'] < CLI_PROGRESS_INTERVAL and not finished:
+            return
+        last_report.update(time=now, completed=progress['completed'])
+        eta = f", осталось {progress['eta']:.0f} сек" if progress['eta'] is not None else ""
+        log(f"{label}: {progress['completed']}/{progress['total']} точек, "
+            f"{progress['rate']:.1f} точек/сек, из кэша {progress['cache_hits']}{eta}")
+    
+    log(f"{label}: сетка {len(start_freqs)}x{len(end_freqs)}, {sweep_spec['sweep_mode']}")
+    start_time = time.perf_counter()
+    
+    with HeatmapSweep(start_freqs, end_freqs, params, backend='process',
+                      memory_cache=memory_cache, disk_cache=disk_cache,
+                      progress_callback=report) as sweep:
+        if sweep_spec['sweep_mode'] == 'adaptive':
+            sweep.run_adaptive(sweep_spec['heatmap_types'][0], sweep_spec['adaptive_budget'])
+        else:
+            sweep.run_uniform()
+    
+    # Точки с ошибкой расчета (отдельные и целых пакетов) и пропущенные нулевые,
+    # но ошибкой задания считаются только первые
+    failed = sweep.failed_points
+    skipped = sweep.skipped_points
+    
+    files = []
+    cube_path = output_dir / f"{stem}.npz"
+    np.savez_compressed(cube_path, cube=sweep.cube, metrics=np.array(HEATMAP_METRICS),
+                        start_freqs=start_freqs, end_freqs=end_freqs, computed=sweep.computed,
+                        failed=sweep.failed, skipped=sweep.skipped, params=json.dumps(saved_params))
+    files.append(cube_path.name)
+    
+    if render_png:
+        for heatmap_type in sweep_spec['heatmap_types']:
+            png_path = output_dir / f"{stem}_{heatmap_type}.png"
+            matrix = sweep.cube[HEATMAP_METRICS.index(heatmap_type)]
+            render_heatmap_png(png_path, start_freqs, end_freqs, matrix,
+                               sweep.computed & (matrix > 0), heatmap_type, params)
+            files.append(png_path.name)
+    
+    elapsed = time.perf_counter() - start_time
+    if failed:
+        log(f"{label}: не посчитано {failed} точек")
+    if skipped:
+        log(f"{label}: пропущено {skipped} точек (больше {MAX_IMPULSES} импульсов)")
+    log(f"{label}: готово за {elapsed:.1f} сек")
+    
+    return {
+        'name': stem,
+        'parameters': saved_params,
+        'points': int(sweep.computed.sum()),
+        'cache_hits': sweep.cache_hits,
+        'failed_points': failed,
+        'skipped_points': skipped,
+        'elapsed': elapsed,
+        'files': files,
+        'ok': failed == 0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m acf_core',
+        description="Пакетный расчет тепловых карт метрик АКФ по заданию в JSON")
+    parser.add_argument('spec', help="файл задания (JSON)")
+    parser.add_argument('-o', '--output', default=None,
+                        help="папка результатов (по умолчанию - рядом с заданием, <имя задания>_results)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="не использовать постоянный кэш точек ~/.acf_app/heatmap_cache.sqlite")
+    parser.add_argument('--no-png', action='store_true', help="не строить изображения карт")
+    args = parser.parse_args(argv)
+    
+    spec_path = Path(args.spec)
+    try:
+        sweeps = load_sweep_spec(spec_path)
+    except (OSError, TypeError, ValueError) as e:
+        log(f"Ошибка задания {spec_path}: {e}")
+        return 2
+    
+    output_dir = Path(args.output) if args.output else spec_path.with_name(f"{spec_path.stem}_results")
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        log(f"Не удалось создать папку результатов {output_dir}: {e}")
+        return 2
+    
+    memory_cache = HeatmapMemoryCache()
+    disk_cache = None
+    if not args.no_cache:
+        try:
+            disk_cache = HeatmapPointCache()
+        except Exception as e:
+            log(f"Кэш тепловой карты недоступен: {e}")
+    
+    summary = []
+    try:
+        for number, sweep_spec in enumerate(sweeps, 1):
+            try:
+                summary.append(run_sweep(number, len(sweeps), sweep_spec, output_dir,
+                                         memory_cache, disk_cache, not args.no_png))
+            except Exception as e:
+                log(f"[{number}/{len(sweeps)}] Ошибка расчета: {e}")
+                summary.append({'name': sweep_file_stem(number, sweep_spec['params']),
+                                'parameters': sweep_parameters(sweep_spec['params']),
+                                'error': str(e), 'ok': False})
+    except KeyboardInterrupt:
+        log("Расчет прерван")
+        return 130
+    finally:
+        if disk_cache is not None:
+            disk_cache.close()
+        try:
+            with open(output_dir / 'sweep_summary.json', 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=4, ensure_ascii=False)
+        except OSError as e:
+            log(f"Не удалось записать сводку: {e}")
+    
+    failed = sum(not entry['ok'] for entry in summary)
+    if failed:
+        log(f"Не посчитано карт: {failed} из {len(sweeps)}")
+        return 1
+    log(f"Готово: {len(sweeps)} карт, результаты в {output_dir}")
+    return 0
@@ -0,0 +1,305 @@
+"""Автокорреляционная функция: прямой, БПФ, разреженный, потоковый и аналитический расчет"""
+
+import concurrent.futures
+
+import numpy as np
+from scipy import fft as scipy_fft
+
+from .cancellation import check_cancelled
+from .signals import RICKER_ACF_CUTOFF_EXPONENT, convolve_signal, ricker_autocorrelation_analytic
+
+
+# Во сколько раз прямой расчет АКФ может быть "дороже" оценки стоимости БПФ,
+# оставаясь при этом быстрее (подобрано замерами: накладные расходы на цикл лагов)
+ACF_DIRECT_COST_RATIO = 8.0
+
+# Через сколько лагов прямого расчета АКФ проверяется признак отмены
+CANCEL_CHECK_LAGS = 64
+
+
+def lag_window_correlation(head, tail, max_lag, method='auto', cancel=None):
+    """
+    Корреляция c[k] = sum_n head[n] * tail[n + k] для лагов k = 0..max_lag
+
+    tail считается нулевым за пределами своей длины.
+    method: 'direct' - скалярное произведение для каждого лага,
+            'fft' - через взаимный спектр, 'auto' - выбор по оценке стоимости.
+    cancel - признак отмены (Event), проверяется по ходу расчета.
+    """
+    head = np.asarray(head, dtype=float)
+    tail = np.asarray(tail, dtype=float)
+    n = len(head)
+    max_lag = int(max_lag)
+
+    correlation = np.zeros(max_lag + 1)
+    if n == 0 or len(tail) == 0:
+        return correlation
+
+    # Лаги, на которых tail уже закончился, дают нулевую корреляцию
+    n_lags = min(max_lag, len(tail) - 1) + 1
+    fft_len = scipy_fft.next_fast_len(n + n_lags, real=True)
+
+    if method == 'auto':
+        direct_cost = n * n_lags
+        fft_cost = fft_len * np.log2(fft_len)
+        method = 'direct' if direct_cost <= ACF_DIRECT_COST_RATIO * fft_cost else 'fft'
+
+    check_cancelled(cancel)
+    if method == 'direct':
+        for k in range(n_lags):
+            if k % CANCEL_CHECK_LAGS == 0:
+                check_cancelled(cancel)
+            overlap = min(n, len(tail) - k)
+            correlation[k] = np.dot(head[:overlap], tail[k:k + overlap])
+    elif method == 'fft':
+        # Длина БПФ >= n + max_lag исключает циклическое наложение в окне лагов
+        head_spectrum = scipy_fft.rfft(head, fft_len)
+        tail_spectrum = scipy_fft.rfft(tail[:n + n_lags - 1], fft_len)
+        cross = np.conj(head_spectrum) * tail_spectrum
+        correlation[:n_lags] = scipy_fft.irfft(cross, fft_len)[:n_lags]
+    else:
+        raise ValueError(f"Неизвестный метод расчета АКФ: {method}")
+
+    return correlation
+
+
+def autocorrelation_window(x, max_lag, method='auto', cancel=None):
+    """
+    Вычисление АКФ только в окне лагов [-max_lag, max_lag]
+
+    method: 'direct' - скалярное произведение для каждого лага,
+            'fft' - через спектр мощности, 'auto' - выбор по оценке стоимости.
+    Возвращает ненормированную АКФ длиной 2*max_lag+1 (как срез np.correlate 'full')
+    """
+    autocorr_pos = lag_window_correlation(x, x, max_lag, method, cancel)
+
+    # АКФ вещественного сигнала симметрична
+    return np.concatenate([autocorr_pos[:0:-1], autocorr_pos])
+
+
+def spike_train_autocorrelation(indices, amplitudes, max_lag, cancel=None):
+    """
+    АКФ разреженной импульсной последовательности в окне [-max_lag, max_lag]
+
+    Считается по попарным разностям отсортированных уникальных индексов:
+    для каждого импульса учитываются только соседи не дальше max_lag отсчетов.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    max_lag = int(max_lag)
+
+    autocorr_pos = np.zeros(max_lag + 1)
+
+    if len(indices) > 0:
+        autocorr_pos[0] = np.sum(amplitudes**2)
+
+        # Максимальное число соседей импульса внутри окна лагов
+        window_end = np.searchsorted(indices, indices + max_lag, side='right')
+        max_shift = int(np.max(window_end - np.arange(len(indices)))) - 1
+
+        for shift in range(1, max_shift + 1):
+            check_cancelled(cancel)
+            diffs = indices[shift:] - indices[:-shift]
+            in_window = diffs <= max_lag
+            weights = amplitudes[shift:][in_window] * amplitudes[:-shift][in_window]
+            autocorr_pos += np.bincount(diffs[in_window], weights=weights, minlength=max_lag + 1)
+
+    return np.concatenate([autocorr_pos[:0:-1], autocorr_pos])
+
+
+def sparse_convolution_autocorrelation(indices, amplitudes, ricker_autocorr, max_lag, cancel=None):
+    """
+    АКФ свертки импульсной последовательности с вейвлетом без построения сигнала:
+    АКФ импульсов, свернутая с АКФ вейвлета (краевые эффекты свертки не учитываются)
+    """
+    half = len(ricker_autocorr) // 2
+    spike_autocorr = spike_train_autocorrelation(indices, amplitudes, max_lag + half, cancel)
+    return np.convolve(spike_autocorr, ricker_autocorr, mode='valid')
+
+
+# Длина блока потокового расчета АКФ (отсчетов свертки)
+STREAM_CHUNK_SAMPLES = 1 << 20
+
+
+def _stream_chunk_correlation(sample_indices, amplitudes, wavelet, n_samples,
+                              start, stop, max_lag, conv_method, cancel=None):
+    """
+    Вклад отсчетов свертки [start, stop) в АКФ на лагах 0..max_lag
+
+    Строит только участок импульсного сигнала, влияющий на свертку
+    в [start, stop + max_lag), так что память ограничена размером блока.
+    """
+    m = len(wavelet)
+    # В режиме 'same' отсчет n свертки равен отсчету n + center полной свертки
+    center = (m - 1) // 2
+    stop_ext = min(n_samples, stop + max_lag)
+
+    segment_start = max(0, start + center - m + 1)
+    segment_stop = min(n_samples, stop_ext + center)
+
+    lo, hi = np.searchsorted(sample_indices, [segment_start, segment_stop])
+    segment = np.zeros(segment_stop - segment_start)
+    segment[sample_indices[lo:hi] - segment_start] = amplitudes[lo:hi]
+
+    check_cancelled(cancel)
+    full = convolve_signal(segment, wavelet, conv_method, mode='full')
+    chunk = full[start + center - segment_start:stop_ext + center - segment_start]
+
+    return lag_window_correlation(chunk[:stop - start], chunk, max_lag, cancel=cancel)
+
+
+def chunked_autocorrelation(sample_indices, amplitudes, wavelet, n_samples, max_lag,
+                            conv_method='auto', chunk_samples=STREAM_CHUNK_SAMPLES,
+                            max_workers=1, cancel=None):
+    """
+    Потоковый расчет АКФ свертки импульсов с вейвлетом в окне [-max_lag, max_lag]
+
+    Результат совпадает с autocorrelation_window(convolve_same(signal, wavelet)),
+    но сигнал длиной n_samples целиком не строится: блоки с перекрытием max_lag
+    генерируются, свертываются и накапливаются независимо (при max_workers > 1 -
+    параллельно, numpy/scipy освобождают GIL в БПФ и скалярных произведениях).
+    """
+    sample_indices = np.asarray(sample_indices, dtype=np.int64)
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    max_lag = int(max_lag)
+    wavelet = np.asarray(wavelet, dtype=float)
+
+    def chunk_task(bound):
+        return _stream_chunk_correlation(sample_indices, amplitudes, wavelet, n_samples,
+                                         bound[0], bound[1], max_lag, conv_method, cancel)
+
+    autocorr_pos = _accumulate_chunks(chunk_task, n_samples, max_lag, chunk_samples, max_workers, cancel)
+    return np.concatenate([autocorr_pos[:0:-1], autocorr_pos])
+
+
+def blocked_autocorrelation(x, max_lag, chunk_samples=STREAM_CHUNK_SAMPLES, max_workers=None, cancel=None):
+    """АКФ уже построенного длинного сигнала по блокам с перекрытием max_lag (параллельно)"""
+    x = np.asarray(x, dtype=float)
+    max_lag = int(max_lag)
+
+    def chunk_task(bound):
+        start, stop = bound
+        return lag_window_correlation(x[start:stop], x[start:stop + max_lag], max_lag, cancel=cancel)
+
+    autocorr_pos = _accumulate_chunks(chunk_task, len(x), max_lag, chunk_samples, max_workers, cancel)
+    return np.concatenate([autocorr_pos[:0:-1], autocorr_pos])
+
+
+def _accumulate_chunks(chunk_task, n_samples, max_lag, chunk_samples, max_workers, cancel=None):
+    """Сумма вкладов блоков [start, stop) в АКФ на лагах 0..max_lag (с проверкой отмены между блоками)"""
+    bounds = [(start, min(start + chunk_samples, n_samples))
+              for start in range(0, n_samples, chunk_samples)]
+
+    autocorr_pos = np.zeros(max_lag + 1)
+    if len(bounds) > 1 and (max_workers is None or max_workers > 1):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for part in executor.map(chunk_task, bounds):
+                check_cancelled(cancel)
+                autocorr_pos += part
+    else:
+        for bound in bounds:
+            check_cancelled(cancel)
+            autocorr_pos += chunk_task(bound)
+
+    return autocorr_pos
+
+
+# Сколько разностей времен обрабатывается за один векторный шаг
+ANALYTIC_PAIR_BLOCK = 100000
+
+
+def analytic_convolution_autocorrelation(impulse_times, amplitudes, frequency, max_lag, dt, cancel=None):
+    """
+    АКФ свертки импульсов с вейвлетом Рикера без дискретизации времен импульсов
+
+    Сумма АКФ вейвлета, сдвинутой на каждую точную разность времен пары импульсов,
+    вычисляется сразу на оси лагов k*dt, k = -max_lag..max_lag.
+    Стоимость пропорциональна числу пар импульсов внутри окна лагов.
+    """
+    times = np.asarray(impulse_times, dtype=float)
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    max_lag = int(max_lag)
+
+    autocorr_pos = np.zeros(max_lag + 1)
+    if len(times) == 0:
+        return np.concatenate([autocorr_pos[:0:-1], autocorr_pos])
+
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    amplitudes = amplitudes[order]
+
+    support = np.sqrt(2.0 * RICKER_ACF_CUTOFF_EXPONENT) / (np.pi * frequency)
+    max_diff = max_lag * dt + support
+    half_width = int(np.ceil(support / dt)) + 1
+    offsets = np.arange(-half_width, half_width + 1)
+
+    # Собственный вклад каждого импульса (разность времен 0)
+    diffs_list = [np.zeros(1)]
+    weights_list = [np.array([np.sum(amplitudes**2)])]
+
+    window_end = np.searchsorted(times, times + max_diff, side='right')
+    max_shift = int(np.max(window_end - np.arange(len(times)))) - 1
+
+    for shift in range(1, max_shift + 1):
+        check_cancelled(cancel)
+        diffs = times[shift:] - times[:-shift]
+        in_window = diffs <= max_diff
+        diffs = diffs[in_window]
+        weights = amplitudes[shift:][in_window] * amplitudes[:-shift][in_window]
+        # Пара (i, j) дает вклад на лагах +d и -d; считаем только лаги >= 0,
+        # куда зеркальный вклад -d дотягивается лишь при малых d
+        near_zero = diffs <= half_width * dt
+        diffs_list.extend([diffs, -diffs[near_zero]])
+        weights_list.extend([weights, weights[near_zero]])
+
+    all_diffs = np.concatenate(diffs_list)
+    all_weights = np.concatenate(weights_list)
+
+    for start in range(0, len(all_diffs), ANALYTIC_PAIR_BLOCK):
+        check_cancelled(cancel)
+        diffs = all_diffs[start:start + ANALYTIC_PAIR_BLOCK]
+        weights = all_weights[start:start + ANALYTIC_PAIR_BLOCK]
+
+        lag_idx = np.rint(diffs / dt).astype(np.int64)[:, None] + offsets[None, :]
+        values = weights[:, None] * ricker_autocorrelation_analytic(lag_idx * dt - diffs[:, None], frequency)
+
+        valid = (lag_idx >= 0) & (lag_idx <= max_lag)
+        autocorr_pos += np.bincount(lag_idx[valid], weights=values[valid], minlength=max_lag + 1)
+
+    return np.concatenate([autocorr_pos[:0:-1], autocorr_pos])
+
+
+def normalized_autocorrelation(signal, max_lag, cancel=None):
+    """АКФ сигнала в окне лагов ±max_lag, нормированная на максимум модуля"""
+    # Длинный сигнал считается блоками параллельно, без сокращения окна лагов
+    if len(signal) > STREAM_CHUNK_SAMPLES:
+        autocorr = blocked_autocorrelation(signal, max_lag, cancel=cancel)
+    else:
+        autocorr = autocorrelation_window(signal, max_lag, cancel=cancel)
+    lags = np.arange(-max_lag, max_lag + 1)
+    
+    max_val = np.max(np.abs(autocorr))
+    if max_val > 0:
+        autocorr = autocorr / max_val
+    
+    return lags, autocorr
+
+
+def autocorrelation_spectrum(autocorr, dt):
+    """Нормированный амплитудный спектр АКФ (положительные частоты)"""
+    n = len(autocorr)
+    
+    if n > 100000:
+        autocorr = autocorr[:100000]
+        n = len(autocorr)
+    
+    spectrum = np.fft.fft(autocorr)
+    freq = np.fft.fftfreq(n, dt)
+    
+    pos_freq = freq[:n//2]
+    pos_spectrum = np.abs(spectrum[:n//2])
+    
+    if np.max(pos_spectrum) > 0:
+        pos_spectrum = pos_spectrum / np.max(pos_spectrum)
+    
+    return pos_freq, pos_spectrum
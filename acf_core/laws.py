@@ -0,0 +1,289 @@
+"""Законы изменения частоты следования и генерация времен импульсов"""
+
+import functools
+import math
+
+import numpy as np
+
+from .cancellation import check_cancelled
+
+
+# Ограничения генерации импульсов
+MAX_IMPULSES = 100000
+MIN_PERIOD = 0.0001
+
+# Число узлов таблицы фазы для численного обращения фазового интеграла
+PHASE_GRID_POINTS = 4096
+
+
+# Коэффициенты компенсационного закона (полином 4-й степени) для базовых длительностей
+COMPENSATION_BASE_DURATIONS = [10, 20, 40, 80]
+COMPENSATION_COEFFICIENTS = [
+    [0.0005, -0.0023, 0.0785, 1.1904, 25.019],
+    [0.000035, -0.0003, 0.0160, 0.5952, 25.019],  
+    [0.000026, -0.000045, 0.0049, 0.2976, 25.019],
+    [0.000015, -0.000045, 0.0012, 0.1488, 25.019]
+]
+
+
+def scale_compensation_coefficients(duration, f0, f1, base_coefficients=COMPENSATION_COEFFICIENTS):
+    """Масштабирование компенсационных коэффициентов для заданных параметров"""
+    base_durations = COMPENSATION_BASE_DURATIONS
+    
+    if duration <= base_durations[0]:
+        idx1, idx2 = 0, 0
+        weight = 0.0
+    elif duration >= base_durations[-1]:
+        idx1, idx2 = -1, -1
+        weight = 1.0
+    else:
+        for i in range(len(base_durations)-1):
+            if base_durations[i] <= duration <= base_durations[i+1]:
+                idx1, idx2 = i, i+1
+                weight = (duration - base_durations[i]) / (base_durations[i+1] - base_durations[i])
+                break
+    
+    coeffs1 = base_coefficients[idx1]
+    coeffs2 = base_coefficients[idx2]
+    
+    scaled_coeffs = []
+    for c1, c2 in zip(coeffs1, coeffs2):
+        scaled_coeffs.append(c1 * (1-weight) + c2 * weight)
+    
+    scaled_coeffs[4] = f0
+    
+    current_end_value = (scaled_coeffs[0] * (duration**4) + 
+                        scaled_coeffs[1] * (duration**3) + 
+                        scaled_coeffs[2] * (duration**2) + 
+                        scaled_coeffs[3] * duration + 
+                        scaled_coeffs[4])
+    
+    diff = f1 - current_end_value
+    
+    contributions = []
+    
+    contributions.append(scaled_coeffs[0] * (duration**4))
+    contributions.append(scaled_coeffs[1] * (duration**3))
+    contributions.append(scaled_coeffs[2] * (duration**2))
+    contributions.append(scaled_coeffs[3] * duration)
+    
+    total_poly = sum(contributions)
+    
+    if abs(total_poly) > 1e-10:
+        for i in range(4):
+            if abs(contributions[i]) > 1e-10:
+                scale_factor = 1 + (diff * contributions[i] / total_poly) / contributions[i]
+                scaled_coeffs[i] *= scale_factor
+    
+    return scaled_coeffs
+
+
+class FrequencyLaw:
+    """
+    Закон изменения частоты f(t) на [0, duration] от f0 до f1
+    
+    Коэффициенты вычисляются один раз при создании; evaluate и phase
+    принимают и возвращают массивы. Экземпляры берутся из get_frequency_law.
+    """
+    name = ''
+    formula = ''
+    
+    def __init__(self, duration, f0, f1):
+        self.duration = duration
+        self.f0 = f0
+        self.f1 = f1
+    
+    def evaluate(self, t):
+        """Мгновенная частота f(t)"""
+        raise NotImplementedError
+    
+    def phase(self, t):
+        """Фазовый интеграл phi(t) = int_0^t f(s) ds (число периодов к моменту t)"""
+        raise NotImplementedError
+    
+    def phase_inverse(self, phase):
+        """
+        Время, к которому набирается заданная фаза (обращение phi(t))
+        
+        По умолчанию - по таблице фазы (np.searchsorted) с уточнением методом Ньютона;
+        законы с обратной функцией в замкнутой форме переопределяют метод.
+        """
+        phase = np.asarray(phase, dtype=float)
+        
+        grid = np.linspace(0.0, self.duration, int(np.clip(phase.size, 64, PHASE_GRID_POINTS)))
+        grid_freq = self.evaluate(grid)
+        monotonic = np.all(grid_freq > 0)
+        
+        if monotonic:
+            grid_phase = self.phase(grid)
+        else:
+            # Участки с f <= 0 импульсов не дают: фаза на них стоит на месте
+            clipped = np.maximum(grid_freq, 0.0)
+            grid_phase = np.concatenate([[0.0], np.cumsum((clipped[1:] + clipped[:-1]) / 2 * np.diff(grid))])
+        
+        idx = np.clip(np.searchsorted(grid_phase, phase, side='right'), 1, len(grid) - 1)
+        t_lo, t_hi = grid[idx - 1], grid[idx]
+        p_lo, p_hi = grid_phase[idx - 1], grid_phase[idx]
+        step = np.where(p_hi > p_lo, p_hi - p_lo, 1.0)
+        t = t_lo + (phase - p_lo) / step * (t_hi - t_lo)
+        
+        if monotonic:
+            for _ in range(3):
+                residual = self.phase(t) - phase
+                t = np.clip(t - residual / self.evaluate(t), t_lo, t_hi)
+        
+        return t
+    
+    def impulse_count(self):
+        """Число импульсов на [0, duration] до ограничения MAX_IMPULSES"""
+        if self.duration <= 0 or self.f0 <= 0 or self.f1 <= 0:
+            return 0
+        total_phase = float(self.phase(self.duration))
+        return int(np.ceil(total_phase)) if total_phase > 0 else 1
+
+
+class LinearLaw(FrequencyLaw):
+    name = 'Линейный'
+    formula = 'f(t) = f₀ + (f₁ - f₀)·t/T'
+    
+    def __init__(self, duration, f0, f1):
+        super().__init__(duration, f0, f1)
+        self.slope = (f1 - f0) / duration
+    
+    def evaluate(self, t):
+        return self.f0 + self.slope * np.asarray(t, dtype=float)
+    
+    def phase(self, t):
+        t = np.asarray(t, dtype=float)
+        return self.f0 * t + self.slope * t**2 / 2
+    
+    def phase_inverse(self, phase):
+        phase = np.asarray(phase, dtype=float)
+        # Корень f0*t + c*t^2/2 = phase в устойчивой форме
+        return 2 * phase / (self.f0 + np.sqrt(np.maximum(self.f0**2 + 2 * self.slope * phase, 0.0)))
+
+
+class QuadraticLaw(FrequencyLaw):
+    name = 'Квадратичный'
+    formula = 'f(t) = a·t² + f₀'
+    
+    def __init__(self, duration, f0, f1):
+        super().__init__(duration, f0, f1)
+        self.a = (f1 - f0) / duration**2
+    
+    def evaluate(self, t):
+        return self.a * np.asarray(t, dtype=float)**2 + self.f0
+    
+    def phase(self, t):
+        t = np.asarray(t, dtype=float)
+        return self.a * t**3 / 3 + self.f0 * t
+
+
+class ExponentialLaw(FrequencyLaw):
+    name = 'Экспоненциальный'
+    formula = 'f(t) = f₀·exp(k·t)'
+    
+    def __init__(self, duration, f0, f1):
+        super().__init__(duration, f0, f1)
+        self.k = math.log(f1 / f0) / duration if f0 > 0 and f1 > 0 else 0.0
+    
+    def evaluate(self, t):
+        return self.f0 * np.exp(self.k * np.asarray(t, dtype=float))
+    
+    def phase(self, t):
+        t = np.asarray(t, dtype=float)
+        if abs(self.k) < 1e-12:
+            return self.f0 * t
+        return self.f0 * np.expm1(self.k * t) / self.k
+    
+    def phase_inverse(self, phase):
+        phase = np.asarray(phase, dtype=float)
+        if abs(self.k) < 1e-12:
+            return phase / self.f0
+        return np.log1p(self.k * phase / self.f0) / self.k
+
+
+class HyperbolicLaw(FrequencyLaw):
+    name = 'Гиперболический'
+    formula = 'f(t) = 1/√[f₀⁻²(1-t/T)+f₁⁻²(t/T)]'
+    
+    def __init__(self, duration, f0, f1):
+        super().__init__(duration, f0, f1)
+        # f(t) = (a + b*t)^(-1/2): квадрат периода меняется линейно
+        self.a = f0**(-2)
+        self.b = (f1**(-2) - f0**(-2)) / duration
+        self.sqrt_a = math.sqrt(self.a)
+    
+    def evaluate(self, t):
+        tau = np.minimum(np.asarray(t, dtype=float), self.duration)
+        return 1.0 / np.sqrt(self.a + self.b * tau)
+    
+    def phase(self, t):
+        t = np.asarray(t, dtype=float)
+        tau = np.minimum(t, self.duration)
+        # 2*(sqrt(a + b*t) - sqrt(a)) / b без потери точности при малых b
+        phase = 2 * tau / (np.sqrt(self.a + self.b * tau) + self.sqrt_a)
+        return phase + self.f1 * (t - tau)
+    
+    def phase_inverse(self, phase):
+        phase = np.asarray(phase, dtype=float)
+        return self.sqrt_a * phase + self.b * phase**2 / 4
+
+
+class CompensationLaw(FrequencyLaw):
+    name = 'Компенсационный'
+    formula = 'f(t) = полином 4-й ст.'
+    
+    def __init__(self, duration, f0, f1):
+        super().__init__(duration, f0, f1)
+        self.coefficients = np.array(scale_compensation_coefficients(duration, f0, f1))
+        self.phase_coefficients = np.polyint(self.coefficients)
+    
+    def evaluate(self, t):
+        return np.polyval(self.coefficients, np.asarray(t, dtype=float))
+    
+    def phase(self, t):
+        return np.polyval(self.phase_coefficients, np.asarray(t, dtype=float))
+
+
+# Реестр законов изменения частоты
+FREQUENCY_LAWS = {
+    'linear': LinearLaw,
+    'quadratic': QuadraticLaw,
+    'exponential': ExponentialLaw,
+    'compensation': CompensationLaw,
+    'hyperbolic': HyperbolicLaw
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def get_frequency_law(law_type, duration, f0, f1):
+    """Объект закона для (law_type, duration, f0, f1), создается один раз"""
+    if law_type not in FREQUENCY_LAWS:
+        raise ValueError(f"Неизвестный закон изменения частоты: {law_type}")
+    return FREQUENCY_LAWS[law_type](float(duration), float(f0), float(f1))
+
+
+def generate_impulse_times(law, max_impulses=MAX_IMPULSES, cancel=None):
+    """
+    Векторная генерация времен импульсов: n-й импульс приходится на момент,
+    когда фазовый интеграл закона phi(t) достигает целого n (первый импульс в t = 0)
+    
+    Возвращает массивы времен и мгновенных частот в эти моменты. Импульсов не
+    больше max_impulses; усечение проверяется по law.impulse_count().
+    """
+    check_cancelled(cancel)
+    duration = law.duration
+    count = min(law.impulse_count(), max_impulses)
+    if count == 0:
+        return np.zeros(0), np.zeros(0)
+    
+    times = np.clip(law.phase_inverse(np.arange(count, dtype=float)), 0.0, duration)
+    times = times[times < duration]
+    check_cancelled(cancel)
+    
+    # Ограничение минимального периода (как в пошаговом генераторе)
+    if len(times) > 1 and np.min(np.diff(times)) < MIN_PERIOD:
+        times = times[np.concatenate([[True], np.diff(np.floor(times / MIN_PERIOD)) > 0])]
+    
+    return times, law.evaluate(times)
@@ -0,0 +1,257 @@
+"""Расчет окна ACF_app_4.0 на общем ядре
+
+Окно 4.0 сохраняет собственные определения, и его результаты при переходе на
+ядро не меняются: импульсы ставятся шагом по мгновенному периоду (а не по
+фазовому интегралу), гиперболическая последовательность основного окна
+строится аналитически, а для огибающей из АКФ вычитается сам вейвлет Рикера,
+а не его автокорреляция. Законы частоты, вейвлет, свертка, АКФ в окне лагов
+и спектр берутся из ядра.
+"""
+
+import numpy as np
+from scipy.signal import hilbert
+
+from .correlation import autocorrelation_spectrum, autocorrelation_window
+from .laws import MAX_IMPULSES, MIN_PERIOD, get_frequency_law
+from .signals import convolve_same, impulse_samples, ricker_wavelet
+
+
+# Предел шагов пошагового генератора импульсов
+LEGACY_MAX_ITERATIONS = 1000000
+# Основное окно: при большем числе отсчетов шаг дискретизации укрупняется
+LEGACY_MAX_SAMPLES = 500000
+# Точка перебора: при большем числе отсчетов шаг укрупняется, а точки
+# с более длинным сигналом или сверткой не считаются (равны нулю)
+LEGACY_POINT_MAX_SAMPLES = 1000000
+LEGACY_POINT_MAX_CONVOLUTION = 2000000
+# Для сигнала длиннее LEGACY_LONG_SIGNAL отсчетов окно лагов сокращается
+LEGACY_LONG_SIGNAL = 200000
+LEGACY_SHORT_MAX_LAG = 200
+# Законы генератора окна подбора 4.0; остальные (компенсационный) он считает линейными
+LEGACY_POINT_LAWS = ('linear', 'quadratic', 'exponential', 'hyperbolic')
+
+
+def legacy_step_sequence(law, min_period=None):
+    """
+    Пошаговая генерация: следующий импульс через период 1/f(t) текущего
+
+    Возвращает списки времен и частот импульсов. min_period ограничивает
+    период снизу; при исчерпании LEGACY_MAX_ITERATIONS шагов импульсы
+    обрезаются до MAX_IMPULSES.
+    """
+    duration = law.duration
+    impulse_times = []
+    impulse_frequencies = []
+
+    t_current = 0
+    iteration_count = 0
+    while t_current < duration and iteration_count < LEGACY_MAX_ITERATIONS:
+        f_current = float(law.evaluate(t_current))
+        period = 1.0 / f_current if f_current > 0 else duration
+        if min_period is not None and period < min_period:
+            period = min_period
+
+        impulse_times.append(t_current)
+        impulse_frequencies.append(f_current)
+        t_current += period
+        iteration_count += 1
+
+    if iteration_count >= LEGACY_MAX_ITERATIONS:
+        print(f"Предупреждение: достигнут предел итераций для f0={law.f0}, f1={law.f1}")
+        impulse_times = impulse_times[:MAX_IMPULSES]
+        impulse_frequencies = impulse_frequencies[:MAX_IMPULSES]
+
+    return impulse_times, impulse_frequencies
+
+
+def legacy_hyperbolic_sequence(duration, f0, f1):
+    """
+    Аналитическая гиперболическая последовательность: период убывает
+    линейно от 1/f0 до 1/f1, t_n = n*T0 - n*(n-1)/2*dT
+    """
+    if duration <= 0 or f0 <= 0 or f1 <= 0:
+        return [], []
+
+    T0 = 1.0 / f0
+    T1 = 1.0 / f1
+    N_approx = int(duration / ((T0 + T1) / 2))
+    dT = (T0 - T1) / (N_approx - 1) if N_approx > 1 else 0
+
+    impulse_times = []
+    impulse_frequencies = []
+
+    n = 0
+    while n < LEGACY_MAX_ITERATIONS:
+        t_n = n * T0 - n * (n - 1) / 2 * dT
+        if t_n > duration:
+            break
+
+        if t_n >= 0:
+            if n == 0:
+                f_n = f0
+            elif n == N_approx - 1:
+                f_n = f1
+            else:
+                f_n = 1.0 / (T0 - n * dT)
+
+            impulse_times.append(t_n)
+            impulse_frequencies.append(f_n)
+
+        n += 1
+
+    if n >= LEGACY_MAX_ITERATIONS:
+        print("Предупреждение: достигнут предел итераций для гиперболической последовательности")
+        impulse_times = impulse_times[:MAX_IMPULSES]
+        impulse_frequencies = impulse_frequencies[:MAX_IMPULSES]
+
+    return impulse_times, impulse_frequencies
+
+
+def legacy_autocorrelation(signal, max_lag):
+    """Нормированная АКФ в окне ±max_lag (для длинного сигнала окно сокращается)"""
+    if len(signal) > LEGACY_LONG_SIGNAL:
+        max_lag = min(max_lag, LEGACY_SHORT_MAX_LAG)
+
+    autocorr = autocorrelation_window(signal, max_lag)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    max_val = np.max(np.abs(autocorr))
+    if max_val > 0:
+        autocorr = autocorr / max_val
+
+    return lags, autocorr
+
+
+def legacy_wavelet_residual(autocorr, wavelet):
+    """Остаток АКФ после вычета нормированного вейвлета Рикера и его огибающая"""
+    max_val = np.max(np.abs(wavelet))
+    model_wavelet = wavelet / max_val if max_val > 0 else wavelet
+
+    n_wavelet = len(model_wavelet)
+    n_autocorr = len(autocorr)
+
+    if n_wavelet > n_autocorr:
+        start_idx = (n_wavelet - n_autocorr) // 2
+        model_scaled = model_wavelet[start_idx:start_idx + n_autocorr]
+    else:
+        model_scaled = np.zeros(n_autocorr)
+        start_idx = (n_autocorr - n_wavelet) // 2
+        model_scaled[start_idx:start_idx + n_wavelet] = model_wavelet
+
+    autocorr_residual = autocorr - model_scaled
+
+    try:
+        envelope = np.abs(hilbert(autocorr_residual))
+    except:
+        envelope = np.abs(autocorr_residual)
+
+    return autocorr_residual, envelope
+
+
+def _legacy_signal(impulse_times, dt, n_samples, variable_amplitude):
+    """Дискретный сигнал с импульсами в отсчетах int(t / dt)"""
+    signal = np.zeros(n_samples)
+    indices, amplitudes = impulse_samples(impulse_times, dt, n_samples, variable_amplitude)
+    signal[indices] = amplitudes
+    return signal
+
+
+def compute_legacy_sequence_analysis(params):
+    """
+    Полный расчет основного окна 4.0 для словаря параметров params
+
+    Возвращает словарь с последовательностью, сверткой, АКФ, огибающей,
+    спектром и метриками; params в нем - копия параметров с фактическим
+    шагом дискретизации (для длинных последовательностей он укрупняется).
+    """
+    params = dict(params)
+    duration = params['duration']
+    dt = params['dt']
+    f0 = params['start_freq']
+    f1 = params['end_freq']
+
+    if params['law_type'] == 'hyperbolic':
+        impulse_times, impulse_frequencies = legacy_hyperbolic_sequence(duration, f0, f1)
+    else:
+        law = get_frequency_law(params['law_type'], duration, f0, f1)
+        impulse_times, impulse_frequencies = legacy_step_sequence(law)
+
+    time = np.arange(0, duration, dt)
+    if len(time) > LEGACY_MAX_SAMPLES:
+        dt = duration / LEGACY_MAX_SAMPLES
+        params['dt'] = dt
+        time = np.arange(0, duration, dt)
+
+    signal = _legacy_signal(impulse_times, dt, len(time), params['variable_amplitude'])
+    wavelet = ricker_wavelet(params['ricker_freq'], dt)
+    convolution = convolve_same(signal, wavelet, method='direct')
+
+    lags, autocorr = legacy_autocorrelation(convolution, params['max_lag'])
+    lag_times = lags * dt
+    area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
+
+    autocorr_residual, envelope = legacy_wavelet_residual(autocorr, wavelet)
+    envelope_area = np.trapz(np.abs(envelope), dx=dt)
+
+    spectrum_freq, spectrum = autocorrelation_spectrum(autocorr, dt)
+
+    return {
+        'params': params,
+        'time': time,
+        'signal': signal,
+        'impulse_times': impulse_times,
+        'impulse_frequencies': impulse_frequencies,
+        'convolution': convolution,
+        'lag_times': lag_times,
+        'autocorr': autocorr,
+        'autocorr_residual': autocorr_residual,
+        'envelope': envelope,
+        'envelope_area': envelope_area,
+        'spectrum_freq': spectrum_freq,
+        'spectrum': spectrum,
+        'area': area
+    }
+
+
+def compute_legacy_point_metric(start_freq, end_freq, fixed_params, heatmap_type):
+    """
+    Значение метрики heatmap_type ('area', 'center_freq', 'impulse_count',
+    'envelope_area') в точке (start_freq, end_freq) окна подбора 4.0
+
+    Точки сверх пределов LEGACY_POINT_* и MAX_IMPULSES равны нулю.
+    """
+    duration = fixed_params['duration']
+    dt = fixed_params['dt']
+    if int(duration / dt) > LEGACY_POINT_MAX_SAMPLES:
+        dt = max(dt, duration / LEGACY_POINT_MAX_SAMPLES)
+
+    law_type = fixed_params['law_type'] if fixed_params['law_type'] in LEGACY_POINT_LAWS else 'linear'
+    law = get_frequency_law(law_type, duration, start_freq, end_freq)
+    impulse_times, _ = legacy_step_sequence(law, MIN_PERIOD)
+    if len(impulse_times) > MAX_IMPULSES:
+        return 0
+
+    signal_len = int(duration / dt) + 1
+    if signal_len > LEGACY_POINT_MAX_SAMPLES:
+        return 0
+
+    signal = _legacy_signal(impulse_times, dt, signal_len, fixed_params['variable_amplitude'])
+    wavelet = ricker_wavelet(fixed_params['ricker_freq'], dt)
+    if len(signal) + len(wavelet) - 1 > LEGACY_POINT_MAX_CONVOLUTION:
+        return 0
+
+    convolution = convolve_same(signal, wavelet, method='direct')
+    lags, autocorr = legacy_autocorrelation(convolution, fixed_params['max_lag'])
+    lag_times = lags * dt
+
+    if heatmap_type == 'area':
+        return np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
+    elif heatmap_type == 'center_freq':
+        return (start_freq + end_freq) / 2
+    elif heatmap_type == 'impulse_count':
+        return len(impulse_times)
+
+    _, envelope = legacy_wavelet_residual(autocorr, wavelet)
+    if len(lag_times) > 1:
+        return np.sum(np.abs(envelope)) * (lag_times[1] - lag_times[0])
+    return 0
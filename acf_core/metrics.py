@@ -0,0 +1,213 @@
+"""Метрики АКФ одной точки и полный расчет последовательности для основного окна"""
+
+import numpy as np
+from scipy.signal import hilbert
+
+from .cancellation import check_cancelled
+from .correlation import (analytic_convolution_autocorrelation, autocorrelation_spectrum,
+                          chunked_autocorrelation, normalized_autocorrelation,
+                          sparse_convolution_autocorrelation)
+from .laws import FREQUENCY_LAWS, MAX_IMPULSES, generate_impulse_times, get_frequency_law
+from .params import SequenceParams, as_param_dict
+from .signals import (convolve_same, impulse_amplitudes, impulse_samples,
+                      ricker_autocorrelation, ricker_wavelet)
+
+
+# Метрики тепловой карты в порядке хранения в кубе (метрика, конечная, начальная частота)
+HEATMAP_METRICS = ('area', 'envelope_area', 'max_side_peak', 'impulse_count', 'center_freq')
+
+# Версия расчета метрик: увеличивается при любом изменении, влияющем на значения,
+# чтобы записи постоянного кэша прошлых версий не использовались
+ACF_ENGINE_VERSION = 3
+
+def envelope_area_and_max_side_peak(autocorr, dt, ricker_autocorr):
+    """
+    Вычисление площади под огибающей АКФ и максимального побочного пика
+    после вычета автокорреляции одиночного импульса Рикера
+    """
+    n_autocorr = len(autocorr)
+    n_ricker_autocorr = len(ricker_autocorr)
+    
+    # Масштабируем автокорреляцию одиночного импульса до размера основной АКФ
+    if n_ricker_autocorr > n_autocorr:
+        # Обрезаем до размера основной АКФ
+        start_idx = (n_ricker_autocorr - n_autocorr) // 2
+        ricker_scaled = ricker_autocorr[start_idx:start_idx + n_autocorr]
+    else:
+        # Дополняем нулями до размера основной АКФ
+        ricker_scaled = np.zeros(n_autocorr)
+        start_idx = (n_autocorr - n_ricker_autocorr) // 2
+        ricker_scaled[start_idx:start_idx + n_ricker_autocorr] = ricker_autocorr
+    
+    # Вычитаем автокорреляцию одиночного импульса
+    autocorr_residual = autocorr - ricker_scaled
+    
+    # Вычисляем огибающую остатка
+    try:
+        envelope = np.abs(hilbert(autocorr_residual))
+    except:
+        envelope = np.abs(autocorr_residual)
+    
+    # Вычисляем площадь под огибающей
+    envelope_area = np.trapz(np.abs(envelope), dx=dt)
+    
+    # Находим максимальный побочный пик (исключая центральный пик)
+    center_idx = len(autocorr) // 2
+    
+    # Рассматриваем только правую половину (или левую, они симметричны)
+    # Исключаем центральный пик (берем интервал от центра+5 отсчетов до конца)
+    side_start = center_idx + 5
+    side_end = len(autocorr_residual)
+    
+    if side_start < side_end:
+        # Берем абсолютные значения остатка для поиска пиков
+        abs_residual = np.abs(autocorr_residual[side_start:side_end])
+        max_side_peak = np.max(abs_residual) if len(abs_residual) > 0 else 0
+        
+        # Находим индекс максимума для отметки на графике
+        max_side_idx_local = np.argmax(abs_residual)
+        max_side_idx_global = side_start + max_side_idx_local
+    else:
+        max_side_peak = 0
+        max_side_idx_global = center_idx
+    
+    return envelope_area, autocorr_residual, envelope, ricker_scaled, max_side_peak, max_side_idx_global
+
+
+def compute_point_metrics(start_freq, end_freq, fixed_params, cancel=None):
+    """
+    Расчет всех метрик одной точки тепловой карты (без обращения к интерфейсу)
+    
+    fixed_params - словарь параметров или SequenceParams (частоты из него не
+    используются). Возвращает массив значений в порядке HEATMAP_METRICS;
+    для последовательностей длиннее MAX_IMPULSES импульсов точка не
+    считается и все значения равны NaN. cancel - признак отмены (Event): при его установке расчет прерывается
+    CalculationCancelled.
+    """
+    fixed_params = as_param_dict(fixed_params)
+    values = np.zeros(len(HEATMAP_METRICS))
+    
+    duration = fixed_params['duration']
+    dt = fixed_params['dt']
+    ricker_freq = fixed_params['ricker_freq']
+    
+    law = get_frequency_law(fixed_params['law_type'], duration, start_freq, end_freq)
+    
+    # Усеченная последовательность дала бы метрики другой последовательности:
+    # такая точка пропускается (NaN, а не ноль, чтобы не сойти за минимум)
+    if law.impulse_count() > MAX_IMPULSES:
+        return np.full(len(HEATMAP_METRICS), np.nan)
+    
+    impulse_times, _ = generate_impulse_times(law, cancel=cancel)
+    
+    engine = fixed_params.get('acf_engine', 'sparse')
+    
+    signal_len = int(duration / dt) + 1
+    
+    wavelet = ricker_wavelet(ricker_freq, dt)
+    
+    max_lag = fixed_params['max_lag']
+    
+    if engine == 'analytic':
+        # Точные времена импульсов, без привязки к сетке dt
+        amplitudes = impulse_amplitudes(len(impulse_times), fixed_params['variable_amplitude'])
+        autocorr = analytic_convolution_autocorrelation(
+            impulse_times, amplitudes, ricker_freq, max_lag, dt, cancel)
+    elif engine == 'sparse':
+        sample_indices, amplitudes = impulse_samples(
+            impulse_times, dt, signal_len, fixed_params['variable_amplitude'])
+        
+        # АКФ свертки = АКФ импульсов * АКФ вейвлета, плотный сигнал не нужен
+        autocorr = sparse_convolution_autocorrelation(
+            sample_indices, amplitudes, ricker_autocorrelation(ricker_freq, dt), max_lag, cancel)
+    else:
+        # Точный расчет по дискретному сигналу, блоками ограниченной длины
+        sample_indices, amplitudes = impulse_samples(
+            impulse_times, dt, signal_len, fixed_params['variable_amplitude'])
+        autocorr = chunked_autocorrelation(
+            sample_indices, amplitudes, wavelet, signal_len, max_lag,
+            conv_method=fixed_params.get('conv_method', 'auto'), cancel=cancel)
+    
+    max_val = np.max(np.abs(autocorr))
+    if max_val > 0:
+        autocorr = autocorr / max_val
+    
+    lag_times = np.arange(-max_lag, max_lag + 1) * dt
+    area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
+    
+    envelope_area, _, _, _, max_side_peak, _ = envelope_area_and_max_side_peak(
+        autocorr, dt, ricker_autocorrelation(ricker_freq, dt)
+    )
+    
+    metrics = {
+        'area': area,
+        'envelope_area': envelope_area,
+        'max_side_peak': max_side_peak,
+        'impulse_count': len(impulse_times),
+        'center_freq': (start_freq + end_freq) / 2
+    }
+    values[:] = [metrics[name] for name in HEATMAP_METRICS]
+    
+    return values
+
+
+def compute_sequence_analysis(params, cancel=None):
+    """
+    Полный расчет основного окна для параметров params (без обращения к интерфейсу)
+    
+    Последовательность, свертка с вейвлетом Рикера, АКФ с огибающей и спектр.
+    params - словарь параметров или SequenceParams. Возвращает словарь данных
+    графиков (с копией параметров в виде словаря). cancel - признак отмены
+    (Event): при его установке расчет прерывается CalculationCancelled.
+    """
+    params = SequenceParams.from_dict(as_param_dict(params)).to_dict()
+    duration = params['duration']
+    dt = params['dt']
+    
+    law = get_frequency_law(params['law_type'], duration, params['start_freq'], params['end_freq'])
+    impulse_times, impulse_freqs = generate_impulse_times(law, cancel=cancel)
+    
+    time = np.arange(0, duration, dt)
+    
+    signal = np.zeros_like(time)
+    sample_indices, amplitudes = impulse_samples(
+        impulse_times, dt, len(signal), params['variable_amplitude'])
+    signal[sample_indices] = amplitudes
+    check_cancelled(cancel)
+    
+    wavelet = ricker_wavelet(params['ricker_freq'], dt)
+    convolution = convolve_same(signal, wavelet, params['conv_method'])
+    check_cancelled(cancel)
+    
+    lags, autocorr = normalized_autocorrelation(convolution, params['max_lag'], cancel)
+    lag_times = lags * dt
+    
+    area = np.sum(np.abs(autocorr)) * (lag_times[1] - lag_times[0])
+    
+    envelope_area, autocorr_residual, envelope, ricker_autocorr, max_side_peak, max_side_idx = \
+        envelope_area_and_max_side_peak(autocorr, dt, ricker_autocorrelation(params['ricker_freq'], dt))
+    
+    spectrum_freq, spectrum = autocorrelation_spectrum(autocorr, dt)
+    
+    return {
+        'params': params,
+        'time': time,
+        'signal': signal,
+        'impulse_times': impulse_times,
+        'impulse_frequencies': impulse_freqs,
+        'convolution': convolution,
+        'lag_times': lag_times,
+        'autocorr': autocorr,
+        'autocorr_residual': autocorr_residual,
+        'envelope': envelope,
+        'envelope_area': envelope_area,
+        'ricker_autocorr': ricker_autocorr,
+        'max_side_peak': max_side_peak,
+        'max_side_idx': max_side_idx,
+        'spectrum_freq': spectrum_freq,
+        'spectrum': spectrum,
+        'area': area,
+        'law_type': params['law_type'],
+        'law_name': FREQUENCY_LAWS[params['law_type']].name,
+        'variable_amplitude': params['variable_amplitude']
+    }
@@ -0,0 +1,216 @@
+"""Поиск минимума метрики по паре частот без полного перебора (Нелдер–Мид)"""
+
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+from scipy import optimize as scipy_optimize
+
+from . import sweep
+from .cancellation import CalculationCancelled
+from .metrics import HEATMAP_METRICS, compute_point_metrics
+from .params import as_param_dict
+from .sweep import CANCEL_POLL_INTERVAL, _init_cancel_worker
+
+
+# Оптимизатор (f0, f1): число стартовых точек и общий бюджет вычислений по умолчанию
+OPTIMIZER_STARTS = 4
+OPTIMIZER_MAX_EVALUATIONS = 150
+# Доля бюджета вычислений на грубую сетку, из лучших узлов которой стартуют запуски
+OPTIMIZER_COARSE_FRACTION = 0.4
+
+
+def optimizer_coarse_grid(bounds, point_budget):
+    """
+    Грубая сетка оптимизатора: не больше point_budget узлов в области f0 < f1
+    
+    Возвращает узлы (f0, f1) и шаг сетки по каждой оси.
+    """
+    (f0_min, f0_max), (f1_min, f1_max) = bounds
+    nodes = 2
+    while True:
+        f0_axis = np.linspace(f0_min, f0_max, nodes + 1)
+        f1_axis = np.linspace(f1_min, f1_max, nodes + 1)
+        if np.sum(f0_axis[None, :] < f1_axis[:, None]) > point_budget:
+            break
+        nodes += 1
+    
+    f0_axis = np.linspace(f0_min, f0_max, nodes)
+    f1_axis = np.linspace(f1_min, f1_max, nodes)
+    points = [(f0, f1) for f0 in f0_axis for f1 in f1_axis if f0 < f1]
+    return points, np.array([f0_axis[1] - f0_axis[0], f1_axis[1] - f1_axis[0]])
+
+
+def objective_value(value):
+    """Значение метрики для минимизации: пропущенные точки (NaN) не могут быть минимумом"""
+    return np.inf if np.isnan(value) else value
+
+
+def _optimizer_point_task(start_freq, end_freq, fixed_params, cancel=None):
+    """Расчет метрик точки грубой сетки оптимизатора (в процессе - с общим признаком отмены)"""
+    return compute_point_metrics(start_freq, end_freq, fixed_params,
+                                 cancel if cancel is not None else sweep._worker_cancel_event)
+
+
+def _nelder_mead_task(task, cancel=None):
+    """
+    Один запуск метода Нелдера-Мида из стартовой точки (выполняется в вычислителе)
+    
+    Возвращает траекторию - список (f0, f1, значение метрики) всех расчетов.
+    Вершины симплекса прижимаются к границам диапазонов, точки с f0 >= f1
+    получают значение inf без расчета, пропущенные (NaN) и с ошибкой - inf.
+    """
+    if cancel is None:
+        cancel = sweep._worker_cancel_event
+    fixed_params = task['fixed_params']
+    metric_index = HEATMAP_METRICS.index(task['metric'])
+    (f0_min, f0_max), (f1_min, f1_max) = task['bounds']
+    trajectory = []
+    
+    def objective(x):
+        f0, f1 = float(x[0]), float(x[1])
+        if f0 >= f1:
+            return np.inf
+        try:
+            value = objective_value(compute_point_metrics(f0, f1, fixed_params, cancel)[metric_index])
+        except CalculationCancelled:
+            raise
+        except Exception as e:
+            print(f"Ошибка для f0={f0}, f1={f1}: {str(e)}")
+            value = np.inf
+        trajectory.append((f0, f1, value))
+        return value
+    
+    # Начальный симплекс размером в полшага грубой сетки, направлен к центру области
+    x0 = np.asarray(task['start'], dtype=np.float64)
+    center = np.array([(f0_min + f0_max) / 2, (f1_min + f1_max) / 2])
+    step = np.asarray(task['simplex_step']) * np.where(center >= x0, 1.0, -1.0)
+    simplex = np.array([x0, x0 + [step[0], 0], x0 + [0, step[1]]])
+    
+    scipy_optimize.minimize(objective, x0, method='Nelder-Mead',
+                            bounds=task['bounds'],
+                            options={'initial_simplex': simplex,
+                                     'maxfev': task['max_evaluations'],
+                                     'xatol': task['resolution'],
+                                     'fatol': np.inf})
+    return trajectory
+
+
+def completed_futures(futures, stop_check=None, cancel_event=None):
+    """
+    Задачи по мере завершения (как as_completed) с опросом признака остановки
+    каждые CANCEL_POLL_INTERVAL: при остановке устанавливается cancel_event
+    и выбрасывается CalculationCancelled
+    """
+    pending = set(futures)
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending, timeout=CANCEL_POLL_INTERVAL,
+            return_when=concurrent.futures.FIRST_COMPLETED)
+        if stop_check is not None and stop_check():
+            if cancel_event is not None:
+                cancel_event.set()
+            raise CalculationCancelled()
+        yield from done
+
+
+def optimize_heatmap_metric(fixed_params, metric, bounds, resolution,
+                            max_evaluations=OPTIMIZER_MAX_EVALUATIONS, starts=OPTIMIZER_STARTS,
+                            backend='process', progress_callback=None, stop_check=None):
+    """
+    Поиск минимума метрики по (f0, f1) многостартовым методом Нелдера-Мида
+    
+    bounds - ((f0_min, f0_max), (f1_min, f1_max)), resolution - точность по
+    частоте (Гц). Сначала параллельно считается грубая сетка (доля
+    OPTIMIZER_COARSE_FRACTION бюджета), затем из starts лучших ее узлов
+    параллельно запускается метод Нелдера-Мида; оставшийся бюджет
+    вычислений делится между запусками поровну.
+    
+    Возвращает словарь: best - (f0, f1, значения всех метрик в порядке
+    HEATMAP_METRICS), coarse - узлы грубой сетки (f0, f1, значение),
+    trajectories - траектории запусков, evaluations - число расчетов.
+    None, если расчет остановлен.
+    """
+    fixed_params = as_param_dict(fixed_params)
+    coarse_points, coarse_step = optimizer_coarse_grid(
+        bounds, int(OPTIMIZER_COARSE_FRACTION * max_evaluations))
+    if not coarse_points:
+        raise ValueError("В заданных диапазонах нет точек с начальной частотой меньше конечной")
+    
+    metric_index = HEATMAP_METRICS.index(metric)
+    fixed_params = dict(fixed_params)
+    
+    if backend == 'process':
+        mp_context = multiprocessing.get_context('spawn')
+        cancel_event = mp_context.Event()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1, mp_context=mp_context,
+            initializer=_init_cancel_worker, initargs=(cancel_event,))
+        point_task = _optimizer_point_task
+        run_task = _nelder_mead_task
+    else:
+        cancel_event = threading.Event()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+        point_task = functools.partial(_optimizer_point_task, cancel=cancel_event)
+        run_task = functools.partial(_nelder_mead_task, cancel=cancel_event)
+    
+    total_steps = len(coarse_points) + starts
+    start_time = time.perf_counter()
+    
+    def report(completed):
+        if progress_callback is not None:
+            progress_callback({'completed': completed, 'total': total_steps,
+                               'elapsed': time.perf_counter() - start_time})
+    
+    coarse = []
+    trajectories = []
+    try:
+        futures = {executor.submit(point_task, f0, f1, fixed_params): (f0, f1)
+                   for f0, f1 in coarse_points}
+        for future in completed_futures(futures, stop_check, cancel_event):
+            try:
+                value = objective_value(future.result()[metric_index])
+            except Exception as e:
+                print(f"Ошибка при расчете точки: {e}")
+                value = np.inf
+            coarse.append(futures[future] + (value,))
+            report(len(coarse))
+        
+        best_nodes = sorted((point for point in coarse if np.isfinite(point[2])),
+                            key=lambda point: point[2])[:starts]
+        run_budget = max((max_evaluations - len(coarse)) // max(len(best_nodes), 1), 3)
+        
+        futures = [executor.submit(run_task, {
+            'start': (f0, f1),
+            'bounds': bounds,
+            'metric': metric,
+            'resolution': resolution,
+            'simplex_step': coarse_step / 2,
+            'max_evaluations': run_budget,
+            'fixed_params': fixed_params
+        }) for f0, f1, _ in best_nodes]
+        for future in completed_futures(futures, stop_check, cancel_event):
+            trajectories.append(future.result())
+            report(len(coarse) + len(trajectories))
+    except CalculationCancelled:
+        return None
+    finally:
+        cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    points = [point for point in coarse if np.isfinite(point[2])]
+    points += [point for trajectory in trajectories for point in trajectory if np.isfinite(point[2])]
+    if not points:
+        raise ValueError("Не удалось рассчитать ни одной точки")
+    
+    f0, f1, _ = min(points, key=lambda point: point[2])
+    return {
+        'best': (f0, f1, compute_point_metrics(f0, f1, fixed_params)),
+        'coarse': coarse,
+        'trajectories': trajectories,
+        'evaluations': len(coarse) + sum(len(trajectory) for trajectory in trajectories)
+    }
@@ -0,0 +1,103 @@
+"""Параметры расчета: допустимые пределы и типизированные объекты параметров"""
+
+import dataclasses
+
+import numpy as np
+
+
+# Окно лагов АКФ (сек): при dt = 1 мс это ±500 отсчетов
+ACF_LAG_WINDOW = 0.5
+
+# Допустимый шаг дискретизации (сек)
+MIN_DT = 0.0001
+MAX_DT = 0.01
+
+# Максимальная длительность последовательности (сек)
+MAX_DURATION = 600
+
+
+def _lag_window_samples(dt):
+    """Число лагов в окне ACF_LAG_WINDOW при шаге dt"""
+    return int(round(ACF_LAG_WINDOW / dt)) if dt > 0 else 0
+
+
+@dataclasses.dataclass
+class SequenceParams:
+    """
+    Параметры импульсной последовательности и расчета ее АКФ
+    
+    Поля совпадают с ключами словаря параметров основного окна (раздел
+    'parameters' файла, сохраняемого кнопкой «Сохранить все параметры»).
+    При расчете тепловой карты start_freq и end_freq не используются.
+    max_lag = 0 означает окно ACF_LAG_WINDOW при шаге dt.
+    """
+    ricker_freq: float = 100.0
+    duration: float = 10.0
+    start_freq: float = 25.105
+    end_freq: float = 48.0
+    dt: float = 0.001
+    max_lag: int = 0
+    law_type: str = 'exponential'
+    variable_amplitude: bool = False
+    acf_engine: str = 'sparse'
+    conv_method: str = 'auto'
+    
+    def __post_init__(self):
+        if not self.max_lag:
+            self.max_lag = _lag_window_samples(self.dt)
+    
+    @classmethod
+    def from_dict(cls, params):
+        """Объект из словаря параметров (неизвестные ключи пропускаются)"""
+        names = {field.name for field in dataclasses.fields(cls)}
+        return cls(**{key: value for key, value in params.items() if key in names})
+    
+    def to_dict(self):
+        return dataclasses.asdict(self)
+    
+    def with_frequencies(self, start_freq, end_freq):
+        """Копия с другой парой начальной и конечной частоты"""
+        return dataclasses.replace(self, start_freq=start_freq, end_freq=end_freq)
+    
+    def validate(self, check_frequencies=True):
+        """Проверка допустимости значений (ValueError с описанием ошибки)"""
+        if self.ricker_freq <= 0 or self.duration <= 0:
+            raise ValueError("Частота и длительность должны быть > 0")
+        if check_frequencies:
+            if self.start_freq <= 0 or self.end_freq <= 0:
+                raise ValueError("Частоты должны быть > 0")
+            if self.start_freq >= self.end_freq:
+                raise ValueError("Начальная частота должна быть меньше конечной")
+        if not MIN_DT <= self.dt <= MAX_DT:
+            raise ValueError(f"Шаг дискретизации должен быть от {MIN_DT*1000} до {MAX_DT*1000} мс")
+        if self.duration > MAX_DURATION:
+            raise ValueError(f"Длительность не должна превышать {MAX_DURATION} сек")
+        return self
+
+
+@dataclasses.dataclass
+class FrequencyRange:
+    """Диапазон перебора частоты (Гц): минимум, максимум (включительно) и шаг"""
+    minimum: float
+    maximum: float
+    step: float
+    
+    def values(self):
+        return np.arange(self.minimum, self.maximum + self.step/2, self.step)
+    
+    def validate(self):
+        """Проверка диапазона (ValueError с описанием ошибки)"""
+        if self.minimum <= 0 or self.maximum <= 0:
+            raise ValueError("Частоты должны быть > 0")
+        if self.step <= 0:
+            raise ValueError("Шаги частот должны быть > 0")
+        if self.minimum >= self.maximum:
+            raise ValueError("Минимальная частота должна быть меньше максимальной")
+        return self
+
+
+def as_param_dict(params):
+    """Словарь параметров из SequenceParams (словарь возвращается как есть)"""
+    if isinstance(params, SequenceParams):
+        return params.to_dict()
+    return params
@@ -0,0 +1,112 @@
+"""Импульсные последовательности, вейвлет Рикера и свертка"""
+
+import functools
+
+import numpy as np
+from scipy import signal as scipy_signal
+
+
+# Длина вейвлета, до которой прямая свертка numpy быстрее спектральных методов
+CONV_DIRECT_MAX_KERNEL = 128
+
+
+def convolve_signal(signal, wavelet, method='auto', mode='same'):
+    """
+    Свертка сигнала с вейвлетом (mode - как у np.convolve: 'same' или 'full')
+
+    method: 'direct' - np.convolve, 'fft' - scipy fftconvolve,
+            'overlap_add' - scipy oaconvolve, 'auto' - выбор по длинам сигнала и вейвлета
+    """
+    signal = np.asarray(signal, dtype=float)
+    wavelet = np.asarray(wavelet, dtype=float)
+    n = len(signal)
+    m = len(wavelet)
+
+    if method == 'auto':
+        if m <= CONV_DIRECT_MAX_KERNEL or n < m:
+            method = 'direct'
+        elif n >= 4 * m:
+            # Короткое ядро на длинном сигнале: блоки длины ~ ядра
+            method = 'overlap_add'
+        else:
+            method = 'fft'
+
+    if method == 'direct':
+        return np.convolve(signal, wavelet, mode=mode)
+    elif method == 'fft':
+        return scipy_signal.fftconvolve(signal, wavelet, mode=mode)
+    elif method == 'overlap_add':
+        return scipy_signal.oaconvolve(signal, wavelet, mode=mode)
+    else:
+        raise ValueError(f"Неизвестный метод свертки: {method}")
+
+
+def convolve_same(signal, wavelet, method='auto'):
+    """Свертка сигнала с вейвлетом в режиме 'same' (как np.convolve)"""
+    return convolve_signal(signal, wavelet, method, mode='same')
+
+
+def impulse_amplitudes(count, variable_amplitude):
+    """Амплитуды импульсов: 1 или линейное нарастание от 1 до 2"""
+    if variable_amplitude and count > 1:
+        return 1.0 + np.arange(count) / (count - 1)
+    return np.ones(count)
+
+
+def impulse_samples(impulse_times, dt, n_samples, variable_amplitude):
+    """
+    Индексы отсчетов и амплитуды импульсов в том виде, в каком они
+    попадают в дискретный сигнал (времена должны быть отсортированы)
+    """
+    times = np.asarray(impulse_times, dtype=float)
+    amplitudes = impulse_amplitudes(len(times), variable_amplitude)
+
+    indices = (times / dt).astype(np.int64)
+    valid = (indices >= 0) & (indices < n_samples)
+    indices = indices[valid]
+    amplitudes = amplitudes[valid]
+
+    # При совпадении отсчетов в сигнале остается последний импульс
+    if len(indices) > 1:
+        last = np.append(indices[1:] != indices[:-1], True)
+        indices = indices[last]
+        amplitudes = amplitudes[last]
+
+    return indices, amplitudes
+
+
+# Показатель экспоненты, за которым АКФ вейвлета Рикера считается нулевой (e^-25 ~ 1e-11)
+RICKER_ACF_CUTOFF_EXPONENT = 25.0
+
+def ricker_autocorrelation_analytic(tau, frequency):
+    """
+    АКФ вейвлета Рикера в замкнутой форме (нормирована на 1 при tau = 0):
+    R(tau) = (1 - 2a*tau^2 + a^2*tau^4/3) * exp(-a*tau^2/2), a = (pi*f)^2
+    """
+    a_tau2 = (np.pi * frequency)**2 * np.asarray(tau, dtype=float)**2
+    return (1.0 - 2.0 * a_tau2 + a_tau2**2 / 3.0) * np.exp(-a_tau2 / 2.0)
+
+
+def ricker_wavelet(frequency, dt, length=0.1):
+    """Создание вейвлета Рикера с шагом дискретизации dt"""
+    t = np.arange(-length/2, length/2, dt)
+    t2 = t ** 2
+    return (1.0 - 2.0 * np.pi**2 * frequency**2 * t2) * np.exp(-np.pi**2 * frequency**2 * t2)
+
+
+@functools.lru_cache(maxsize=64)
+def ricker_autocorrelation(frequency, dt):
+    """
+    Автокорреляция одиночного импульса Рикера с самим собой
+    (нормированная, кэшируется по частоте и шагу дискретизации)
+    """
+    wavelet = ricker_wavelet(frequency, dt)
+    autocorr = np.correlate(wavelet, wavelet, mode='full')
+    
+    max_val = np.max(np.abs(autocorr))
+    if max_val > 0:
+        autocorr = autocorr / max_val
+    
+    # Массив общий для всех вызовов - защищаем от изменения
+    autocorr.setflags(write=False)
+    return autocorr
@@ -0,0 +1,690 @@
+"""Перебор тепловой карты: пакеты точек, пулы вычислителей, кэши и адаптивная сетка"""
+
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from .cancellation import CalculationCancelled
+from .metrics import ACF_ENGINE_VERSION, HEATMAP_METRICS, compute_point_metrics
+from .params import as_param_dict
+
+
+# Число точек в пакете и число пакетов в работе на один вычислитель
+HEATMAP_BATCH_POINTS = 64
+HEATMAP_BATCHES_PER_WORKER = 2
+
+
+def heatmap_node_mask(start_freqs, end_freqs):
+    """Маска узлов сетки (конечная, начальная частота), где начальная частота меньше конечной"""
+    return end_freqs[:, None] > start_freqs[None, :]
+
+
+def heatmap_batches(start_freqs, end_freqs, fixed_params, node_mask, batch_points=HEATMAP_BATCH_POINTS):
+    """
+    Разбиение сетки тепловой карты на пакеты
+    
+    Пакет - до batch_points отмеченных в node_mask узлов столбца одной
+    начальной частоты. Все пакеты ссылаются на один словарь fixed_params.
+    """
+    for i, start_freq in enumerate(start_freqs):
+        column = np.flatnonzero(node_mask[:, i])
+        for k in range(0, len(column), batch_points):
+            j = column[k:k + batch_points]
+            yield {
+                'i': i,
+                'j': j,
+                'start_freq': start_freq,
+                'end_freqs': end_freqs[j],
+                'fixed_params': fixed_params
+            }
+
+
+def compute_batch_metrics(batch, cancel=None):
+    """
+    Расчет всех метрик для пакета точек
+    
+    Возвращает массив (метрика, точка пакета) и маску точек с ошибкой.
+    Ошибка в отдельной точке дает значения NaN только для нее (такие точки
+    не попадают в кэш), отмена прерывает весь пакет. Пропущенные точки
+    (длиннее MAX_IMPULSES импульсов) тоже равны NaN, но ошибкой не считаются.
+    """
+    start_freq = batch['start_freq']
+    end_freqs = batch['end_freqs']
+    values = np.full((len(HEATMAP_METRICS), len(end_freqs)), np.nan)
+    failed = np.zeros(len(end_freqs), dtype=bool)
+    for k, end_freq in enumerate(end_freqs):
+        try:
+            values[:, k] = compute_point_metrics(start_freq, end_freq, batch['fixed_params'], cancel)
+        except CalculationCancelled:
+            raise
+        except Exception as e:
+            print(f"Ошибка для f0={start_freq}, f1={end_freq}: {str(e)}")
+            failed[k] = True
+    return values, failed
+
+
+# Разделяемая память куба метрик и признак отмены в процессе-вычислителе
+_worker_shared_memory = None
+_worker_cube = None
+_worker_cancel_event = None
+
+
+def _init_cancel_worker(cancel_event):
+    """Инициализация процесса-вычислителя: общий признак отмены"""
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def _init_process_worker(shared_memory_name, cube_shape, cancel_event=None):
+    """Инициализация процесса-вычислителя: подключение к общему кубу метрик"""
+    global _worker_shared_memory, _worker_cube
+    _init_cancel_worker(cancel_event)
+    _worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    _worker_cube = np.ndarray(cube_shape, dtype=np.float64, buffer=_worker_shared_memory.buf)
+
+
+def _process_batch_task(batch):
+    """Расчет пакета в процессе-вычислителе с записью результата в общий куб"""
+    values, failed = compute_batch_metrics(batch, _worker_cancel_event)
+    _worker_cube[:, batch['j'], batch['i']] = values
+    return (batch['i'], batch['j'], None, failed)
+
+
+def _thread_batch_task(batch, cancel=None):
+    """Расчет пакета в потоке-вычислителе"""
+    values, failed = compute_batch_metrics(batch, cancel)
+    return (batch['i'], batch['j'], values, failed)
+
+
+# Бюджет памяти кэша точек тепловой карты в текущем сеансе (байт)
+HEATMAP_MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class HeatmapMemoryCache:
+    """
+    Кэш метрик точек тепловой карты в памяти с вытеснением давно
+    не использованных записей (LRU) при превышении бюджета памяти
+    
+    Ключи те же, что у постоянного кэша (HeatmapPointCache.point_key).
+    """
+    
+    def __init__(self, max_bytes=HEATMAP_MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def _entry_bytes(key, values):
+        return sys.getsizeof(key) + sys.getsizeof(values)
+    
+    def get_many(self, keys):
+        """Найденные значения: словарь ключ -> массив метрик (найденные становятся свежими)"""
+        found = {}
+        with self.lock:
+            for key in keys:
+                values = self.entries.get(key)
+                if values is not None:
+                    self.entries.move_to_end(key)
+                    found[key] = values
+        return found
+    
+    def put_many(self, items):
+        """Сохранение пар (ключ, массив метрик) с вытеснением старых записей"""
+        with self.lock:
+            for key, values in items:
+                values = np.array(values, dtype=np.float64)
+                old = self.entries.pop(key, None)
+                if old is not None:
+                    self.used_bytes -= self._entry_bytes(key, old)
+                self.entries[key] = values
+                self.used_bytes += self._entry_bytes(key, values)
+            
+            while self.used_bytes > self.max_bytes and self.entries:
+                key, values = self.entries.popitem(last=False)
+                self.used_bytes -= self._entry_bytes(key, values)
+    
+    def __len__(self):
+        return len(self.entries)
+
+
+# Файл постоянного кэша метрик точек тепловой карты
+HEATMAP_CACHE_PATH = Path.home() / '.acf_app' / 'heatmap_cache.sqlite'
+
+# Параметры расчета, от которых зависят метрики точки
+HEATMAP_CACHE_KEY_PARAMS = ('law_type', 'duration', 'ricker_freq', 'dt', 'max_lag',
+                            'variable_amplitude', 'acf_engine')
+
+
+class HeatmapPointCache:
+    """
+    Постоянный кэш метрик точек тепловой карты в SQLite
+    
+    Ключ - хэш канонического представления параметров точки и версии
+    расчета (ACF_ENGINE_VERSION), значение - метрики в порядке HEATMAP_METRICS.
+    """
+    
+    # Ограничение числа параметров в одном SQL-запросе
+    QUERY_CHUNK = 500
+    
+    def __init__(self, path=HEATMAP_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS points (key TEXT PRIMARY KEY, metrics BLOB NOT NULL)')
+        self.connection.commit()
+    
+    @staticmethod
+    def _canonical(value):
+        """Каноническая запись значения: числа с 12 значащими цифрами"""
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return format(float(value), '.12g')
+        return value
+    
+    @classmethod
+    def point_key(cls, start_freq, end_freq, fixed_params):
+        """Ключ точки: SHA-1 канонического JSON параметров"""
+        key_data = {name: cls._canonical(fixed_params.get(name)) for name in HEATMAP_CACHE_KEY_PARAMS}
+        key_data['acf_engine'] = fixed_params.get('acf_engine', 'sparse')
+        key_data['start_freq'] = cls._canonical(start_freq)
+        key_data['end_freq'] = cls._canonical(end_freq)
+        key_data['metrics'] = list(HEATMAP_METRICS)
+        key_data['engine_version'] = ACF_ENGINE_VERSION
+        return hashlib.sha1(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def get_many(self, keys):
+        """Найденные в кэше значения: словарь ключ -> массив метрик"""
+        found = {}
+        keys = list(keys)
+        with self.lock:
+            for k in range(0, len(keys), self.QUERY_CHUNK):
+                chunk = keys[k:k + self.QUERY_CHUNK]
+                rows = self.connection.execute(
+                    f'SELECT key, metrics FROM points WHERE key IN ({",".join("?" * len(chunk))})',
+                    chunk).fetchall()
+                for key, metrics in rows:
+                    found[key] = np.frombuffer(metrics, dtype=np.float64)
+        return found
+    
+    def put_many(self, items):
+        """Сохранение пар (ключ, массив метрик) одной транзакцией"""
+        rows = [(key, np.asarray(values, dtype=np.float64).tobytes()) for key, values in items]
+        if not rows:
+            return
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO points (key, metrics) VALUES (?, ?)', rows)
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# Адаптивный перебор: число узлов грубой сетки по большей стороне
+ADAPTIVE_COARSE_NODES = 9
+# Ячейка делится, если перепад метрики в ее углах больше этой доли диапазона карты...
+ADAPTIVE_GRADIENT_FRACTION = 0.1
+# ...или ее минимум отстоит от минимума карты меньше, чем на эту долю диапазона
+ADAPTIVE_MINIMUM_FRACTION = 0.1
+# Число узлов адаптивного перебора по умолчанию
+ADAPTIVE_POINT_BUDGET = 2000
+
+
+class HeatmapQuadtree:
+    """
+    Квадродерево адаптивного перебора на сетке индексов узлов
+    
+    Лист - квадрат узлов (i0, j0, size) со стороной size (степень двойки),
+    обрезанный по краю сетки; i - индекс начальной, j - конечной частоты.
+    Листья делятся на четыре, пока size > 1, т.е. до шага исходной сетки.
+    """
+    
+    def __init__(self, valid_mask, coarse_nodes=ADAPTIVE_COARSE_NODES):
+        self.valid = valid_mask
+        # Посчитанные узлы на момент последнего деления
+        self.computed = np.zeros_like(valid_mask)
+        self.n_end, self.n_start = valid_mask.shape
+        
+        span = max(self.n_start, self.n_end, 2) - 1
+        size = 1
+        while size * (coarse_nodes - 1) < span:
+            size *= 2
+        self.coarse_size = size
+        
+        self.leaves = [(i0, j0, size)
+                       for i0 in range(0, max(self.n_start - 1, 1), size)
+                       for j0 in range(0, max(self.n_end - 1, 1), size)]
+    
+    @staticmethod
+    def _axis_nodes(start, size, step, n):
+        """Узлы отрезка [start, start + size] с шагом step, обрезанные по краю сетки"""
+        return np.unique(np.minimum(np.arange(start, start + size + 1, step), n - 1))
+    
+    def _cell(self, leaf, step):
+        i0, j0, size = leaf
+        return np.ix_(self._axis_nodes(j0, size, step, self.n_end),
+                      self._axis_nodes(i0, size, step, self.n_start))
+    
+    def coarse_node_mask(self):
+        """Маска узлов грубой сетки (углы всех начальных листьев)"""
+        mask = np.zeros_like(self.valid)
+        for leaf in self.leaves:
+            mask[self._cell(leaf, leaf[2])] = True
+        return mask & self.valid
+    
+    def _children(self, leaf):
+        i0, j0, size = leaf
+        half = size // 2
+        return [(i0 + di, j0 + dj, half)
+                for di in (0, half) for dj in (0, half)
+                if (di == 0 or i0 + di < self.n_start - 1) and (dj == 0 or j0 + dj < self.n_end - 1)]
+    
+    def refine(self, metric, computed, budget, excluded=None):
+        """
+        Деление листьев с крутым перепадом метрики или близких к минимуму
+        
+        metric - срез куба (конечная, начальная частота), computed - маска
+        посчитанных узлов, budget - сколько еще узлов можно посчитать,
+        excluded - маска посчитанных узлов без значения метрики (ошибка,
+        пропуск): они не учитываются ни в минимуме, ни в перепадах.
+        Листья делятся в порядке возрастания минимума в их углах.
+        Возвращает маску новых узлов или None, если делить больше нечего.
+        """
+        self.computed = computed.copy()
+        known = computed & self.valid
+        if excluded is not None:
+            known &= ~excluded
+        if budget <= 0 or not known.any():
+            return None
+        
+        values = metric[known]
+        low = values.min()
+        value_range = values.max() - low
+        
+        candidates = []
+        for leaf in self.leaves:
+            if leaf[2] == 1:
+                continue
+            corners = self._cell(leaf, leaf[2])
+            corner_known = known[corners]
+            if not corner_known.any():
+                continue
+            corner_values = metric[corners][corner_known]
+            cell_min = corner_values.min()
+            steep = corner_values.max() - cell_min > ADAPTIVE_GRADIENT_FRACTION * value_range
+            near_minimum = cell_min - low <= ADAPTIVE_MINIMUM_FRACTION * value_range
+            if steep or near_minimum:
+                candidates.append((cell_min, leaf))
+        
+        candidates.sort(key=lambda candidate: candidate[0])
+        
+        pending = self.valid & ~computed
+        new_nodes = np.zeros_like(self.valid)
+        split = set()
+        for _, leaf in candidates:
+            cell = self._cell(leaf, leaf[2] // 2)
+            fresh = pending[cell] & ~new_nodes[cell]
+            cost = int(fresh.sum())
+            if cost > budget:
+                break
+            new_nodes[cell] |= fresh
+            budget -= cost
+            split.add(leaf)
+        
+        if not split:
+            return None
+        
+        self.leaves = ([leaf for leaf in self.leaves if leaf not in split] +
+                       [child for leaf in split for child in self._children(leaf)])
+        return new_nodes
+    
+    def leaf_segments(self, start_freqs, end_freqs):
+        """Отрезки границ листьев (в частотах) для отрисовки; листья вне области f0 < f1 пропускаются"""
+        segments = []
+        for leaf in self.leaves:
+            corners = self._cell(leaf, leaf[2])
+            if not self.valid[corners].any():
+                continue
+            j_idx, i_idx = corners[0].ravel(), corners[1].ravel()
+            x0, x1 = start_freqs[i_idx[0]], start_freqs[i_idx[-1]]
+            y0, y1 = end_freqs[j_idx[0]], end_freqs[j_idx[-1]]
+            segments.extend([[(x0, y0), (x1, y0)], [(x1, y0), (x1, y1)],
+                             [(x1, y1), (x0, y1)], [(x0, y1), (x0, y0)]])
+        return segments
+
+
+# Период опроса признака остановки во время ожидания вычислителей (сек)
+CANCEL_POLL_INTERVAL = 0.05
+
+# Минимальный интервал между промежуточными отрисовками карты во время расчета (сек)
+HEATMAP_SNAPSHOT_INTERVAL = 0.33
+# Минимальный интервал между обновлениями окна прогресса (сек)
+HEATMAP_PROGRESS_INTERVAL = 0.25
+
+
+class HeatmapSweep:
+    """
+    Расчет куба метрик тепловой карты (метрика, конечная, начальная частота)
+    на пуле вычислителей, без обращения к интерфейсу
+    
+    Используется как контекстный менеджер: пул и общий блок памяти живут
+    до выхода из with, после чего куб остается в self.cube. При остановке
+    устанавливается общий признак отмены cancel_event, и вычислители
+    прерывают текущие точки, не дожидаясь их окончания. Узлы с
+    начальной частотой не меньше конечной не считаются и равны нулю.
+    progress_callback(progress) получает словарь progress_stats не чаще раза
+    в HEATMAP_PROGRESS_INTERVAL, stop_check() - признак остановки расчета.
+    Точки, расчет которых завершился ошибкой (в том числе точки пакетов,
+    которые не удалось посчитать или отправить на пул), отмечаются в маске
+    failed, пропущенные точки (длиннее MAX_IMPULSES импульсов) - в маске
+    skipped; в кубе те и другие нулевые, а в адаптивном переборе не
+    участвуют в выборе ячеек для деления.
+    snapshot_callback(cube, computed, pending) получает копии куба и масок
+    посчитанных и запланированных к расчету узлов не чаще раза в HEATMAP_SNAPSHOT_INTERVAL.
+    """
+    
+    def __init__(self, start_freqs, end_freqs, fixed_params, backend='process',
+                 memory_cache=None, disk_cache=None, progress_callback=None, stop_check=None,
+                 snapshot_callback=None):
+        self.start_freqs = np.asarray(start_freqs, dtype=np.float64)
+        self.end_freqs = np.asarray(end_freqs, dtype=np.float64)
+        self.fixed_params = dict(as_param_dict(fixed_params))
+        self.backend = backend
+        self.memory_cache = memory_cache
+        self.disk_cache = disk_cache
+        self.progress_callback = progress_callback
+        self.stop_check = stop_check or (lambda: False)
+        self.snapshot_callback = snapshot_callback
+        self._last_snapshot = 0.0
+        self._last_progress = 0.0
+        self._start_time = time.perf_counter()
+        self.active_workers = 0
+        
+        self.shape = (len(HEATMAP_METRICS), len(self.end_freqs), len(self.start_freqs))
+        self.valid_mask = heatmap_node_mask(self.start_freqs, self.end_freqs)
+        self.computed = np.zeros(self.shape[1:], dtype=bool)
+        self.pending = np.zeros(self.shape[1:], dtype=bool)
+        self.total = int(self.valid_mask.sum())
+        self.completed = 0
+        self.failed = np.zeros(self.shape[1:], dtype=bool)
+        self.skipped = np.zeros(self.shape[1:], dtype=bool)
+        self.cache_hits = 0
+        self.quadtree = None
+        self.cube = None
+        self._shared_block = None
+        self._executor = None
+    
+    def __enter__(self):
+        if self.backend == 'process':
+            # Процессы не упираются в GIL; результаты пишутся прямо в общий куб
+            mp_context = multiprocessing.get_context('spawn')
+            self.cancel_event = mp_context.Event()
+            self.max_workers = os.cpu_count() or 1
+            self._shared_block = shared_memory.SharedMemory(
+                create=True, size=int(np.prod(self.shape)) * np.dtype(np.float64).itemsize)
+            self.cube = np.ndarray(self.shape, dtype=np.float64, buffer=self._shared_block.buf)
+            self.cube[:] = 0
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=mp_context,
+                initializer=_init_process_worker,
+                initargs=(self._shared_block.name, self.shape, self.cancel_event))
+            self._worker = _process_batch_task
+        else:
+            self.cancel_event = threading.Event()
+            self.max_workers = 8
+            self.cube = np.zeros(self.shape)
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+            self._worker = functools.partial(_thread_batch_task, cancel=self.cancel_event)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        # Незавершенные пакеты (после остановки или ошибки) прерываются по признаку
+        # отмены; ожидание вычислителей короткое и гарантирует, что общий блок
+        # освобождается уже после их остановки
+        self.cancel_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._shared_block is not None:
+            # Куб копируется из общего блока до его освобождения
+            self.cube = np.array(self.cube)
+            self._shared_block.close()
+            self._shared_block.unlink()
+            self._shared_block = None
+        return False
+    
+    @property
+    def failed_points(self):
+        """Число точек с ошибкой расчета"""
+        return int(self.failed.sum())
+    
+    @property
+    def skipped_points(self):
+        """Число пропущенных точек (длиннее MAX_IMPULSES импульсов)"""
+        return int(self.skipped.sum())
+    
+    def progress_stats(self):
+        """
+        Сводка хода расчета: completed, total, cache_hits, elapsed (сек),
+        rate (посчитанных точек в секунду без учета кэша), eta (сек или
+        None), active_workers, max_workers
+        """
+        elapsed = time.perf_counter() - self._start_time
+        computed = self.completed - self.cache_hits
+        rate = computed / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.completed, 0)
+        return {
+            'completed': self.completed,
+            'total': self.total,
+            'cache_hits': self.cache_hits,
+            'elapsed': elapsed,
+            'rate': rate,
+            'eta': remaining / rate if rate > 0 else None,
+            'active_workers': self.active_workers,
+            'max_workers': self.max_workers
+        }
+    
+    def _report_progress(self, force=False):
+        """Передача сводки хода расчета (с ограничением частоты)"""
+        if self.progress_callback is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_progress < HEATMAP_PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self.progress_callback(self.progress_stats())
+    
+    def _push_snapshot(self, force=False):
+        """Передача промежуточного состояния куба для отрисовки (с ограничением частоты)"""
+        if self.snapshot_callback is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_snapshot < HEATMAP_SNAPSHOT_INTERVAL:
+            return
+        self._last_snapshot = now
+        self.snapshot_callback(np.array(self.cube), self.computed.copy(), self.pending.copy())
+    
+    def _lookup_caches(self, node_mask):
+        """Заполнение узлов из кэшей; возвращает ключи узлов для записи новых результатов"""
+        node_keys = {}
+        try:
+            for j, i in zip(*np.nonzero(node_mask)):
+                node_keys[(j, i)] = HeatmapPointCache.point_key(
+                    self.start_freqs[i], self.end_freqs[j], self.fixed_params)
+            
+            cached = {}
+            if self.memory_cache is not None:
+                cached = self.memory_cache.get_many(node_keys.values())
+            if self.disk_cache is not None:
+                disk_cached = self.disk_cache.get_many(key for key in node_keys.values() if key not in cached)
+                if self.memory_cache is not None:
+                    self.memory_cache.put_many(disk_cached.items())
+                cached.update(disk_cached)
+            
+            for (j, i), key in node_keys.items():
+                if key in cached:
+                    values = cached[key]
+                    if np.all(np.isfinite(values)):
+                        self.cube[:, j, i] = values
+                    else:
+                        self.cube[:, j, i] = 0
+                        self.skipped[j, i] = True
+                    self.computed[j, i] = True
+                    node_mask[j, i] = False
+                    self.cache_hits += 1
+                    self.completed += 1
+        except Exception as e:
+            print(f"Ошибка чтения кэша тепловой карты: {e}")
+            node_keys = {}
+        return node_keys
+    
+    def _store_results(self, node_keys, i, j, values, failed):
+        """
+        Запись посчитанных узлов в кэши и учет точек с ошибкой и пропущенных
+        
+        Пропущенные точки (NaN без ошибки) кэшируются как есть, точки с
+        ошибкой в кэш не попадают; в кубе те и другие обнуляются.
+        """
+        skipped = ~failed & ~np.all(np.isfinite(values), axis=0)
+        if node_keys:
+            computed = [(node_keys[(jj, i)], values[:, k]) for k, jj in enumerate(j) if not failed[k]]
+            if self.memory_cache is not None:
+                self.memory_cache.put_many(computed)
+            if self.disk_cache is not None:
+                self.disk_cache.put_many(computed)
+        self.failed[j[failed], i] = True
+        self.skipped[j[skipped], i] = True
+        if (failed | skipped).any():
+            self.cube[:, j[failed | skipped], i] = 0
+    
+    def _fail_batch(self, batch):
+        """Учет пакета, расчет которого не удался: все его точки считаются ошибочными"""
+        j, i = batch['j'], batch['i']
+        self.cube[:, j, i] = 0
+        self.computed[j, i] = True
+        self.failed[j, i] = True
+        self.completed += len(j)
+    
+    def _submit_next(self, batches, submitted):
+        """
+        Отправка следующего пакета на пул (future -> пакет в submitted)
+        
+        Пакеты, которые не удалось отправить (например, пул процессов
+        сломан после аварии вычислителя), считаются ошибочными, и
+        отправляется следующий.
+        """
+        for batch in batches:
+            try:
+                submitted[self._executor.submit(self._worker, batch)] = batch
+                return
+            except Exception as e:
+                print(f"Ошибка при отправке пакета: {e}")
+                self._fail_batch(batch)
+    
+    def compute(self, node_mask):
+        """
+        Расчет отмеченных узлов (из кэшей или на пуле вычислителей)
+        
+        Пакеты создаются по мере освобождения вычислителей: в работе
+        одновременно не больше HEATMAP_BATCHES_PER_WORKER пакетов на
+        вычислитель. Возвращает False, если расчет остановлен.
+        """
+        node_mask = node_mask & self.valid_mask & ~self.computed
+        self.pending |= node_mask
+        node_keys = self._lookup_caches(node_mask)
+        self._report_progress(force=True)
+        self._push_snapshot(force=True)
+        
+        batches = heatmap_batches(self.start_freqs, self.end_freqs, self.fixed_params, node_mask)
+        submitted = {}
+        for _ in range(self.max_workers * HEATMAP_BATCHES_PER_WORKER):
+            self._submit_next(batches, submitted)
+        pending = set(submitted)
+        
+        while pending:
+            self.active_workers = min(len(pending), self.max_workers)
+            done, pending = concurrent.futures.wait(
+                pending, timeout=CANCEL_POLL_INTERVAL,
+                return_when=concurrent.futures.FIRST_COMPLETED)
+            
+            if self.stop_check():
+                self.cancel_event.set()
+                return False
+            
+            for future in done:
+                batch = submitted.pop(future)
+                try:
+                    i, j, values, failed = future.result()
+                    if values is None:
+                        values = self.cube[:, j, i]
+                    else:
+                        self.cube[:, j, i] = values
+                    self.computed[j, i] = True
+                    self.completed += len(j)
+                    self._store_results(node_keys, i, j, values, failed)
+                except Exception as e:
+                    print(f"Ошибка при расчете пакета: {e}")
+                    self._fail_batch(batch)
+                
+                self._submit_next(batches, submitted)
+            pending = set(submitted)
+            
+            self._report_progress()
+            self._push_snapshot()
+        
+        self.active_workers = 0
+        self._report_progress(force=True)
+        return True
+    
+    def run_uniform(self):
+        """Расчет всех узлов сетки"""
+        return self.compute(self.valid_mask)
+    
+    def run_adaptive(self, metric, point_budget=ADAPTIVE_POINT_BUDGET):
+        """
+        Адаптивный расчет: грубая сетка, затем деление листьев квадродерева
+        вокруг минимумов и крутых перепадов метрики metric до шага исходной
+        сетки или исчерпания бюджета узлов point_budget
+        
+        Бюджет ограничивает и грубую сетку: она редеет, пока не уложится в
+        него. Меньше углов сетки (по два узла на сторону) не бывает, поэтому
+        на очень малом бюджете считается только эта минимальная сетка.
+        Точки с ошибкой и пропущенные в выборе ячеек для деления не участвуют.
+        """
+        metric_index = HEATMAP_METRICS.index(metric)
+        coarse_nodes = ADAPTIVE_COARSE_NODES
+        while True:
+            self.quadtree = HeatmapQuadtree(self.valid_mask, coarse_nodes)
+            node_mask = self.quadtree.coarse_node_mask()
+            if coarse_nodes <= 2 or node_mask.sum() <= point_budget:
+                break
+            coarse_nodes -= 1
+        self.total = min(self.total, max(point_budget, int(node_mask.sum())))
+        
+        while node_mask is not None:
+            if not self.compute(node_mask):
+                return False
+            node_mask = self.quadtree.refine(self.cube[metric_index], self.computed,
+                                             point_budget - int(self.computed.sum()),
+                                             excluded=self.failed | self.skipped)
+        
+        # Деление может закончиться раньше бюджета: итог - фактически обработанные узлы
+        self.total = self.completed
+        self._report_progress(force=True)
+        return True